@@ -0,0 +1,111 @@
+"""
+Compilação em lote de scripts EvaML.
+Os arquivos de um diretório (ou de um padrão glob, ex.: "codes-xml/*.xml") são compilados em paralelo,
+em um pool de processos. Cada arquivo é compilado em memória (eva_compiler), sem arquivos temporários,
+e as mensagens de cada compilação são devolvidas junto com o resultado do arquivo.
+
+Uso:
+    python3 eva_parser.py codes-xml/ -c
+    python3 eva_parser.py "codes-xml/*.xml" -c --jobs=4
+"""
+
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import eva_compiler
+import eva_json_gen
+import eva_validator
+
+
+# o argumento do parser e' um diretorio ou um padrao glob (e nao um unico arquivo)?
+def is_batch(source):
+    return os.path.isdir(source) or glob.has_magic(source)
+
+# lista (ordenada) dos arquivos .xml de um diretorio ou dos arquivos que casam com o padrao glob
+def batch_files(source):
+    if os.path.isdir(source):
+        source = os.path.join(source, "*.xml")
+    return sorted(f for f in glob.glob(source) if os.path.isfile(f))
+
+
+# inicializacao de cada processo do pool. O validador e' carregado uma vez por processo
+def init_worker():
+    eva_validator.get_validator()
+
+# compila um arquivo e grava o "name"_EvaML.xml em out_dir
+# com json_output = True, o script Json do robo ("name".json) tambem e' gravado em out_dir
+# com optimize = True, o grafo de execucao e' otimizado (eva_optimizer)
+# data (opcional) e' o conteudo do arquivo ja lido (ex.: o modo watch, que ja leu o arquivo para calcular o hash)
+# templates (opcional) sao os modelos de registro Json da compilacao anterior do arquivo (eva_json_gen.json_gen)
+# retorna um dict com o resultado: file, ok, output, json, messages (o que a compilacao imprimiu) e time (segundos)
+def compile_file(evaml_file, out_dir = ".", use_cache = False, json_output = False, optimize = False, data = None, templates = None):
+    result = {"file": evaml_file, "ok": False, "output": None, "json": None, "messages": "", "time": 0.0}
+    start = time.perf_counter()
+    messages = io.StringIO()
+    with contextlib.redirect_stdout(messages):
+        try:
+            source = evaml_file if data == None else io.BytesIO(data)
+            tree = eva_compiler.compile_evaml(source, use_cache = use_cache, optimize = optimize)
+            if tree != None:
+                result["output"] = os.path.join(out_dir, eva_compiler.output_file_name(tree))
+                tree.write(result["output"], "UTF-8")
+                result["ok"] = True
+                if json_output:
+                    json_file = os.path.join(out_dir, tree.getroot().attrib["name"] + ".json")
+                    result["ok"] = eva_json_gen.write_json(tree.getroot(), json_file, templates) != None
+                    if result["ok"]:
+                        result["json"] = json_file
+        except Exception: # um erro inesperado em um arquivo nao interrompe o lote
+            print(traceback.format_exc(), end = "")
+    result["messages"] = messages.getvalue()
+    result["time"] = time.perf_counter() - start
+    return result
+
+
+# compila os arquivos em paralelo. jobs = None usa um processo por cpu
+# os resultados sao impressos a medida que cada arquivo termina e retornados na ordem da lista de arquivos
+# com use_cache = True, os processos compartilham o cache do compilador (eva_cache)
+def compile_batch(files, jobs = None, out_dir = ".", use_cache = False, optimize = False):
+    eva_validator.get_validator() # confere o validador gerado com o xsd antes de iniciar os processos do pool
+    results = []
+    with ProcessPoolExecutor(max_workers = jobs, initializer = init_worker) as pool:
+        n = len(files)
+        for result in pool.map(compile_file, files, [out_dir] * n, [use_cache] * n, [False] * n, [optimize] * n):
+            print_result(result)
+            results.append(result)
+
+    # dois scripts com o mesmo atributo name geram o mesmo arquivo de saida
+    outputs = {}
+    for result in results:
+        if result["ok"]:
+            outputs.setdefault(result["output"], []).append(result["file"])
+    for output, sources in outputs.items():
+        if len(sources) > 1:
+            print('  WARNING -> The scripts ' + ", ".join(sources) + ' have the same name. Only one of them was saved in "' + output + '".')
+
+    ok = sum(1 for result in results if result["ok"])
+    print("==> " + str(ok) + " of " + str(len(results)) + " scripts compiled successfully.")
+    return results
+
+def print_result(result):
+    if result["ok"]:
+        outputs = result["output"] if result["json"] == None else result["output"] + ", " + result["json"]
+        print("[OK]    " + result["file"] + " -> " + outputs + " (%.2f s)" % result["time"])
+    else:
+        print("[ERROR] " + result["file"] + " (%.2f s)" % result["time"])
+    # as mensagens de erro e os avisos sao exibidos. As linhas dos passos concluidos ("... (OK)") sao omitidas
+    for line in result["messages"].splitlines():
+        if not line.endswith("(OK)"):
+            print("        " + line)
+
+
+if __name__ == "__main__":
+    results = compile_batch(batch_files(sys.argv[1]))
+    if not all(result["ok"] for result in results):
+        exit(1)
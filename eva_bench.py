@@ -0,0 +1,286 @@
+"""
+Benchmark do compilador EvaML.
+Gera scripts EvaML sintéticos (válidos no evaml_schema.xsd) com tamanho, profundidade, uso de macros,
+quantidade de loops e densidade de gotos configuráveis, e mede cada etapa do compilador separadamente:
+tempo (wall e cpu) e pico de memória. Os resultados são gravados em Json para que execuções possam ser comparadas.
+
+Uso:
+    python3 eva_bench.py --nodes=1000,10000,50000 [--depth=3] [--macros=10] [--macro-uses=0.05]
+                         [--loops=0.05] [--switches=0.05] [--gotos=0.1] [--repeat=3] [--seed=0] [--out=bench.json]
+    python3 eva_bench.py --nodes=5000 --write-script=codes-xml/bench.xml   # apenas grava o script gerado
+    python3 eva_bench.py --compare=antes.json,depois.json                 # compara duas execucoes
+    python3 eva_bench.py --nodes=20000 --cache        # tambem compara a compilacao completa sem e com o cache (eva_cache)
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+import eva_cache
+import eva_compiler
+import eva_profile
+import eva_validator
+
+
+###############################################################################
+# gerador de scripts sinteticos                                                #
+###############################################################################
+# parametros:
+#   nodes      - numero de comandos do script (antes da expansao das macros e dos loops)
+#   depth      - profundidade maxima dos <loop> e <switch> aninhados
+#   macros     - numero de macros definidas. A macro i usa a macro i - 1 com probabilidade 0.5 (macros aninhadas)
+#   macro_uses - probabilidade de um comando ser um <useMacro>
+#   loops      - probabilidade de um comando ser um <loop>
+#   switches   - probabilidade de um comando ser um <switch>
+#   gotos      - probabilidade de um <case> terminar com um <goto> para um <talk> anterior
+def generate_script(nodes = 1000, depth = 2, macros = 5, macro_uses = 0.05, loops = 0.05, switches = 0.05, gotos = 0.1, seed = 0, name = "Benchmark"):
+    rng = random.Random(seed)
+    count = [0] # comandos gerados no script
+    labels = [] # ids dos <talk> que podem ser alvo de um <goto>
+
+    root = ET.Element("evaml", {"name": name})
+    settings = ET.SubElement(root, "settings")
+    ET.SubElement(settings, "voice", {"tone": "pt-BR_IsabelaV3Voice"})
+    ET.SubElement(settings, "lightEffects", {"mode": "ON"})
+    ET.SubElement(settings, "audioEffects", {"mode": "ON"})
+    script = ET.SubElement(root, "script")
+
+    # comando simples (sem filhos)
+    def simple_command(parent, label = True):
+        n = count[0]
+        r = rng.random()
+        if r < 0.5:
+            talk = ET.SubElement(parent, "talk")
+            talk.text = "Talk number " + str(n) + ", x is #x"
+            if label and gotos > 0 and rng.random() < 0.1:
+                talk.attrib["id"] = "T" + str(n)
+                labels.append(talk.attrib["id"])
+        elif r < 0.7:
+            ET.SubElement(parent, "wait", {"duration": str(rng.randint(1, 2000))})
+        elif r < 0.85:
+            ET.SubElement(parent, "counter", {"var": "x", "op": rng.choice(["=", "+", "*"]), "value": str(rng.randint(0, 9))})
+        else:
+            ET.SubElement(parent, "light", {"state": "ON", "color": rng.choice(["RED", "GREEN", "BLUE", "WHITE"])})
+
+    # um comando qualquer. Os loops e os switches recebem um bloco de comandos
+    def command(parent, level):
+        count[0] += 1
+        r = rng.random()
+        if level < depth and r < loops:
+            loop = ET.SubElement(parent, "loop", {"times": str(rng.randint(1, 5))})
+            block(loop, level + 1)
+        elif level < depth and r < loops + switches:
+            switch = ET.SubElement(parent, "switch", {"var": "x"})
+            for value in range(rng.randint(1, 3)):
+                case = ET.SubElement(switch, "case", {"op": "eq", "value": str(value)})
+                block(case, level + 1)
+                if labels and rng.random() < gotos:
+                    ET.SubElement(case, "goto", {"target": rng.choice(labels)})
+            if rng.random() < 0.5:
+                block(ET.SubElement(switch, "default"), level + 1)
+        elif macros > 0 and r < loops + switches + macro_uses:
+            ET.SubElement(parent, "useMacro", {"macro": "M" + str(rng.randrange(macros))})
+        else:
+            simple_command(parent)
+
+    def block(parent, level):
+        for i in range(rng.randint(1, 4)):
+            if count[0] >= nodes:
+                break
+            command(parent, level)
+
+    ET.SubElement(script, "counter", {"var": "x", "op": "=", "value": "0"}) # a variavel dos switches
+    count[0] += 1
+    while count[0] < nodes:
+        command(script, 0)
+
+    if macros > 0:
+        macros_node = ET.SubElement(root, "macros")
+        for i in range(macros):
+            macro = ET.SubElement(macros_node, "macro", {"id": "M" + str(i)})
+            for j in range(rng.randint(2, 5)):
+                simple_command(macro, label = False) # um id dentro de uma macro seria duplicado a cada uso
+            if i > 0 and rng.random() < 0.5:
+                ET.SubElement(macro, "useMacro", {"macro": "M" + str(i - 1)})
+
+    return ET.ElementTree(root)
+
+
+###############################################################################
+# medicao das etapas                                                           #
+###############################################################################
+# compila o script (bytes) uma vez, medindo cada etapa (eva_profile). Retorna {etapa: medida} e o root compilado
+# com trace_memory = True, o pico de memoria de cada etapa e' medido com tracemalloc (o que deixa a etapa mais lenta)
+def run_once(data, trace_memory = False):
+    with contextlib.redirect_stdout(io.StringIO()): # as mensagens das etapas nao fazem parte da medicao
+        tree, report = eva_profile.run_stages(io.BytesIO(data), trace_memory = trace_memory)
+    if tree == None:
+        raise ValueError("the script could not be compiled (stage " + report[-1]["stage"] + ")")
+    return {measure["stage"]: measure for measure in report}, tree.getroot()
+
+# mede todas as etapas para um script. repeat execucoes medem o tempo e uma execucao extra mede a memoria
+def bench_script(tree, repeat = 3):
+    data = io.BytesIO()
+    tree.write(data, "UTF-8")
+    data = data.getvalue()
+    input_nodes = sum(1 for _ in tree.getroot().find("script").iter()) - 1
+
+    eva_validator.get_validator() # o validador e' carregado antes das medicoes
+    runs = []
+    for i in range(repeat):
+        measures, root = run_once(data)
+        runs.append(measures)
+    memory, root = run_once(data, trace_memory = True)
+
+    stages = {}
+    for stage_name, stage in eva_profile.STAGES:
+        walls = [run[stage_name]["wall"] for run in runs]
+        cpus = [run[stage_name]["cpu"] for run in runs]
+        stages[stage_name] = {
+            "wall_min": min(walls),
+            "wall_median": statistics.median(walls),
+            "cpu_min": min(cpus),
+            "peak_memory": memory[stage_name]["peak_memory"],
+            "nodes": memory[stage_name]["nodes"],
+            "links": memory[stage_name]["links"]}
+    return {
+        "script_bytes": len(data),
+        "input_nodes": input_nodes,
+        "expanded_nodes": eva_profile.count_nodes(root),
+        "links": eva_profile.count_links(root),
+        "stages": stages,
+        "total_wall_min": sum(stage["wall_min"] for stage in stages.values())}
+
+# compara a compilacao completa (eva_compiler) sem o cache e com o cache (eva_cache), em um diretorio de cache temporario:
+#   cold      - primeira compilacao do script (o resultado e' gravado no cache)
+#   unchanged - o mesmo script, compilado de novo
+#   edited    - o script com o texto de um <talk> alterado (o caso de quem edita e salva o script)
+# retorna o menor tempo (wall) de cada caso
+def bench_cache(tree, repeat = 3):
+    data = io.BytesIO()
+    tree.write(data, "UTF-8")
+    data = data.getvalue()
+    edited = data.replace(b"</talk>", b" (edited)</talk>", 1)
+
+    def compile_time(source, use_cache):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            eva_compiler.compile_evaml(io.BytesIO(source), use_cache = use_cache)
+            return time.perf_counter() - start
+
+    eva_validator.get_validator()
+    times = {"no_cache": [], "cold": [], "unchanged": [], "edited": []}
+    cache_dir = eva_cache.CACHE_DIR
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        eva_cache.CACHE_DIR = tmp_dir
+        try:
+            for i in range(repeat):
+                for entry in os.scandir(tmp_dir): # cada repeticao comeca com o cache vazio
+                    os.remove(entry.path)
+                times["no_cache"].append(compile_time(data, False))
+                times["cold"].append(compile_time(data, True))
+                times["unchanged"].append(compile_time(data, True))
+                times["edited"].append(compile_time(edited, True))
+        finally:
+            eva_cache.CACHE_DIR = cache_dir
+    return {case: min(walls) for case, walls in times.items()}
+
+# executa o benchmark para cada tamanho de script. Os demais parametros sao os de generate_script
+# com cache = True, a compilacao completa tambem e' medida sem e com o cache do compilador (bench_cache)
+def run_benchmark(sizes, repeat = 3, cache = False, **params):
+    results = {
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "params": params,
+        "runs": []}
+    for nodes in sizes:
+        tree = generate_script(nodes, **params)
+        result = bench_script(tree, repeat)
+        if cache:
+            result["cache"] = bench_cache(tree, repeat)
+        result["nodes"] = nodes
+        print_run(result)
+        results["runs"].append(result)
+    return results
+
+
+###############################################################################
+# relatorios                                                                   #
+###############################################################################
+def print_run(result):
+    print("==> " + str(result["nodes"]) + " nodes (" + str(result["expanded_nodes"]) + " after expansion, " + str(result["links"]) + " links, " + str(result["script_bytes"]) + " bytes)")
+    print("    %-10s %12s %12s %12s %14s" % ("stage", "wall min(s)", "wall med(s)", "cpu min(s)", "peak mem(KiB)"))
+    for stage_name, stage in result["stages"].items():
+        print("    %-10s %12.4f %12.4f %12.4f %14.1f" % (stage_name, stage["wall_min"], stage["wall_median"], stage["cpu_min"], stage["peak_memory"] / 1024))
+    print("    %-10s %12.4f" % ("total", result["total_wall_min"]))
+    if "cache" in result:
+        print("    full compile (wall min): no cache %.4f s | cache: cold %.4f s, unchanged %.4f s, edited %.4f s" % (
+              result["cache"]["no_cache"], result["cache"]["cold"], result["cache"]["unchanged"], result["cache"]["edited"]))
+
+# compara dois arquivos de resultado (mesmos tamanhos de script). Imprime a razao depois/antes do tempo de cada etapa
+def compare(before_file, after_file):
+    with open(before_file) as before_json, open(after_file) as after_json:
+        before, after = json.load(before_json), json.load(after_json)
+    before_runs = {run["nodes"]: run for run in before["runs"]}
+    for run in after["runs"]:
+        if run["nodes"] not in before_runs:
+            continue
+        old = before_runs[run["nodes"]]
+        print("==> " + str(run["nodes"]) + " nodes (after / before, wall min)")
+        for stage_name, stage in run["stages"].items():
+            if stage_name in old["stages"] and old["stages"][stage_name]["wall_min"] > 0:
+                print("    %-10s %8.2fx  (%.4f s -> %.4f s)" % (stage_name, stage["wall_min"] / old["stages"][stage_name]["wall_min"], old["stages"][stage_name]["wall_min"], stage["wall_min"]))
+        print("    %-10s %8.2fx" % ("total", run["total_wall_min"] / old["total_wall_min"]))
+
+
+if __name__ == "__main__":
+    sizes = [1000, 10000]
+    repeat = 3
+    out_file = "bench.json"
+    script_file = None
+    cache = False
+    params = {}
+    int_params = {"--depth=": "depth", "--macros=": "macros", "--seed=": "seed"}
+    float_params = {"--macro-uses=": "macro_uses", "--loops=": "loops", "--switches=": "switches", "--gotos=": "gotos"}
+    for p in sys.argv[1:]:
+        flag = p[:p.find("=") + 1]
+        value = p[len(flag):]
+        if flag == "--nodes=":
+            sizes = [int(n) for n in value.split(",")]
+        elif flag == "--repeat=":
+            repeat = int(value)
+        elif flag == "--out=":
+            out_file = value
+        elif flag == "--write-script=":
+            script_file = value
+        elif p == "--cache":
+            cache = True
+        elif flag == "--compare=":
+            compare(*value.split(","))
+            exit(0)
+        elif flag in int_params:
+            params[int_params[flag]] = int(value)
+        elif flag in float_params:
+            params[float_params[flag]] = float(value)
+        else:
+            print("  Error -> Unknown option: " + p)
+            exit(1)
+
+    if script_file != None: # apenas grava o script gerado (ex.: para compilar com o eva_parser.py)
+        generate_script(sizes[0], **params).write(script_file, "UTF-8")
+        exit(0)
+
+    results = run_benchmark(sizes, repeat, cache, **params)
+    with open(out_file, "w") as results_file:
+        json.dump(results, results_file, indent = 2)
+    print('==> Results saved in "' + out_file + '".')
@@ -0,0 +1,96 @@
+import hashlib
+import struct
+import sys
+import eva_xml
+
+# geracao do programa binario (.evab) para o EvaSIM, a partir do script compilado (com chaves e links)
+# o EvaSIM carrega o arquivo com uma unica leitura, sem o parsing do xml (evasim/eva_program.py)
+#
+# formato (little-endian):
+#   cabecalho     HEADER: magic "EVAB", versao, flags, sha256 do restante do arquivo e o tamanho de cada tabela
+#   strings       n_strings offsets (u32) do fim de cada string, seguidos dos bytes (utf-8) de todas as strings
+#                 tags, nomes e valores de atributos e textos aparecem uma unica vez (interned)
+#   instrucoes    n_instr registros INSTR, na ordem do documento (<evaml>, <settings> e <script>, sem a secao <links>):
+#                 key (-1 para os elementos sem chave), tag, texto (NO_STRING se nao houver), atributos (inicio e quantidade),
+#                 indice do pai (-1 para o <evaml>) e sucessores (inicio e quantidade)
+#   atributos     n_attrs pares ATTR (nome, valor), indices da tabela de strings
+#   sucessores    n_succ indices (u32) de instrucoes. Os links ja resolvidos, na ordem dos links de cada node
+
+MAGIC = b"EVAB"
+VERSION = 1
+NO_STRING = 0xFFFFFFFF
+HEADER = struct.Struct("<4sHH32sIIIII") # magic, versao, flags, sha256, n_strings, strings_size, n_instr, n_attrs, n_succ
+INSTR = struct.Struct("<iIIIIiII") # key, tag, texto, attr_start, attr_count, parent, succ_start, succ_count
+ATTR = struct.Struct("<II")
+
+
+# gera os bytes do programa binario a partir do root compilado
+def program_bytes(evaml_root):
+    strings = {} # string -> indice na tabela
+    def intern(text):
+        if text not in strings:
+            strings[text] = len(strings)
+        return strings[text]
+
+    # instrucoes: todos os elementos, exceto a secao <links>
+    elems = []
+    parents = []
+    pending = [(evaml_root, -1)]
+    while pending: # percorre a arvore na ordem do documento
+        elem, parent = pending.pop()
+        if elem.tag == "links" and parent == 0:
+            continue
+        index = len(elems)
+        elems.append(elem)
+        parents.append(parent)
+        pending.extend((child, index) for child in reversed(elem))
+    index_of_key = {int(elem.attrib["key"]): i for i, elem in enumerate(elems) if elem.get("key") != None}
+
+    successors = [[] for elem in elems]
+    links_node = evaml_root.find("links")
+    if links_node != None:
+        for link in links_node:
+            successors[index_of_key[int(link.attrib["from"])]].append(index_of_key[int(link.attrib["to"])])
+
+    instr = bytearray()
+    attrs = bytearray()
+    succ = bytearray()
+    n_attrs = 0
+    n_succ = 0
+    for i, elem in enumerate(elems):
+        key = int(elem.attrib["key"]) if elem.get("key") != None else -1
+        text = intern(elem.text) if elem.text != None and (len(elem) == 0 or elem.text.strip() != "") else NO_STRING
+        instr += INSTR.pack(key, intern(elem.tag), text, n_attrs, len(elem.attrib), parents[i], n_succ, len(successors[i]))
+        for name, value in elem.attrib.items():
+            attrs += ATTR.pack(intern(name), intern(value))
+            n_attrs += 1
+        for index in successors[i]:
+            succ += struct.pack("<I", index)
+            n_succ += 1
+
+    offsets = bytearray()
+    blob = bytearray()
+    for text in strings: # os dicts preservam a ordem de insercao, que e' a ordem dos indices
+        blob += text.encode("utf-8")
+        offsets += struct.pack("<I", len(blob))
+
+    payload = bytes(offsets + blob + instr + attrs + succ)
+    header = HEADER.pack(MAGIC, VERSION, 0, hashlib.sha256(payload).digest(), len(strings), len(blob), len(elems), n_attrs, n_succ)
+    return header + payload
+
+# grava o programa binario no arquivo bin_file
+def write_program(evaml_root, bin_file):
+    data = program_bytes(evaml_root)
+    with open(bin_file, "wb") as file_out:
+        file_out.write(data)
+    return evaml_root
+
+# nome do arquivo do programa binario de um script compilado
+def output_file_name(evaml_root):
+    return evaml_root.attrib["name"] + "_EvaML.evab"
+
+
+if __name__ == "__main__":
+    tree = eva_xml.parse(sys.argv[1]) # arquivo de codigo xml compilado (_EvaML.xml)
+    root = tree.getroot() # evaml root node
+    write_program(root, output_file_name(root))
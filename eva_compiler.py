@@ -0,0 +1,64 @@
+"""
+Compilador EvaML em um único processo.
+As etapas (validação, expansão das macros e dos loops, geração das chaves e geração dos links)
+são executadas sobre a mesma ElementTree, em memória, sem a criação dos arquivos temporários
+_macros.xml e _node_keys.xml e sem iniciar um novo interpretador Python para cada etapa.
+
+Uso:
+    import eva_compiler
+    tree = eva_compiler.compile_evaml("codes-xml/script.xml")
+    if tree != None:
+        tree.write(tree.getroot().attrib["name"] + "_EvaML.xml", "UTF-8")
+"""
+
+import eva_xml # leitura do xml (ElementTree ou lxml, EVAML_XML). A arvore gravada e' a mesma nos dois
+import eva_cache # cache do resultado de cada documento (opcional)
+import eva_validator # validacao (validador gerado a partir do xsd, com o xmlschema como referencia)
+import eva_macro_exp # etapa 01
+import eva_node_keys # etapa 02
+import eva_xml_links # etapa 03
+import eva_optimizer # otimizacao do grafo (opcional)
+
+
+# source pode ser o caminho de um arquivo, um objeto file ou uma ElementTree ja carregada.
+# retorna a ElementTree compilada ou None, caso haja erro. Sem o cache, uma ElementTree recebida e' compilada no lugar e
+# retornada. Com o cache, o resultado e' sempre uma nova ElementTree (a arvore recebida nao e' alterada).
+# as mensagens de erro e de aviso de cada etapa são impressas no terminal, como na versão em linha de comando.
+# com defaults = True, os atributos omitidos recebem os valores default definidos no schema.
+# com use_cache = True, o resultado de um script que nao mudou e' lido do cache em disco (eva_cache), sem executar as etapas.
+# com optimize = True, o grafo de execucao e' otimizado depois da geracao dos links (eva_optimizer).
+def compile_evaml(source, defaults = False, use_cache = False, optimize = False):
+    if use_cache:
+        tree = eva_cache.compile_evaml(source, compile_stages, defaults)
+    else:
+        tree = compile_stages(source, defaults)
+
+    if tree != None and optimize:
+        eva_optimizer.optimize(tree.getroot())
+    return tree
+
+# etapas 01, 02 e 03, sem o cache
+def compile_stages(source, defaults = False):
+    tree = eva_validator.evaml_validator(source, defaults) # o arquivo é lido uma única vez (validação + parsing)
+    if tree == None: # erro de validação
+        return None
+
+    root = tree.getroot() # evaml root node
+
+    # step 01 - expanding macros
+    if eva_macro_exp.expand(root) == None:
+        return None
+
+    # step 02 - generating keys
+    eva_node_keys.node_keys(root)
+
+    # step 03 - generating the links
+    if eva_xml_links.xml_links(root) == None:
+        return None
+
+    return tree
+
+
+# nome do arquivo de saída (para o EvaSIM) de um script compilado
+def output_file_name(tree):
+    return tree.getroot().attrib['name'] + "_EvaML.xml"
@@ -0,0 +1,108 @@
+"""
+Daemon do compilador EvaML.
+Um processo residente recebe pedidos de compilação por um socket Unix (SOCKET_FILE). Cada pedido é o conteúdo
+de um script e a resposta traz o _EvaML.xml, o Json do robô (opcional), a análise do grafo e as mensagens
+de cada etapa. Os pedidos são atendidos ao mesmo tempo por um pool de processos, com o schema já carregado.
+
+Uso:
+    python3 eva_daemon.py [--jobs=N]      # inicia o daemon (termina com Ctrl+C)
+    python3 eva_parser.py codes-xml/script.xml -c   # usa o daemon, caso ele esteja rodando
+
+O protocolo e o cliente (is_running, compile_remote) ficam no eva_daemon_client.py, que não carrega o compilador.
+"""
+
+import base64
+import contextlib
+import io
+import os
+import signal
+import socketserver
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import eva_batch
+import eva_compiler
+import eva_json_gen
+import eva_validator
+import eva_xml_links
+from eva_daemon_client import SOCKET_FILE, send_message, recv_message, is_running
+
+
+###############################################################################
+# compilacao (executada nos processos do pool)                                 #
+###############################################################################
+# compila o conteudo (bytes) de um script. Retorna a resposta do pedido
+def compile_script(script, json_output = False, use_cache = False, optimize = False):
+    response = {"ok": False, "name": None, "evaml": None, "json": None, "graph": None, "messages": ""}
+    messages = io.StringIO()
+    with contextlib.redirect_stdout(messages):
+        try:
+            tree = eva_compiler.compile_evaml(io.BytesIO(script), use_cache = use_cache, optimize = optimize)
+            if tree != None:
+                root = tree.getroot()
+                evaml = io.BytesIO()
+                tree.write(evaml, "UTF-8") # o mesmo conteudo que o eva_parser.py grava no "name"_EvaML.xml
+                response["name"] = root.attrib["name"]
+                response["evaml"] = evaml.getvalue().decode("utf-8")
+                response["graph"] = eva_xml_links.graph_report
+                response["ok"] = True
+                if json_output:
+                    json_out = io.StringIO()
+                    response["ok"] = eva_json_gen.json_gen(root, json_out) != None
+                    if response["ok"]:
+                        response["json"] = json_out.getvalue()
+        except Exception: # um erro inesperado em um pedido nao derruba o daemon
+            print(traceback.format_exc(), end = "")
+    response["messages"] = messages.getvalue()
+    return response
+
+
+###############################################################################
+# servidor                                                                     #
+###############################################################################
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = recv_message(self.request)
+            script = base64.b64decode(request["script"])
+            future = self.server.pool.submit(compile_script, script, request.get("json", False), request.get("use_cache", False), request.get("optimize", False))
+            send_message(self.request, future.result())
+        except (ConnectionError, ValueError, KeyError): # pedido invalido ou cliente desconectado
+            pass
+
+# cada conexao e' atendida por uma thread, que espera o resultado do pool de processos
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+# inicia o daemon e atende os pedidos ate' Ctrl+C. jobs = None usa um processo por cpu
+def serve(socket_file = SOCKET_FILE, jobs = None):
+    if is_running(socket_file):
+        print("  Error -> The compiler daemon is already running (" + socket_file + ").")
+        return False
+    if os.path.exists(socket_file): # socket de um daemon que nao foi finalizado corretamente
+        os.remove(socket_file)
+
+    eva_validator.get_validator() # confere o validador gerado com o xsd antes de iniciar os processos do pool
+    with ProcessPoolExecutor(max_workers = jobs, initializer = eva_batch.init_worker) as pool:
+        server = _Server(socket_file, _Handler)
+        server.pool = pool
+        print('==> Compiler daemon listening on "' + socket_file + '". Press Ctrl+C to stop.')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n==> Compiler daemon finished.")
+        finally:
+            server.server_close()
+            os.remove(socket_file)
+    return True
+
+
+if __name__ == "__main__":
+    jobs = None
+    for p in sys.argv:
+        if p.startswith('--jobs='):
+            jobs = int(p[len('--jobs='):])
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0)) # kill: o socket tambem e' removido
+    if not serve(jobs = jobs):
+        exit(1)
@@ -0,0 +1,67 @@
+"""
+Cliente do daemon do compilador EvaML (eva_daemon.py) e o protocolo usado pelos dois lados.
+Este módulo usa apenas a biblioteca padrão: quem envia um script ao daemon (ex.: eva_parser.py -c, editores, CI)
+não carrega o compilador, o schema nem o pool de processos.
+
+Uso:
+    import eva_daemon_client
+    if eva_daemon_client.is_running():
+        response = eva_daemon_client.compile_remote(bytes_do_script, json_output = True)
+
+Protocolo: cada mensagem (pedido ou resposta) e' um objeto Json em UTF-8, precedido pelo seu tamanho (8 bytes, little-endian).
+    pedido:   {"script": bytes do script em base64, "json": bool, "use_cache": bool, "optimize": bool}
+    resposta: {"ok": bool, "name": str, "evaml": str, "json": str ou null, "graph": dict ou null, "messages": str}
+"""
+
+import base64
+import json
+import socket
+
+SOCKET_FILE = ".evaml_daemon.sock"
+MAX_MESSAGE = 256 * 1024 * 1024 # pedidos maiores que isso sao recusados
+
+
+###############################################################################
+# protocolo                                                                    #
+###############################################################################
+def send_message(sock, message):
+    data = json.dumps(message, ensure_ascii = False).encode("utf-8")
+    sock.sendall(len(data).to_bytes(8, "little") + data)
+
+def recv_exactly(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("connection closed by the other side")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def recv_message(sock):
+    size = int.from_bytes(recv_exactly(sock, 8), "little")
+    if size > MAX_MESSAGE:
+        raise ConnectionError("message too large")
+    return json.loads(recv_exactly(sock, size).decode("utf-8"))
+
+
+###############################################################################
+# cliente                                                                      #
+###############################################################################
+def is_running(socket_file = SOCKET_FILE):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_file)
+        return True
+    except OSError: # o socket nao existe ou ninguem esta escutando
+        return False
+
+# envia o script (bytes) ao daemon e retorna a resposta ou None, caso o daemon nao esteja rodando
+def compile_remote(script, json_output = False, use_cache = False, socket_file = SOCKET_FILE, optimize = False):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_file)
+            send_message(sock, {"script": base64.b64encode(script).decode("ascii"), "json": json_output, "use_cache": use_cache, "optimize": optimize})
+            return recv_message(sock)
+    except OSError: # inclui ConnectionError
+        return None
@@ -1,521 +1,403 @@
+import os
 import sys
-import xml.etree.ElementTree as ET
-
-tree = ET.parse(sys.argv[1])  # arquivo de codigo xml
-root = tree.getroot() # evaml root node
-script_node = root.find("script")
-output = ""
-gohashid = 0
-
-# percorre os elementos xml mapeando-os nos respectivos no modelo Json do Eva
-def mapping_xml_to_json():
-    global output
-    # conjunto de nodes abstratos que nao sao mapeados no Json do robô
-    excluded_nodes = set(['script', 'switch', 'stop', 'goto'])
-    for elem in script_node.iter():
-        if not(elem.tag in excluded_nodes):
-
-            if (elem.tag == 'motion'):
-                output += ",\n"
-                output += motion_process(elem)
-
-            if (elem.tag == 'audio'):
-                output += ",\n"
-                output += audio_process(elem)
-
-            if (elem.tag == 'light'):
-                output += ",\n"
-                output += light_process(elem)
-
-            if (elem.tag == 'led'):
-                output += ",\n"
-                output += led_process(elem)
-
-            if (elem.tag == 'wait'):
-                output += ",\n"
-                output += wait_process(elem)
-
-            if (elem.tag == 'talk'):
-                output += ",\n"
-                output += talk_process(elem)
-
-            if (elem.tag == 'random'):
-                output += ",\n"
-                output += random_process(elem)
-
-            if (elem.tag == 'listen'):
-                output += ",\n"
-                output += listen_process(elem)
-
-            if (elem.tag == 'counter'):
-                output += ",\n"
-                output += counter_process(elem)
-
-            if (elem.tag == 'evaEmotion'):
-                output += ",\n"
-                output += eva_emotion_process(elem)
-
-            if (elem.tag == 'userEmotion'):
-                output += ",\n"
-                output += user_emotion_process(elem)
-
-            if (elem.tag == 'case'):
-                output += ",\n"
-                output += case_process(elem)
-
-            # default é um caso especial do comando case, onde value = ""
-            if (elem.tag == 'default'):
-                output += ",\n"
-                output += case_process(elem)
-
-
-# head processing (generates the head of json file)
-def head_process(node):
-    node.attrib["key"] = str(0)
-    init = """{
-  "_id": """ + '"' + node.attrib["id"] + '",' + """
-  "nombre": """ + '"' + node.attrib['name'] + '",' + """
-  "data": {
-    "node": [
-"""
-    return init
-
-# processing the settings nodes
-# always be the first node in the interaccion
-def settings_process(node):
-    return voice_process(node.find("voice"))
-    # processar lightEffects
-    # processar audioEffects
+import json
+import eva_xml
+
+# etapa 04 - geracao do script Json do robô
+# cada elemento do script compilado (_EvaML.xml) e' mapeado em um registro (dict) do modelo Json do Eva
+# os registros sao gravados no arquivo, um a um, a partir de modelos de texto gerados pelo codificador json. A saida inteira nunca fica na memoria
+
+# interrompe a geracao do Json quando um erro e' encontrado. A mensagem ja foi impressa.
+class _JsonGenError(Exception):
+    pass
+
+# configuracoes da secao <settings> que afetam o mapeamento dos nodes. Lidas uma unica vez, em json_gen()
+settings = {"audio_off": False, "light_off": False}
+
+# tabelas de mapeamento dos valores EvaML para os valores do robô
+counter_op_map = {"=": "assign", "+": "sum", "*": "mul", "/": "div", "%": "rest"}
+
+color_map = {"WHITE":"#ffffff", "BLACK":"#000000", "RED":"#ff0000", "PINK":"#e6007e", "GREEN":"#00ff00", "YELLOW":"#ffff00", "BLUE":"#0000ff"}
+
+motion_map = {
+    "YES": "n", # nao esta errado nao!!! yes é mapeado como "n" no robô
+    "NO": "s",
+    "CENTER": "c",
+    "LEFT": "l",
+    "RIGHT": "r",
+    "UP": "u",
+    "DOWN": "d",
+    "ANGRY": "a", # isso mesmo! Nao sei porque usa "a" para raiva
+    "2UP": "U",
+    "2DOWN": "D",
+    "2RIGHT": "R",
+    "2LEFT": "L"}
+
+led_map = {"STOP": "stop", "LISTEN": "escuchaT", "SPEAK": "hablaT_v2", "ANGRY": "anger", "HAPPY": "joy", "SAD": "sad", "SURPRISE": "surprise"}
+
+# compatibiliza com o Eva. O Eva usa joy, anger e ini. Os demais valores sao apenas convertidos para caixa baixa
+eva_emotion_map = {"HAPPY": "joy", "ANGRY": "anger", "NEUTRAL": "ini"}
+
+# traducao dos operadores lógicos. Nós usamos o mesmo padrão que NCL
+case_op_map = {"lt": "<", "gt": ">", "eq": "==", "lte": "<=", "gte": ">=", "ne": "!="} # ne: preciso verificar este. parece que os mexicanos nao implementaram o not.
+
+
+# busca o valor do atributo na tabela de mapeamento. Valores que o robô nao conhece geram erro
+def map_value(table, command, attr_name):
+    value = command.attrib[attr_name]
+    if value not in table:
+        print('  Error -> The value "' + value + '" of the "' + attr_name + '" attribute of <' + command.tag + '> is not supported by the EVA robot.')
+        raise _JsonGenError()
+    return table[value]
+
 
 # audio node processing #########################################################################
 def audio_process(audio_command):
-    global gohashid
-
     audio_source = audio_command.attrib['source']
     # audioEffects settings processing
-    if root.find("settings").find("audioEffects") != None:
-      if root.find("settings").find("audioEffects").attrib["mode"] == "OFF":
-        # mode off implies the use of MUTED-SOUND file 
+    if settings["audio_off"]:
+        # mode off implies the use of MUTED-SOUND file
         audio_source = "MUTED-SOUND"
 
-    audio_node = """      {
-        "key": """ + audio_command.attrib["key"] + """,
+    return {
+        "key": int(audio_command.attrib["key"]),
         "name": "Audio",
         "type": "sound",
         "color": "lightblue",
-        "isGroup": false,
-        "src": """ + '"' + audio_source + '",' + """
-        "wait": """ + audio_command.attrib['block'].lower() + ',' + """
-        "__gohashid": """ + str(gohashid) + """
-      }"""
-    gohashid += 1
-    return audio_node
+        "isGroup": False,
+        "src": audio_source,
+        "wait": audio_command.attrib['block'] == "TRUE"}
 
 # counter node processing #########################################################################
 def counter_process(counter_command):
-    global gohashid
-
-    if counter_command.attrib['op'] == "=":
-      op_eva = "assign"
-    elif counter_command.attrib['op'] == "+":
-      op_eva = "sum"
-    elif counter_command.attrib['op'] == "*":
-      op_eva = "mul"
-    elif counter_command.attrib['op'] == "/":
-      op_eva = "div"
-    elif counter_command.attrib['op'] == "%":
-      op_eva = "rest"
-
-    counter_node = """      {
-        "key": """ + counter_command.attrib["key"] + """,
+    return {
+        "key": int(counter_command.attrib["key"]),
         "name": "Counter",
         "type": "counter",
         "color": "lightblue",
-        "isGroup": false,
+        "isGroup": False,
         "group": "",
-        "count": """ + '"' + counter_command.attrib['var'] + '",' + """
-        "ops": """ + '"' + op_eva + '",' + """
-        "value": """ + counter_command.attrib['value'] + ',' + """
-        "__gohashid": """ + str(gohashid) + """
-      }"""
-    gohashid += 1
-    return counter_node
+        "count": counter_command.attrib['var'],
+        "ops": map_value(counter_op_map, counter_command, 'op'),
+        "value": int(counter_command.attrib['value'])}
 
 
 # light node processing #########################################################################
 def light_process(light_command):
-    global gohashid
-
     bulb_state = light_command.attrib['state']
     if bulb_state == "OFF": # a ideia é admitir a ausencia do parametro color quando o estado da lampada for off
-      light_command.attrib['color'] = "BLACK" # mesmo se o atributo não tiver sido setado, ele será setado aqui
-    
-    if (bulb_state == "ON") and (light_command.get("color") == None): 
-      light_command.attrib['color'] = "WHITE" # default color "white" mesmo se o atributo não tiver sido setado, ele será setado aqui
-    
-    color = light_command.attrib['color']
-    color_map = {"WHITE":"#ffffff", "BLACK":"#000000", "RED":"#ff0000", "PINK":"#e6007e", "GREEN":"#00ff00", "YELLOW":"#ffff00", "BLUE":"#0000ff"}
-    if color_map.get(color) != None:
-        color = color_map.get(color)
-
-
-    # lightEffects settings processing #########################################################################
-    if root.find("settings").find("lightEffects") != None:
-      if root.find("settings").find("lightEffects").attrib["mode"] == "OFF":
-        # mode off implies bulb_state off 
+        color = "BLACK"
+    else: # default color "white" quando o atributo não tiver sido setado
+        color = light_command.get('color', "WHITE")
+    color = color_map.get(color, color)
+
+    # lightEffects settings processing
+    if settings["light_off"]:
+        # mode off implies bulb_state off
         bulb_state = "OFF"
 
-    light_node = """      {
-        "key": """ + light_command.attrib["key"] + """,
+    return {
+        "key": int(light_command.attrib["key"]),
         "name": "Light",
         "type": "light",
         "color": "#ffa500",
-        "isGroup": false,
+        "isGroup": False,
         "group": "",
-        "lcolor": """ + '"' + color + '",' + """
-        "state": """ + '"' + bulb_state.lower() + '",' + """
-        "__gohashid": """ + str(gohashid) + """
-      }"""
-    gohashid += 1
-    return light_node
+        "lcolor": color,
+        "state": bulb_state.lower()}
 
 
-# listen node processing 
+# listen node processing
 ####################################################################################### falta implementar os filtros
 def listen_process(listen_command):
-    global gohashid
-    
-    listen_node = """      {
-        "key": """ + listen_command.attrib["key"] + """,
+    return {
+        "key": int(listen_command.attrib["key"]),
         "name": "Listen",
         "type": "listen",
         "color": "#ffff00",
-        "isGroup": false,
-        "opt": "",
-        "__gohashid": """ + str(gohashid) + """
-      }"""
-    gohashid += 1
-    return listen_node
+        "isGroup": False,
+        "opt": ""}
 
 
 # motion type processing #########################################################################
 def motion_process(motion_command):
-    global gohashid
-
-    # mapping 
-    if motion_command.attrib['type'] == "YES": # 
-      type = "n" # nao esta errado nao!!! yes é mapeado como "n" no robô
-    elif motion_command.attrib['type'] == "NO":
-      type = "s"
-    elif motion_command.attrib['type'] == "CENTER":
-      type = "c"
-    elif motion_command.attrib['type'] == "LEFT":
-      type = "l"
-    elif motion_command.attrib['type'] == "RIGHT":
-      type = "r"
-    elif motion_command.attrib['type'] == "UP":
-      type = "u"
-    elif motion_command.attrib['type'] == "DOWN":
-      type = "d"
-    elif motion_command.attrib['type'] == "ANGRY":
-      type = "a" # isso mesmo! Nao sei porque usa "a" para raiva
-    elif motion_command.attrib['type'] == "2UP":
-      type = "U"
-    elif motion_command.attrib['type'] == "2DOWN":
-      type = "D"
-    elif motion_command.attrib['type'] == "2RIGHT":
-      type = "R"
-    elif motion_command.attrib['type'] == "2LEFT":
-      type = "L"
-    
-    motion_node = """      {
-        "key": """ + motion_command.attrib["key"] + """,
+    return {
+        "key": int(motion_command.attrib["key"]),
         "name": "Motion",
         "type": "mov",
         "color": "lightblue",
-        "isGroup": false,
-        "mov": """ + '"' + type + '",' + """
-        "__gohashid": """ + str(gohashid) + """
-      }"""
-    gohashid += 1
-    return motion_node
+        "isGroup": False,
+        "mov": map_value(motion_map, motion_command, 'type')}
 
 
 # led animation processing #########################################################################
 def led_process(led_command):
-    global gohashid
-
-    # mapping 
-    if led_command.attrib['animation'] == "STOP": # just to show what is happening here
-      animation = "stop"
-    elif led_command.attrib['animation'] == "LISTEN":
-      animation = "escuchaT"
-    elif led_command.attrib['animation'] == "SPEAK":
-      animation = "hablaT_v2"
-    elif led_command.attrib['animation'] == "ANGRY":
-      animation = "anger"
-    elif led_command.attrib['animation'] == "HAPPY":
-      animation = "joy"
-    elif led_command.attrib['animation'] == "SAD":
-      animation = "sad"
-    elif led_command.attrib['animation'] == "SURPRISE":
-      animation = "surprise"
-    
-    led_node = """      {
-        "key": """ + led_command.attrib["key"] + """,
+    return {
+        "key": int(led_command.attrib["key"]),
         "name": "Leds",
         "type": "led",
         "color": "lightblue",
-        "isGroup": false,
+        "isGroup": False,
         "group": "",
-        "anim": """ + '"' + animation + '",' + """
-        "__gohashid": """ + str(gohashid) + """
-      }"""
-    gohashid += 1
-    return led_node
+        "anim": map_value(led_map, led_command, 'animation')}
 
 
 # talk node processing #########################################################################
 def talk_process(talk_command):
-    global gohashid
-
     # verifica se os atributos foram definidos
     if (talk_command.text == None):
-      print("  Error -> There is a <talk> command without a text.")
-      exit(1)
-    
-    talk_command.text = talk_command.text.replace("\n", " ") # remove os "enters", caso existam
-    talk_command.text = talk_command.text.replace("\t", " ") # remove os "tabs", caso existam
-
-    talk_node = """      {
-        "key": """ + talk_command.attrib["key"] + """,
+        print("  Error -> There is a <talk> command without a text.")
+        raise _JsonGenError()
+
+    return {
+        "key": int(talk_command.attrib["key"]),
         "name": "Talk",
         "type": "speak",
         "color": "#00ff00",
-        "isGroup": false,
-        "text": """ + '"' + talk_command.text + '",' + """
-        "__gohashid": """ + str(gohashid) + """
-      }"""
-    gohashid += 1
-    return talk_node
+        "isGroup": False,
+        "text": talk_command.text.replace("\n", " ").replace("\t", " ")} # remove os "enters" e os "tabs", caso existam
 
 
 # voice node processing #########################################################################
 def voice_process(voice_command):
-  global gohashid
-  voice_node = """      {
-        "key": """ + voice_command.attrib["key"] + """,
+    return {
+        "key": int(voice_command.attrib["key"]),
         "name": "Voice",
         "type": "voice",
         "color": "#0020ff",
-        "isGroup": false,
-        "voice": """ + '"' + voice_command.attrib['tone'] + '",' + """
-        "__gohashid": """ + str(gohashid) + """
-      }"""
-  gohashid += 1
-  return voice_node
+        "isGroup": False,
+        "voice": voice_command.attrib['tone']}
 
 # userEmotion node processing #########################################################################
 def user_emotion_process(user_emotion_command):
-  global gohashid
-  user_emotion_node = """      {
-        "key": """ + user_emotion_command.attrib["key"] + """,
+    return {
+        "key": int(user_emotion_command.attrib["key"]),
         "name": "User_Emotion",
         "type": "user_emotion",
         "color": "lightgreen",
-        "isGroup": false,
+        "isGroup": False,
         "group": "",
-        "vision": "capture",
-        "__gohashid": """ + str(gohashid) + """
-      }"""
-  gohashid += 1
-  return user_emotion_node
+        "vision": "capture"}
 
 
 # eva_emotion node processing #########################################################################
 def eva_emotion_process(eva_emotion_command):
-    global gohashid
-
     # speed 0 é o valor default. Não vejo necessidade de implementar isso
-
-    if eva_emotion_command.attrib['emotion'] == "HAPPY": # compatibiliza com o Eva. O Eva usa joy.
-      eva_emotion_command.attrib['emotion'] = "joy"
-
-    if eva_emotion_command.attrib['emotion'] == "ANGRY": # compatibiliza com o Eva.
-      eva_emotion_command.attrib['emotion'] = "anger"
-
-    if eva_emotion_command.attrib['emotion'] == "NEUTRAL": # compatibiliza com o Eva.
-      eva_emotion_command.attrib['emotion'] = "ini"
-
-    # attrib emotion "SAD" é o mesmo para "sad" para o robo
-    # o lower (só transforma para caixa baixa)
-
-    eva_emotion_node = """      {
-        "key": """ + eva_emotion_command.attrib["key"] + """,
+    emotion = eva_emotion_command.attrib['emotion']
+    return {
+        "key": int(eva_emotion_command.attrib["key"]),
         "name": "Eva_Emotion",
         "type": "emotion",
         "color": "lightcoral",
-        "isGroup": false,
+        "isGroup": False,
         "group": "",
-        "emotion": """ + '"' + eva_emotion_command.attrib['emotion'].lower() + '",' + """
+        "emotion": eva_emotion_map.get(emotion, emotion).lower(), # attrib emotion "SAD" é o mesmo que "sad" para o robo
         "level": 0,
-        "speed": 0,
-        "__gohashid": """ + str(gohashid) + """
-      }"""
-    gohashid += 1
-    return eva_emotion_node
+        "speed": 0}
 
 
 # random node processing #########################################################################
 def random_process(random_command):
-    global gohashid
-
-    random_node = """      {
-        "key": """ + random_command.attrib["key"] + """,
+    return {
+        "key": int(random_command.attrib["key"]),
         "name": "Random",
         "type": "random",
         "color": "pink",
-        "isGroup": false,
+        "isGroup": False,
         "group": "",
-        "min": """ + random_command.attrib['min'] + ',' + """
-        "max": """ + random_command.attrib['max'] + ',' + """
-        "__gohashid": """ + str(gohashid) + """
-      }"""
-    gohashid += 1
-    return random_node
+        "min": int(random_command.attrib['min']),
+        "max": int(random_command.attrib['max'])}
 
 
 # condition node (case and default) processing #########################################################################
+# default é um caso especial do comando case, onde value = ""
 def case_process(case_command):
-  global gohashid
-  
-  # traducao dos operadores lógicos. Nós usamos o mesmo padrão que NCL
-  if case_command.attrib['op'] == "lt":  op = "<"
-  if case_command.attrib['op'] == "gt":  op = ">"
-  if case_command.attrib['op'] == "eq":  op = "=="
-  if case_command.attrib['op'] == "lte": op = "<="
-  if case_command.attrib['op'] == "gte": op = ">="
-  if case_command.attrib['op'] == "ne":  op = "!=" # preciso verificar este.parece que os mexicanos nao implementaram o not.
-    
-  # verifica qual o tipo de comparacao para $. Exact ou contain
-  if case_command.attrib["op"] == "exact":
-    case_node = """      {
-        "key": """ + case_command.attrib["key"] + """,
-        "name": "Condition",
-        "type": "if",
-        "color": "white",
-        "isGroup": false,
-        "text": """ + '"' + case_command.attrib['value'] + '",' + """
-        "opt": 4,
-        "__gohashid": """ + str(gohashid) + """
-      }"""
-    gohashid += 1
-    return case_node
-
-  elif case_command.attrib["op"] == "contain": # se é "contain"
-    case_node = """      {
-        "key": """ + case_command.attrib["key"] + """,
-        "name": "Condition",
-        "type": "if",
-        "color": "white",
-        "isGroup": false,
-        "text": """ + '"' + case_command.attrib['value'] + '",' + """
-        "opt": 2,
-        "__gohashid": """ + str(gohashid) + """
-      }"""
-    gohashid += 1
-    return case_node
-
-  else: # testando um valor em relacao a outra variavel qualquer
-    # é preciso que haja um espaço entre os operandos e o operador. ex #x == 1
-    # opt": 5 é comparacao matematica, isto é, com operadores do tipo ==, >, <, >=, <= ou !=
-
-    tralha1 = '"#'
-    if case_command.attrib["var"] == "$":
-      tralha1 = '"'
-    # if case_command.attrib['value'] == "$" or case_command.attrib['value'].isnumeric():
-    #   tralha2 = ' '
-
-    case_node = """      {
-        "key": """ + case_command.attrib["key"] + """,
+    # verifica qual o tipo de comparacao para $. Exact (opt 4) ou contain (opt 2)
+    if case_command.attrib["op"] == "exact":
+        text = case_command.attrib['value']
+        opt = 4
+    elif case_command.attrib["op"] == "contain":
+        text = case_command.attrib['value']
+        opt = 2
+    else: # testando um valor em relacao a outra variavel qualquer
+        # é preciso que haja um espaço entre os operandos e o operador. ex #x == 1
+        # opt 5 é comparacao matematica, isto é, com operadores do tipo ==, >, <, >=, <= ou !=
+        tralha = "#"
+        if case_command.attrib["var"] == "$":
+            tralha = ""
+        text = tralha + case_command.attrib['var'] + ' ' + map_value(case_op_map, case_command, 'op') + ' ' + case_command.attrib['value']
+        opt = 5
+
+    return {
+        "key": int(case_command.attrib["key"]),
         "name": "Condition",
         "type": "if",
         "color": "white",
-        "isGroup": false,
-        "text": """ + tralha1 + case_command.attrib['var'] + ' ' + op + ' ' + case_command.attrib['value'] + '",' + """
-        "opt": 5,
-        "__gohashid": """ + str(gohashid) + """
-        }"""
-    gohashid += 1
-    return case_node
+        "isGroup": False,
+        "text": text,
+        "opt": opt}
 
 
 # wait node processing #########################################################################
 def wait_process(wait_command):
-    global gohashid
-
-    wait_node = """      {
-        "key": """ + wait_command.attrib["key"] + """,
+    return {
+        "key": int(wait_command.attrib["key"]),
         "name": "Wait",
         "type": "wait",
         "color": "lightblue",
-        "isGroup": false,
-        "time": """ + wait_command.attrib['duration'] + ',' + """
-        "__gohashid": """ + str(gohashid) + """
-      }"""
-    gohashid += 1
-    return wait_node
-        
-
-def saida_links():
-    node_links = root.find("links")
-    # verifica se há links a processar
-    if len(node_links) == 0:
-      print('  Error -> No execution flow found. Please, check your code.')
-      exit(1)
-    output ="""
-    ],
-    "link": [""" + """
-      { 
-        "from": """ + node_links[0].attrib["from"] + "," + """
-        "to": """ + node_links[0].attrib["to"] + "," + """
-        "__gohashid": 0
-      }"""
-
-    for i in range(len(node_links) - 1):
-        output += """,
-      { 
-        "from": """ + node_links[i+1].attrib["from"] + "," + """
-        "to": """ + node_links[i+1].attrib["to"] + "," + """
-        "__gohashid": """ + str(i + 1) + """
-      }"""
-
-    output += """
-    ]
-  }
-}"""
-  
-    return output
-
-
-print("step 04 - Mapping XML nodes and links to a JSON file... (OK)")
-
-# gerando o cabeçalho do Json
-# onde são inseridos o id e o nome da interação baseados nos dados xml
-output += head_process(root) # usa os atributos id e name da tag <evaml>
-
-# o proximo comando pega o parametro do elemento voice (timbre) e gera o primeiro elem. do script Json
-output += settings_process(root.find("settings"))
-
-# processamento da interação
-mapping_xml_to_json() # nova versao
-
-# mapeia os links xml para json
-output += saida_links()
-
-# criação de um arquivo físico da interação em json
-file_out = open(root.attrib['name'] + '.json', "w")
-file_out.write(output)
-# file_out.write(output.encode('utf-8')) para rodar no raspberry
-file_out.close()
+        "isGroup": False,
+        "time": int(wait_command.attrib['duration'])}
+
+
+# tabela de mapeamento: tag do elemento xml -> funcao que gera o registro Json do robô
+# os nodes abstratos (script, switch, stop e goto) e os comandos que o robô nao executa nao estao na tabela e nao sao mapeados
+node_process = {
+    'motion': motion_process,
+    'audio': audio_process,
+    'light': light_process,
+    'led': led_process,
+    'wait': wait_process,
+    'talk': talk_process,
+    'random': random_process,
+    'listen': listen_process,
+    'counter': counter_process,
+    'evaEmotion': eva_emotion_process,
+    'userEmotion': user_emotion_process,
+    'case': case_process,
+    'default': case_process}
+
+
+# percorre os elementos xml gerando os registros Json dos nodes, na ordem do documento
+# o primeiro node e' sempre o elemento voice da secao settings
+def iter_nodes(evaml_root):
+    yield voice_process(evaml_root.find("settings").find("voice"))
+    for elem in evaml_root.find("script").iter():
+        process = node_process.get(elem.tag)
+        if process != None:
+            yield process(elem)
+
+def iter_links(evaml_root):
+    for link in evaml_root.find("links"):
+        yield {"from": int(link.attrib["from"]), "to": int(link.attrib["to"])}
+
+
+# campos inteiros que dependem da posicao do comando no script (as chaves sao sequenciais)
+# eles ficam fora dos modelos dos registros: inserir um comando no script nao invalida os modelos dos registros seguintes
+POSITION_FIELDS = ("key", "from", "to")
+
+# numero maximo de modelos guardados durante a geracao de um script, quando eles nao sao mantidos para uma proxima geracao
+# (os registros dos links e dos comandos repetidos usam poucos modelos; a saida inteira nao fica na memoria)
+MAX_TEMPLATES = 1024
+
+# modelo do texto Json de um registro: os pedacos de texto entre os campos de posicao, terminando antes do valor do __gohashid
+# o texto e' o mesmo de json.dumps(record, ensure_ascii = False, indent = 2), com a indentacao do arquivo
+def record_template(record):
+    pieces = []
+    text = "      {"
+    separator = "\n        "
+    for name, value in record.items():
+        text += separator + json.dumps(name, ensure_ascii = False) + ": "
+        if name in POSITION_FIELDS:
+            pieces.append(text)
+            text = ""
+        else:
+            text += json.dumps(value, ensure_ascii = False)
+        separator = ",\n        "
+    pieces.append(text + separator + '"__gohashid": ')
+    return pieces
+
+# grava a lista de registros no arquivo, um por vez. __gohashid e' o indice do registro na lista
+# registros com a mesma forma (campos e valores, exceto os de posicao) usam o mesmo modelo de texto
+# os modelos usados sao guardados em templates (no maximo limit modelos). previous tem os modelos de uma geracao anterior (ex.: o modo watch)
+def write_records(file_out, records, templates, previous = {}, limit = None):
+    separator = "\n"
+    for gohashid, record in enumerate(records):
+        shape = []
+        positions = []
+        for name, value in record.items():
+            if name in POSITION_FIELDS:
+                shape.append(name)
+                positions.append(str(value))
+            else:
+                shape.append((name, type(value), value)) # o tipo separa False de 0 (False == 0 em Python)
+        shape = tuple(shape)
+        pieces = templates.get(shape)
+        if pieces == None:
+            pieces = previous.get(shape)
+            if pieces == None:
+                pieces = record_template(record)
+            if limit == None or len(templates) < limit:
+                templates[shape] = pieces
+
+        text = [separator]
+        for piece, position in zip(pieces, positions):
+            text.append(piece)
+            text.append(position)
+        text.append(pieces[-1])
+        text.append(str(gohashid))
+        text.append("\n      }")
+        file_out.write("".join(text))
+        separator = ",\n"
+
+
+# gera o script Json do robô a partir da raiz do script compilado (com chaves e links) e o grava em file_out
+# templates (opcional) e' um dict com os modelos de registro de uma geracao anterior. Ele e' atualizado com os modelos deste script
+# retorna o evaml_root ou None, caso haja erro
+def json_gen(evaml_root, file_out, templates = None):
+    global settings
+    settings_node = evaml_root.find("settings")
+    audio_effects = settings_node.find("audioEffects")
+    light_effects = settings_node.find("lightEffects")
+    settings = {
+        "audio_off": audio_effects != None and audio_effects.attrib["mode"] == "OFF",
+        "light_off": light_effects != None and light_effects.attrib["mode"] == "OFF"}
 
+    # verifica se há links a processar
+    if len(evaml_root.find("links")) == 0:
+        print('  Error -> No execution flow found. Please, check your code.')
+        return None
+
+    print("step 04 - Mapping XML nodes and links to a JSON file... (OK)")
+
+    try:
+        # cabeçalho do Json. O id e o nome da interação são os atributos do elemento <evaml>
+        file_out.write('{\n  "_id": ' + json.dumps(evaml_root.attrib["id"]) + ',\n  "nombre": ' + json.dumps(evaml_root.attrib["name"], ensure_ascii = False) + ',\n  "data": {\n    "node": [')
+        node_templates = {}
+        link_templates = {}
+        previous = {} if templates == None else templates
+        limit = MAX_TEMPLATES if templates == None else None
+        write_records(file_out, iter_nodes(evaml_root), node_templates, previous, limit)
+        file_out.write('\n    ],\n    "link": [')
+        write_records(file_out, iter_links(evaml_root), link_templates, previous, limit)
+        file_out.write('\n    ]\n  }\n}')
+        if templates != None: # apenas os modelos usados neste script sao mantidos
+            templates.clear()
+            templates.update(node_templates)
+            templates.update(link_templates)
+    except _JsonGenError:
+        return None
+
+    return evaml_root
+
+
+# grava o script Json do robô no arquivo json_file. O arquivo incompleto e' removido em caso de erro
+# retorna o evaml_root ou None, caso haja erro
+def write_json(evaml_root, json_file, templates = None):
+    ok = False
+    file_out = open(json_file, "w", encoding = "utf-8") # um erro aqui e' propagado (nenhum arquivo foi criado)
+    try:
+        with file_out:
+            ok = json_gen(evaml_root, file_out, templates) != None
+    finally:
+        if not ok:
+            os.remove(json_file) # o arquivo incompleto e' removido
+    return evaml_root if ok else None
+
+
+if __name__ == "__main__":
+    tree = eva_xml.parse(sys.argv[1])  # arquivo de codigo xml
+    root = tree.getroot() # evaml root node
+
+    # criação de um arquivo físico da interação em json
+    if write_json(root, root.attrib['name'] + '.json') == None:
+        exit(1) # termina com erro
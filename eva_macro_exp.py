@@ -7,134 +7,177 @@ Uma definição de macro não pode ser vazia (isso não faria sentido).
 Caso algum comando <useMacro> faça referência a uma macro com zero elementos o parser vai indicar o erro.
 O parser substitui a tag <useMacro> com problema, por uma tag <error> indicando o tipo do erro,
 nesse caso “undefined_macro”, o nome da macro não definida e escreve essa informação no no arquivo de saída da etapa.
+Uma macro pode usar outras macros (<useMacro> dentro de <macro>). Caso uma macro use a si mesma, direta ou
+indiretamente, o parser indica o ciclo encontrado e substitui o <useMacro> por uma tag <error> do tipo “recursive_macro”.
  """
 
-import copy # lib para a geracao de copias de objetos
 import sys
-import xml.etree.ElementTree as ET
 import eva_validator # funcão de validacao xmlschema
 
 _error = 0 # 0 indica que não houve falha na etapa. 
 
-tree = eva_validator.evaml_validator(sys.argv[1]) # chama a funcao de validacao do modulo eva_validator
-
-if tree == None: # tree == None indica que houve erro de validaçao, senão, tree tem o objeto xml carregado
-    exit(1) # termina com erro
-
-root = tree.getroot() # evaml root node
-script_node = root.find("script")
-macros_node = root.find("macros")
-
 id_loop_number = 0  # id usado na criação dos ids dos loops
 
 ###############################################################################
 # Processamento (expansao) das macros                                         #
 ###############################################################################
 
+# copia um elemento e seus filhos. E' mais barata que copy.deepcopy (nao usa o dicionario "memo" do deepcopy)
+def clone_element(elem):
+    elem_copy = elem.makeelement(elem.tag, elem.attrib) # do mesmo tipo do original (ElementTree ou lxml, eva_xml)
+    elem_copy.text = elem.text
+    elem_copy.tail = elem.tail
+    elem_copy.extend([clone_element(child) for child in elem])
+    return elem_copy
+
+# as macros sao indexadas pelo id uma unica vez e o script e' percorrido uma unica vez.
+# o corpo de cada macro e' expandido (inclusive os <useMacro> que ele contém) apenas na primeira vez em que a macro e' usada.
+# nos usos seguintes, apenas uma copia do corpo ja expandido e' inserida no lugar do <useMacro>.
+# o mesmo expansor pode ser usado para varios <useMacro> (ex.: compilacao em fluxo, eva_stream), sem expandir as macros de novo
+class MacroExpander:
+    def __init__(self, macros_node):
+        self.macros_node = macros_node
+        self.macros_index = {} # id da macro -> elemento <macro>
+        if macros_node != None:
+            for macro in macros_node:
+                self.macros_index[macro.attrib["id"]] = macro
+        self.expanded_macros = {} # id da macro -> lista com os elementos do corpo da macro ja expandidos
+        self.macros_in_use = [] # pilha das macros em expansao. Usada para detectar ciclos (ex.: A usa B e B usa A)
+        self.no_macros_reported = False # evita que o erro de secao macros inexistente (ou vazia) seja impresso varias vezes
+
+    # transforma o <useMacro> com problema em um elemento <error>
+    def macro_error(self, use_node, error_type):
+        global _error
+        _error = 1 # falha
+        use_node.tag = "error"
+        use_node.attrib["type"] = error_type
+        use_node.attrib["macro_id"] = use_node.attrib["macro"]
+        use_node.attrib.pop("macro")
+        return [use_node]
+
+    # retorna a lista de elementos que substituem o <useMacro>
+    def use_macro(self, use_node):
+        global _error
+        if len(self.macros_index) == 0:
+            if not self.no_macros_reported:
+                if (self.macros_node == None): # testa se a seção macros foi criada
+                    print("  Error -> You are using <useMacro> but the section macros does not exist.")
+                else: # nenhuma macro foi definida
+                    print("  Error -> You are using <useMacro> but no macro was defined.")
+                self.no_macros_reported = True
+            _error = 1 # falha
+            return [use_node]
+
+        macro_id = use_node.attrib["macro"]
+        if macro_id not in self.macros_index: # caso o nome da macro não seja encontrado nas macros
+            print("  Error -> The <useMacro> references an element that is not a macro. Element ID:", macro_id)
+            return self.macro_error(use_node, "undefined_macro")
+
+        if len(self.macros_index[macro_id]) == 0:
+            print("  Error -> The <useMacro> references the macro", macro_id, "that is empty." )
+            return self.macro_error(use_node, "macro_is_empty")
+
+        if macro_id in self.macros_in_use: # a macro usa a si mesma, direta ou indiretamente
+            print("  Error -> The macro", macro_id, "uses itself. Macro cycle:", " -> ".join(self.macros_in_use[self.macros_in_use.index(macro_id):] + [macro_id]))
+            return self.macro_error(use_node, "recursive_macro")
+
+        if macro_id not in self.expanded_macros: # primeiro uso da macro. O seu corpo e' expandido
+            self.macros_in_use.append(macro_id)
+            macro_body = use_node.makeelement("macro", {})
+            macro_body.extend([clone_element(elem) for elem in self.macros_index[macro_id]])
+            self.expand_children(macro_body)
+            self.expanded_macros[macro_id] = list(macro_body)
+            self.macros_in_use.pop()
+
+        return [clone_element(elem) for elem in self.expanded_macros[macro_id]]
+
+    # percorre os filhos do node, expandindo os <useMacro> encontrados
+    def expand_children(self, node):
+        new_children = []
+        has_macro = False
+        for child in node:
+            if child.tag == "useMacro":
+                has_macro = True
+                new_children.extend(self.use_macro(child))
+            else:
+                if len(child) != 0: self.expand_children(child)
+                new_children.append(child)
+        if has_macro: # a lista de filhos so e' substituida se houve alguma expansao
+            node[:] = new_children
+
 def macro_expander(script_node, macros_node):
-    global _error
-    for i in range(len(script_node)):
-        if len(script_node[i]) != 0: macro_expander(script_node[i], macros_node)
-        if script_node[i].tag == "useMacro":
-            if (macros_node == None): # testa se a seção macros foi criada
-                print("  Error -> You are using <useMacro> but the section macros does not exist.")
-                _error = 1 # falha
-                break
-            elif (len(macros_node) == 0): # nenhuma macro foi definida
-                print("  Error -> You are using <useMacro> but no macro was defined.")
-                _error = 1 # falha
-                break
-            match_macro = False
-            for m in range(len(macros_node)):
-                if macros_node[m].attrib["id"] == script_node[i].attrib["macro"]:
-                    match_macro = True
-                    if (len(macros_node[m])) == 0:
-                        script_node[i].tag = "error"
-                        _error = 1 # falha
-                        script_node[i].attrib["type"] = "macro_is_empty"
-                        script_node[i].attrib["macro_id"] = script_node[i].attrib["macro"]
-                        print("  Error -> The <useMacro> references the macro", macros_node[m].attrib["id"], "that is empty." )
-                        script_node[i].attrib.pop("macro")
-                    else:
-                        script_node.remove(script_node[i])
-
-                    for j in range(len(macros_node[m])):
-                        mac_elem_aux = copy.deepcopy(macros_node[m][j])
-                        script_node.insert(i + j, mac_elem_aux)
-                    break      
-            if match_macro == False: # caso o nome da macro não seja encontrado nas macros
-                script_node[i].tag = "error"
-                _error = 1 # falha
-                script_node[i].attrib["type"] = "undefined_macro"
-                script_node[i].attrib["macro_id"] = script_node[i].attrib["macro"]
-                print("  Error -> The <useMacro> references an element that is not a macro. Element ID:", script_node[i].attrib["macro"])
-                script_node[i].attrib.pop("macro")  
-            
-            macro_expander(script_node, macros_node)
+    MacroExpander(macros_node).expand_children(script_node)
 
 
 ###############################################################################
 # Processamento o comando (loop)                                              #
 ###############################################################################
+# os loops sao processados em uma unica travessia pos-ordem: os loops internos sao numerados (LOOP_ID/ITERATION_VAR) antes
+# do loop que os contem, e os loops irmaos da esquerda para a direita.
+# o corpo do <loop> e' movido para dentro do <case> gerado, sem copias.
 def process_loop(script_node):
+    new_children = []
+    has_loop = False
+    for child in script_node:
+        if len(child) != 0: process_loop(child)
+        if child.tag == "loop":
+            has_loop = True
+            new_children.extend(lower_loop(child))
+        else:
+            new_children.append(child)
+    if has_loop: # a lista de filhos so e' substituida se algum loop foi processado
+        script_node[:] = new_children
+
+# cria os elementos que substituem o <loop> de numero number: o <counter> (inicializacao), o <switch>, o <case>,
+# o <counter> (incremento), o <goto> que faz o loop acontecer e o <default>. Os elementos sao criados vazios (sem filhos)
+def loop_elements(loop_node, number):
+    c = loop_node.makeelement("counter", {}) # cria o <counter> que inicializa a var de iteração com o valor zero
+    if loop_node.get("id") != None: # caso o <loop> seja alvo de um goto
+        id_loop = loop_node.attrib["id"] 
+        c.attrib["id"] = id_loop
+    if loop_node.get("var") != None: 
+        var_loop = loop_node.attrib["var"] 
+    else: # caso o usuario não defina uma variação para a iteração, a variavel default "ITERATION_VAR...." será criada
+        var_loop = "ITERATION_VAR" + str(number) 
+    times_loop = loop_node.attrib["times"] 
+    c.attrib["var"] = var_loop 
+    c.attrib["op"] = "=" 
+    c.attrib["value"] = "1"  # inicializa a variavel contadora com zero
+
+    s = loop_node.makeelement("switch", {})  # cria o elemento <switch>
+    s.attrib["id"] = "LOOP_ID" + str(number) + "_" + var_loop  # prefixo padrao do id automatico gerado para o loop _LOOP_ID_
+    s.attrib["var"] = var_loop 
+
+    cs = loop_node.makeelement("case", {}) # cria o elemento <case>
+    cs.attrib["op"] = "lte" 
+    cs.attrib["value"] = times_loop 
+
+    c_inc = loop_node.makeelement("counter", {})  # cria o <counter> que incrementa a variável de iteração
+    c_inc.attrib["var"] = var_loop
+    c_inc.attrib["op"] = "+"
+    c_inc.attrib["value"] = "1"
+
+    g = loop_node.makeelement("goto", {})  # cria o <goto> que faz o loop acontecer
+    g.attrib["target"] = "LOOP_ID" + str(number) + "_" + var_loop  # prefixo padrao do id automatico gerado para o loop _LOOP_ID_
+
+    df = loop_node.makeelement("default", {}) # cria o elemento <default> para o <case> do loop
+
+    return c, s, cs, c_inc, g, df
+
+# transforma o <loop> em um <counter> (inicializacao) seguido de um <switch> com um <case> (corpo + incremento + goto) e um <default>
+def lower_loop(loop_node):
     global id_loop_number
-    for i in range(len(script_node)):
-        if len(script_node[i]) != 0: process_loop(script_node[i])
-        if script_node[i].tag == "loop":
-            id_loop_number += 1 # var utilizada na criação de nomes de algumas variáveis automáticas. Comeca com 1
-            loop_copy = copy.deepcopy(script_node[i]) # copia o elemento  <loop>
-            c = ET.Element("counter") # cria o <counter> que inicializa a var de iteração com o valor zero
-            if script_node[i].get("id") != None: # caso o <loop> seja alvo de um goto
-                id_loop = script_node[i].attrib["id"] 
-                c.attrib["id"] = id_loop
-            if script_node[i].get("var") != None: 
-                var_loop = script_node[i].attrib["var"] 
-                c.attrib["var"] = var_loop
-            else: # caso o usuario não defina uma variação para a iteração, a variavel default "ITERATION_VAR...." será criada
-                # id_loop_number += 1 # var utilizada na criação de nomes de algumas variáveis automáticas. Comeca com 1
-                var_loop = "ITERATION_VAR" + str(id_loop_number) 
-            times_loop = script_node[i].attrib["times"] 
-            c.attrib["var"] = var_loop 
-            c.attrib["op"] = "=" 
-            c.attrib["value"] = "1"  # inicializa a variavel contadora com zero
-
-            script_node.remove(script_node[i]) # remove o elemento <loop> pois não é mais necessário (temos a sua cópia em )
-            script_node.insert(i, c)  # adiciona o <counter> que inicializa a variavel de iteração
-
-            s = ET.Element("switch")  # cria o elemento <switch>
-            s.attrib["id"] = "LOOP_ID" + str(id_loop_number) + "_" + var_loop  # prefixo padrao do id automatico gerado para o loop _LOOP_ID_
-            s.attrib["var"] = var_loop 
-            script_node.insert(i + 1, s)  # adiciona o <switch>, com seus filhos, ao elemento script
-
-            cs = ET.Element("case") # cria o elemento <case>
-            cs.attrib["op"] = "lte" 
-            cs.attrib["value"] = times_loop 
-
-            ####
-            ####
-
-
-
-            #cs.insert(1, loop_copy)  # aqui, o elemento pai (loop) vem junto, e isso é ruim pois queremos apenas seus filhos
-            cs.extend(loop_copy)  # o extend adiciona apenas os filhos de loop
-
-            c = ET.Element("counter")  # cria o <counter> que incrementa a variável de iteração
-            c.attrib["var"] = var_loop
-            c.attrib["op"] = "+"
-            c.attrib["value"] = "1"
-            cs.append(c)
+    id_loop_number += 1 # var utilizada na criação de nomes de algumas variáveis automáticas. Comeca com 1
+    c, s, cs, c_inc, g, df = loop_elements(loop_node, id_loop_number)
 
-            g = ET.Element("goto")  # cria o <goto> que faz o loop acontecer
-            g.attrib["target"] = "LOOP_ID" + str(id_loop_number) + "_" + var_loop  # prefixo padrao do id automatico gerado para o loop _LOOP_ID_
+    cs.extend(list(loop_node))  # apenas os filhos do loop (o corpo) sao movidos para o <case>
+    cs.append(c_inc)
+    cs.append(g)  # adiciona o <goto> (que gerar causa a repetição) ao final do <case> 
 
-            cs.append(g)  # adiciona o <goto> (que gerar causa a repetição) ao final do <case> 
+    s.append(cs)  # insere o <case> com o corpo dentro do <switch>
+    s.append(df)  # insere o comando <default> que gera a conexão com o restante do script, evitando a descontinuidade
 
-            df = ET.Element("default") # cria o elemento <default> para o <case> do loop
-
-            s.insert(0, cs)  # insere o <case> com o corpo dentro do <switch>
-            s.insert(1, df)  # insere o comando <default> que gera a conexão com o restante do script, evitando a descontinuidade
-
-            process_loop(script_node) # o processamento de um loop muda a estrutura inicial do scriptnode e precisa ser revisitada
+    return [c, s] # o <counter> e o <switch> substituem o <loop>
 
 ###############################################################################
 # Insere <defaults> nos <cases>                                               #
@@ -145,13 +188,12 @@ def process_loop(script_node):
 # caso esta função seja desativada aqui, o parser emitirá um WARNING indicando a descontinuidade, caso haja alguma
 # um script, que neste caso, possui dois grafos, é executado no EvaSIM, porém, não roda no robô físico
 def default_process(script_node):
-    for i in range(len(script_node)):
-        if len(script_node[i]) != 0: default_process(script_node[i])
-        if script_node[i].tag == "switch":
-            if script_node[i][len(script_node[i]) - 1].tag != "default":
-                df = ET.Element("default") # cria o elemento <default> para o <case> do loop
-                s = script_node[i]
-                s.insert(len(script_node[i]), df)
+    for child in script_node: # sem indices: no lxml, script_node[i] percorre os filhos a partir do primeiro
+        if len(child) != 0: default_process(child)
+        if child.tag == "switch":
+            if child[-1].tag != "default":
+                df = child.makeelement("default", {}) # cria o elemento <default> para o <case> do loop
+                child.append(df)
 
 #################### Funcao auxiliar para a impressao da arvore
 def print_tree(tree, tab):
@@ -161,26 +203,65 @@ def print_tree(tree, tab):
             print_tree(tree[i], tab + 2)
 
 
-# expande as macros   
-macro_expander(script_node, macros_node)
+###############################################################################
+# Etapa 01 - expansao das macros, processamento dos loops e dos <defaults>    #
+###############################################################################
+# a etapa e' dividida em partes, usadas tambem pelo eva_profile (medicao de cada parte). Cada parte reinicia o seu
+# proprio estado
+
+# expande as macros em script_node. Retorna False caso algum erro tenha sido encontrado
+def expand_macros(script_node, macros_node):
+    global _error
+    _error = 0 # cada expansao comeca sem erros
+    macro_expander(script_node, macros_node)
+    return _error == 0
+
+# processa os loops de script_node. Os loops sao numerados a partir de first_number + 1. Retorna o numero de loops processados
+def expand_loops(script_node, first_number = 0):
+    global id_loop_number
+    id_loop_number = first_number
+    process_loop(script_node)
+    return id_loop_number - first_number
+
+# conclui a etapa, depois das tres partes sem erros: remove a secao de macros, caso ela exista
+def finish_expand(root):
+    print("Step 01 - Processing Macros... (OK)")
+
+    macros_node = root.find("macros")
+    if macros_node != None:
+        root.remove(macros_node)
+
+# recebe o root (<evaml>) ja validado e o modifica em memoria.
+# retorna o root processado ou None, caso algum erro tenha sido encontrado
+def expand(root):
+    script_node = root.find("script")
+
+    # expande as macros
+    ok = expand_macros(script_node, root.find("macros"))
+
+    # processa os loops
+    expand_loops(script_node)
 
-# processa os loops
-process_loop(script_node)
+    # insere <defaults> nos <cases> que não os têm, eitando possíveis descontinuidades nos fluxos (grafos)
+    default_process(script_node)
 
-# insere <defaults> nos <cases> que não os têm, eitando possíveis descontinuidades nos fluxos (grafos)
-default_process(script_node)
+    #print_tree(root, 2)
 
-#print_tree(root, 2)
+    if not ok:
+        return None
 
-if _error == 1:
-    exit(1)
+    finish_expand(root)
+    return root
 
-print("Step 01 - Processing Macros... (OK)")
 
-if macros_node != None:
-    root.remove(macros_node) # remove a secao de macros, caso ela exista
+if __name__ == "__main__":
+    tree = eva_validator.evaml_validator(sys.argv[1]) # chama a funcao de validacao do modulo eva_validator
 
-# gera o arquivo com as macros expandidas (caso existam) para a proxima etapa
-tree.write("_macros.xml", "UTF-8")
+    if tree == None: # tree == None indica que houve erro de validaçao, senão, tree tem o objeto xml carregado
+        exit(1) # termina com erro
 
+    if expand(tree.getroot()) == None:
+        exit(1) # termina com erro
 
+    # gera o arquivo com as macros expandidas (caso existam) para a proxima etapa
+    tree.write("_macros.xml", "UTF-8")
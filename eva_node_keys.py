@@ -1,14 +1,9 @@
 import hashlib
-
 import sys
-import xml.etree.ElementTree as ET
-
-tree = ET.parse(sys.argv[1])  # arquivo de codigo xml
-root = tree.getroot() # evaml root node
-script_node = root.find("script")
+import eva_xml
 
 # funcao que gera as chaves para os elementos do script
-def key_gen(script):
+def key_gen(root, script):
     key = 1000 # valor da primeira chave.
     root.find("settings").find("voice").attrib["key"] = str(key)
     key += 1
@@ -25,17 +20,24 @@ def key_gen(script):
                 node.attrib["child_proc"] = "false" # esse atributo será usado na etapa de ger. dos links
             key += 1
 
+# Assume o default UTF-8 (Gera o id fazendo o hashing do nome do script para usar no db Json do Eva)
+def script_id(script_name):
+    hash_object = hashlib.md5(script_name.encode())
+    return hash_object.hexdigest()
+
 # geracao das chaves identificadoras dos nodes
 # estas chaves sao referenciadas nos links (elos) que conectam cada elemento (comando) do script
 # os elementos script, switch, stop e goto nao possuem chaves
+def node_keys(root):
+    root.attrib["id"] = script_id(root.attrib["name"])
 
-# Assume o default UTF-8 (Gera o id fazendo o hashing do nome do script para usar no db Json do Eva)
-hash_object = hashlib.md5(root.attrib["name"].encode())
-root.attrib["id"] = hash_object.hexdigest()
-
-print("Step 02 - Generating Elements keys... (OK)")
+    print("Step 02 - Generating Elements keys... (OK)")
 
-key_gen(script_node)
+    key_gen(root, root.find("script"))
+    return root
 
-tree.write("_node_keys.xml", "UTF-8")
 
+if __name__ == "__main__":
+    tree = eva_xml.parse(sys.argv[1])  # arquivo de codigo xml
+    node_keys(tree.getroot())
+    tree.write("_node_keys.xml", "UTF-8")
@@ -0,0 +1,197 @@
+"""
+Otimização do grafo de execução (opcional, executada depois da geração dos links).
+O programa compilado fica menor (menos nodes no Json do robô e menos passos no EvaSIM) sem mudar o comportamento:
+
+  - <switch> sem efeito: quando o switch tem um <default> e todos os seus <case>/<default> são vazios e seguem
+    para o mesmo lugar, os nodes anteriores passam a se conectar diretamente ao próximo comando;
+  - <case> vazios imediatamente antes de um <default> vazio, com o mesmo destino, são removidos (o default é sempre verdadeiro);
+  - <default> vazio no fim do fluxo (sem link de saída) é removido;
+  - comandos de estado repetidos em sequência (<light>, <evaEmotion> e <counter op="=">, com os mesmos atributos)
+    são reduzidos a um só;
+  - links que partem de nodes que nunca são alcançados a partir do <voice> são removidos, assim como os links repetidos.
+
+Um <default> vazio que ainda segue para outro comando não é removido: o EvaSIM e o robô avaliam os <case> de um
+switch como um grupo, e um comando comum no meio desse grupo seria executado antes da avaliação dos <case>.
+"""
+
+import sys
+import eva_xml
+from collections import deque
+
+# comandos que apenas definem um estado. Repetir o mesmo comando em sequência não tem efeito (no <counter>, apenas op="=")
+STATE_COMMANDS = set(["light", "evaEmotion", "counter"])
+
+
+class _Graph:
+    def __init__(self, evaml_root):
+        self.succ = {} # chave -> lista (ordenada) das chaves dos sucessores. A ordem dos links de um node define a ordem de avaliacao dos <case>
+        self.pred = {} # chave -> lista das chaves dos predecessores
+        self.links = 0
+        for link in evaml_root.find("links"):
+            key_from, key_to = int(link.attrib["from"]), int(link.attrib["to"])
+            self.succ.setdefault(key_from, [])
+            self.pred.setdefault(key_to, [])
+            self.links += 1
+            if key_to not in self.succ[key_from]: # links repetidos sao descartados
+                self.succ[key_from].append(key_to)
+                self.pred[key_to].append(key_from)
+
+    def successors(self, key):
+        return self.succ.get(key, [])
+
+    def predecessors(self, key):
+        return self.pred.get(key, [])
+
+    # remove o node e todos os seus links
+    def remove(self, key):
+        for key_to in self.succ.pop(key, []):
+            self.pred[key_to].remove(key)
+        for key_from in self.pred.pop(key, []):
+            self.succ[key_from] = [k for k in self.succ[key_from] if k != key]
+
+    # remove o node. Cada predecessor passa a se conectar aos sucessores do node, na posicao em que estava o link para ele
+    def bypass(self, key):
+        targets = self.successors(key)
+        for key_from in self.predecessors(key):
+            old_succ = self.succ[key_from]
+            new_succ = []
+            for k in old_succ:
+                for key_to in (targets if k == key else [k]):
+                    if key_to not in new_succ:
+                        new_succ.append(key_to)
+            for key_to in new_succ:
+                if key_to not in old_succ:
+                    self.pred[key_to].append(key_from)
+            self.succ[key_from] = new_succ
+        self.remove(key)
+
+
+def _key(elem):
+    return int(elem.attrib["key"])
+
+def _same_state(a, b):
+    if a.tag != b.tag:
+        return False
+    if a.tag == "counter" and a.get("op") != "=": # apenas a atribuicao pode ser repetida sem efeito
+        return False
+    attrib_a = {name: value for name, value in a.attrib.items() if name not in ("key", "id")}
+    attrib_b = {name: value for name, value in b.attrib.items() if name not in ("key", "id")}
+    return attrib_a == attrib_b
+
+# remove do switch os cases vazios (e o default vazio) que nao tem efeito. Retorna os elementos removidos
+def _switch_process(graph, switch):
+    options = [elem for elem in switch if elem.get("key") != None and _key(elem) in graph.pred]
+    if len(options) == 0:
+        return []
+    removed = []
+    default = options[-1] if options[-1].tag == "default" and len(options[-1]) == 0 else None
+
+    if default != None:
+        # cases vazios antes do default vazio, com o mesmo destino: se o case for falso, o default leva ao mesmo lugar
+        while len(options) > 1 and len(options[-2]) == 0 and graph.successors(_key(options[-2])) == graph.successors(_key(default)):
+            graph.remove(_key(options[-2]))
+            removed.append(options.pop(-2))
+
+        # so' resta o default vazio: o switch nao tem efeito e os predecessores seguem direto para o proximo comando
+        # (exceto quando o default volta para um predecessor: o link do node para ele mesmo mudaria a execucao no EvaSIM)
+        preds = set(graph.predecessors(_key(default)))
+        if len(options) == 1 and not preds.intersection(graph.successors(_key(default))):
+            graph.bypass(_key(default))
+            removed.append(default)
+        # o default vazio no fim do fluxo nao leva a lugar nenhum
+        elif len(graph.successors(_key(default))) == 0:
+            graph.remove(_key(default))
+            removed.append(default)
+    return removed
+
+# remove os elementos do script. Os filhos de um elemento removido (ex.: comandos alcancaveis por um <goto>) ficam no seu
+# lugar. Os filhos de um <case>/<default> removido vao para logo depois do <switch> (um switch so' contem cases e defaults)
+def _remove_elements(script, removed):
+    parents = {child: parent for parent in script.iter() for child in parent}
+    order = {elem: i for i, elem in enumerate(script.iter())}
+    for elem in sorted(removed, key = lambda elem: order[elem], reverse = True): # os descendentes antes dos ancestrais
+        parent = parents[elem]
+        children = list(elem)
+        if parent.tag == "switch" and len(children) != 0:
+            parent.remove(elem)
+            switch, parent = parent, parents[parent]
+            i = list(parent).index(switch) + 1
+            parent[i:i] = children # os cases sao processados do ultimo para o primeiro: a ordem dos filhos e' mantida
+        else:
+            i = list(parent).index(elem)
+            parent[i:i + 1] = children
+        for child in children:
+            parents[child] = parent
+    for switch in list(script.iter("switch")): # um switch sem cases nao e' mais necessario
+        if len(switch) == 0:
+            parents[switch].remove(switch)
+
+# otimiza o root compilado (com chaves e links). Retorna o root
+def optimize(evaml_root):
+    script = evaml_root.find("script")
+    voice = evaml_root.find("settings").find("voice")
+    graph = _Graph(evaml_root)
+    links_before = graph.links
+    elems = {_key(elem): elem for elem in script.iter() if elem.get("key") != None}
+    removed = []
+
+    # switches sem efeito. Os mais internos (e os ultimos) primeiro, assim uma sequencia de switches vazios e' removida por inteiro
+    changed = True
+    while changed:
+        changed = False
+        for switch in reversed(list(script.iter("switch"))):
+            switch_removed = _switch_process(graph, switch)
+            if switch_removed:
+                removed.extend(switch_removed)
+                changed = True
+
+    # comandos de estado repetidos: A -> B, em que B so' e' alcancado por A e A so' leva a B
+    removed_keys = set(_key(elem) for elem in removed)
+    for elem in script.iter():
+        if elem.tag in STATE_COMMANDS and elem.get("key") != None and _key(elem) not in removed_keys:
+            preds = graph.predecessors(_key(elem))
+            if len(preds) == 1 and graph.successors(preds[0]) == [_key(elem)] and preds[0] in elems and _same_state(elems[preds[0]], elem):
+                graph.bypass(_key(elem))
+                removed.append(elem)
+                removed_keys.add(_key(elem))
+
+    # nodes que nunca sao alcancados a partir do voice (e os seus links)
+    reached = set([_key(voice)])
+    queue = deque(reached)
+    while queue:
+        for key_to in graph.successors(queue.popleft()):
+            if key_to not in reached:
+                reached.add(key_to)
+                queue.append(key_to)
+    for key, elem in elems.items():
+        if key not in reached and key not in removed_keys:
+            graph.remove(key)
+            removed.append(elem)
+            removed_keys.add(key)
+
+    _remove_elements(script, removed)
+
+    # novos links, na mesma ordem dos links originais
+    links_node = evaml_root.find("links")
+    order = []
+    order_set = set()
+    for link in links_node:
+        key_from = int(link.attrib["from"])
+        if key_from in graph.succ and key_from not in order_set:
+            order.append(key_from)
+            order_set.add(key_from)
+    del links_node[:] # remove apenas os <link> (no lxml, clear() tambem apagaria o tail do <links>)
+    links_after = 0
+    for key_from in order:
+        for key_to in graph.succ[key_from]:
+            eva_xml.SubElement(links_node, "link", {"from": str(key_from), "to": str(key_to)})
+            links_after += 1
+
+    print("Optimizing the execution graph... (OK) " + str(len(removed)) + " nodes and " + str(links_before - links_after) + " links removed.")
+    return evaml_root
+
+
+if __name__ == "__main__":
+    tree = eva_xml.parse(sys.argv[1]) # arquivo compilado (_EvaML.xml)
+    optimize(tree.getroot())
+    tree.write(sys.argv[1], "UTF-8")
@@ -1,20 +1,16 @@
+import glob
 import os
 import sys
-import ctypes
-import xml.etree.ElementTree as ET
-import eva_send_to_dbjson
-import requests
+import json
+import eva_xml
+import eva_daemon_client # only the stdlib. The compiler modules are imported by the branches that use them
 import time
 
-# This function gets the python command name used in command line
-def get_python_interpreter_arguments():
-  argc = ctypes.c_int()
-  argv = ctypes.POINTER(ctypes.c_wchar_p if sys.version_info >= (3, ) else ctypes.c_char_p)()
-  ctypes.pythonapi.Py_GetArgcArgv(ctypes.byref(argc), ctypes.byref(argv))
-  arguments = list()
-  for i in range(argc.value - len(sys.argv) + 1):
-    arguments.append(argv[i])
-  return arguments
+# Reads the script name and its id (the md5 of the name, the same id generated in step 02)
+def get_script_name_and_id(evaml_file):
+  import eva_node_keys
+  root = eva_xml.parse(evaml_file).getroot() # evaml root node
+  return root.attrib['name'], eva_node_keys.script_id(root.attrib['name'])
 
 # save to json flag
 save = False
@@ -25,17 +21,61 @@ run = False
 # compile the script
 compile = False
 
+# write the execution graph analysis (reachability, disconnected nodes, dangling gotos) as JSON
+graph = False
 
-# checking if flags were used
-if (len(sys.argv)) == 2: # no flags
-	print("\nWARNING!!! No flags were used. Please, see the options below:")
+# number of processes used to compile a directory or a glob (None = one per cpu)
+jobs = None
+
+# reuse the result of a previous compile of the same script (cache in .evaml_cache). Off by default: a script that
+# changed is compiled again from the start, so the cache only helps when the same files are compiled again unchanged
+use_cache = False
+
+# keep running and compile the scripts of a directory (or glob, or a single file) every time one of them is saved
+watch = False
+
+# with --watch, also write the robot JSON ("name".json)
+json_output = False
+
+# with -c (also with --watch and with the daemon), optimize the execution graph after the links are generated (eva_optimizer)
+optimize = False
+
+# with -c, report the time, cpu time, peak memory, nodes and links of each compiler stage
+profile = False
+
+# with --profile=DIR, a cProfile dump of each stage is written in DIR
+profile_dir = None
+
+# with -c, also write the precompiled binary program for the Eva simulator ("name"_EvaML.evab)
+binary = False
+
+# with -c, compile the script in a single streaming pass, with bounded memory (eva_stream), for very large scripts
+stream = False
+
+# table with the flags of the parser
+def print_flags():
 	print("---------------------------------------------------------------------------------------------------")
 	print("| FLAG\t\t| DEFINITION                                                                      |")
 	print("---------------------------------------------------------------------------------------------------")
 	print('| -c or -C\t| "Compiles" the EvaML script, outputting an XML file to run in the Eva simulator.|')
 	print("| -s or -S\t| Saves/Inserts the JSON file generated by the parser into the robot's database.  |")
 	print("| -r or -R\t| Makes the EVA robot run the script immediately.                                 |")
+	print('| --graph\t| With -c, writes the execution graph analysis to "name"_graph.json.             |')
+	print('| --jobs=N\t| With -c and a directory or glob ("codes-xml/*.xml"), compiles N files at a time.|')
+	print("| --cache\t| With -c, reuses the result of a previous compile of the same (unchanged) file. |")
+	print("| --watch\t| Watches a directory, glob or file and compiles each script again on every save. |")
+	print("| --optimize\t| With -c or --watch, removes commands and links that have no effect on the flow. |")
+	print("| --profile\t| With -c, shows time, peak memory, nodes and links of each compiler stage.       |")
+	print("| --profile=DIR\t| Like --profile and also writes a cProfile dump of each stage in DIR.            |")
+	print('| --json\t| With --watch, also writes the JSON file of the robot ("name".json).             |')
+	print('| --bin\t\t| With -c, also writes the binary program for the simulator ("name"_EvaML.evab).  |')
+	print("| --stream\t| With -c, compiles very large scripts in a single pass, with bounded memory.    |")
 	print("---------------------------------------------------------------------------------------------------\n")
+
+# checking if flags were used
+if (len(sys.argv)) == 2 and not sys.argv[1].startswith('-'): # no flags
+	print("\nWARNING!!! No flags were used. Please, see the options below:")
+	print_flags()
 	exit(1) # finish the execution
 
 
@@ -47,43 +87,129 @@ for p in sys.argv:
 		run = True
 	elif p == '-c' or p == '-C':
 		compile = True
+	elif p == '--graph':
+		graph = True
+	elif p.startswith('--jobs='):
+		jobs = int(p[len('--jobs='):])
+	elif p == '--cache':
+		use_cache = True
+	elif p == '--no-cache':
+		use_cache = False
+	elif p == '--watch':
+		watch = True
+	elif p == '--json':
+		json_output = True
+	elif p == '--optimize':
+		optimize = True
+	elif p == '--profile':
+		profile = True
+	elif p.startswith('--profile='):
+		profile = True
+		profile_dir = p[len('--profile='):]
+	elif p == '--bin':
+		binary = True
+	elif p == '--stream':
+		stream = True
 	
+if watch:
+	import eva_watch
+	# the compiler stays loaded (schema and stages) and only the saved files are compiled again
+	# the watched path is the first argument that is not a flag (eva_parser.py --watch codes-xml/)
+	watched = [p for p in sys.argv[1:] if not p.startswith('-')]
+	if len(watched) == 0:
+		print("\n  Error -> --watch needs a directory, a glob or a file to watch. Please, see the options below:")
+		print_flags()
+		exit(1) # finish the execution
+	eva_watch.watch(watched[0], use_cache = use_cache, json_output = json_output, optimize = optimize)
+	exit(0)
+
+if compile and (os.path.isdir(sys.argv[1]) or glob.has_magic(sys.argv[1])): # the same test of eva_batch.is_batch
+	import eva_batch
+	# batch mode: every .xml file of the directory (or every file matching the glob) is compiled in a process pool
+	results = eva_batch.compile_batch(eva_batch.batch_files(sys.argv[1]), jobs, use_cache = use_cache, optimize = optimize)
+	if not all(result["ok"] for result in results):
+		exit(1)
+	exit(0)
+
+if compile and stream:
+	# the script is never loaded as a whole: the output is written while the input is read (without the cache)
+	import eva_stream
+	evaml_file = eva_stream.compile_file(sys.argv[1])
+	if evaml_file == None: # one of the steps failed
+		exit(1)
+	if binary:
+		import eva_bin_gen
+		evaml_root = eva_xml.parse(evaml_file).getroot()
+		eva_bin_gen.write_program(evaml_root, eva_bin_gen.output_file_name(evaml_root))
+	if graph:
+		with open(evaml_file[:-len("_EvaML.xml")] + "_graph.json", "w") as graph_file:
+			json.dump(eva_stream.graph_report, graph_file, indent = 2)
+	exit(0)
+
 if compile:
 	# Now, each step only run if the previous step was OK
-	# step 01 - expanding macros
-	cmd = get_python_interpreter_arguments()[0] + " eva_macro_exp.py " + sys.argv[1]
-	if (os.system(cmd)) == 0: # step 01 OK
-		# step 02 - generating keys
-		cmd = get_python_interpreter_arguments()[0] + " eva_node_keys.py _macros.xml"
-		if (os.system(cmd)) == 0: # step 02 OK
-			# step 03 - to generate xml_exe file
-			cmd = get_python_interpreter_arguments()[0] + " eva_xml_links.py _node_keys.xml"
-			if (os.system(cmd)) == 0: # step 03 OK
-				exit(0) # Step 3 OK, finish the execution
-				# step 04 - generate the json file
-				#tree = ET.parse("_node_keys.xml")  #
-				#root = tree.getroot() # evaml root node
-				#cmd = get_python_interpreter_arguments()[0] + " eva_json_gen.py " + root.attrib['name'] + "_EvaML.xml" #_xml_links.xml"
-				#os.system(cmd)
+	# steps 01, 02 and 03 (expanding macros, generating keys and links) run in this same process, in memory
+	# with --cache, an unchanged script is not compiled again (its result is read from .evaml_cache)
+	# if the compiler daemon (eva_daemon.py) is running, the script is compiled by it, without loading the compiler here
+	if profile:
+		# each stage runs separately and is measured in this process (without the daemon and the cache)
+		import eva_profile
+		tree, report = eva_profile.run_stages(sys.argv[1], profile_dir = profile_dir, optimize = optimize)
+		eva_profile.print_report(report)
+		response = None
+	elif eva_daemon_client.is_running():
+		with open(sys.argv[1], "rb") as evaml_file:
+			response = eva_daemon_client.compile_remote(evaml_file.read(), use_cache = use_cache, optimize = optimize)
+	else:
+		response = None
+	if response == None and not profile: # without the daemon (or the daemon stopped)
+		import eva_compiler
+		tree = eva_compiler.compile_evaml(sys.argv[1], use_cache = use_cache, optimize = optimize)
+	if response != None:
+		print(response["messages"], end = "")
+		if not response["ok"]: # one of the steps failed
+			exit(1)
+		with open(response["name"] + "_EvaML.xml", "wb") as evaml_file: # versao para o EvaSIM
+			evaml_file.write(response["evaml"].encode("utf-8"))
+		graph_name, graph_report = response["name"], response["graph"]
+		evaml_root = eva_xml.fromstring(response["evaml"]) if binary else None
+	else:
+		if tree == None: # one of the steps failed
+			exit(1)
+		import eva_compiler
+		import eva_xml_links # the same module used by the compile (graph analysis of step 03)
+		tree.write(eva_compiler.output_file_name(tree), "UTF-8") # versao para o EvaSIM
+		graph_name, graph_report = tree.getroot().attrib['name'], eva_xml_links.graph_report
+		evaml_root = tree.getroot()
+	if binary: # precompiled program, loaded by the simulator without parsing the XML
+		import eva_bin_gen
+		eva_bin_gen.write_program(evaml_root, eva_bin_gen.output_file_name(evaml_root))
+	if graph: # machine-readable report of the graph analysis done in step 03
+		with open(graph_name + "_graph.json", "w") as graph_file:
+			json.dump(graph_report, graph_file, indent = 2)
+	exit(0) # Step 3 OK, finish the execution
+	# step 04 - generate the json file
+	#cmd = get_python_interpreter_arguments()[0] + " eva_json_gen.py " + root.attrib['name'] + "_EvaML.xml" #_xml_links.xml"
+	#os.system(cmd)
 
 # steps 5 and 6 (optional)
 if save:
-	tree = ET.parse("_node_keys.xml")  #
-	root = tree.getroot() # evaml root node
+	import eva_send_to_dbjson
+	script_name, script_id = get_script_name_and_id(sys.argv[1])
 	# step 5 - send do json db
-	with open(root.attrib['name'] + ".json", "r") as arqjson:
+	with open(script_name + ".json", "r") as arqjson:
 		output = arqjson.read()
-	eva_send_to_dbjson.send_to_dbjson(root.attrib['id'], root.attrib['name'], output)
+	if eva_send_to_dbjson.send_to_dbjson(script_id, script_name, output) == None:
+		exit(1)
 	
 
 if run:
 	# step 6 run script
-	tree = ET.parse("_node_keys.xml")  #
-	root = tree.getroot() # evaml root node
+	script_name, script_id = get_script_name_and_id(sys.argv[1])
 	if save or compile:
 		time.sleep(3) # tempo necessário para o restart do serviço do Eva
-	key_value = {'id': root.attrib['id']} # parametros do request
+	import requests
+	key_value = {'id': script_id} # parametros do request
 	url_eva = 'http://192.168.1.100:3000/interaccion/iniciarInteracciong?'
 	r = requests.get(url_eva, params = key_value)
-	print("==> Runnig script: " + root.attrib['name'] + ", id: " + root.attrib['id'])
-
+	print("==> Runnig script: " + script_name + ", id: " + script_id)
@@ -0,0 +1,169 @@
+"""
+Medição das etapas do compilador EvaML.
+As etapas são executadas separadamente (validação, expansão das macros, processamento dos loops, inserção dos <default>,
+geração das chaves, geração dos links e mapeamento para o Json do robô). Para cada etapa são medidos o tempo (wall e cpu),
+o pico de memória e o número de nodes e de links depois da etapa. Opcionalmente, cada etapa grava um dump do cProfile.
+O tempo é medido em uma compilação sem instrumentação. O pico de memória (tracemalloc) e o cProfile são medidos em
+compilações separadas, pois deixam as etapas mais lentas (os tempos são comparáveis com os do eva_bench.py).
+
+Uso:
+    python3 eva_parser.py codes-xml/script.xml -c --profile
+    python3 eva_parser.py codes-xml/script.xml -c --profile=profiles/   # grava profiles/<n>_<etapa>.prof
+"""
+
+import contextlib
+import cProfile
+import io
+import os
+import time
+import tracemalloc
+
+import eva_json_gen
+import eva_macro_exp
+import eva_node_keys
+import eva_optimizer
+import eva_validator
+import eva_xml
+import eva_xml_links
+
+
+###############################################################################
+# etapas                                                                       #
+###############################################################################
+# cada etapa recebe o estado (dict) da compilacao e retorna False em caso de erro
+# as etapas 01 (macros, loops e defaults) sao as partes de eva_macro_exp.expand()
+def _validate(state):
+    tree = eva_validator.evaml_validator(state["source"], state["defaults"])
+    if tree == None:
+        return False
+    state["tree"] = tree
+    state["root"] = tree.getroot()
+    return True
+
+def _macros(state):
+    return eva_macro_exp.expand_macros(state["root"].find("script"), state["root"].find("macros"))
+
+def _loops(state):
+    eva_macro_exp.expand_loops(state["root"].find("script"))
+    return True
+
+def _defaults(state):
+    eva_macro_exp.default_process(state["root"].find("script"))
+    eva_macro_exp.finish_expand(state["root"])
+    return True
+
+def _keys(state):
+    eva_node_keys.node_keys(state["root"])
+    return True
+
+def _links(state):
+    return eva_xml_links.xml_links(state["root"]) != None
+
+def _optimize(state):
+    eva_optimizer.optimize(state["root"])
+    return True
+
+# o Json e' gravado em state["json_file"] (os.devnull, caso apenas o tempo do mapeamento interesse)
+def _json(state):
+    with open(state["json_file"], "w", encoding = "utf-8") as file_out:
+        return eva_json_gen.json_gen(state["root"], file_out) != None
+
+STAGES = [
+    ("validate", _validate),
+    ("macros", _macros),
+    ("loops", _loops),
+    ("defaults", _defaults),
+    ("keys", _keys),
+    ("links", _links),
+    ("json", _json),
+]
+
+
+###############################################################################
+# medicao                                                                      #
+###############################################################################
+# numero de elementos do <script> e de <link> na arvore atual
+def count_nodes(root):
+    if root == None:
+        return 0
+    return sum(1 for _ in root.find("script").iter()) - 1
+
+def count_links(root):
+    if root == None or root.find("links") == None:
+        return 0
+    return len(root.find("links"))
+
+# executa as etapas uma vez, com uma unica forma de medicao: nenhuma (tempo), "memory" (tracemalloc) ou "profile" (cProfile)
+# retorna a ElementTree compilada (ou None) e a lista de medidas das etapas executadas
+def _run_pass(source, defaults, json_file, stages, instrument = None, profile_dir = None):
+    state = {"source": source, "defaults": defaults, "json_file": json_file, "tree": None, "root": None}
+    report = []
+    for n, (stage_name, stage) in enumerate(stages, start = 1):
+        profiler = None
+        if instrument == "memory":
+            tracemalloc.start()
+        elif instrument == "profile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        wall, cpu = time.perf_counter(), time.process_time()
+        ok = stage(state)
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        peak = None
+        if instrument == "memory":
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        elif instrument == "profile":
+            profiler.disable()
+            profiler.dump_stats(os.path.join(profile_dir, str(n) + "_" + stage_name + ".prof"))
+        report.append({"stage": stage_name, "wall": wall, "cpu": cpu, "peak_memory": peak,
+                       "nodes": count_nodes(state["root"]), "links": count_links(state["root"]), "ok": ok})
+        if not ok:
+            break
+    return (state["tree"] if ok else None), report
+
+# executa as etapas sobre source (caminho, objeto file ou ElementTree) e mede cada uma delas
+# o tempo vem de uma execucao sem instrumentacao. Com trace_memory = True, uma segunda execucao mede o pico de memoria
+# de cada etapa (tracemalloc) e, com profile_dir, uma terceira grava o cProfile de cada etapa em profile_dir/<n>_<etapa>.prof
+# com optimize = True, a otimizacao do grafo (eva_optimizer) e' executada e medida antes do mapeamento para o Json
+# retorna a ElementTree compilada (ou None, caso haja erro) e a lista de medidas das etapas executadas
+def run_stages(source, defaults = False, json_file = os.devnull, trace_memory = True, profile_dir = None, optimize = False):
+    if profile_dir != None:
+        os.makedirs(profile_dir, exist_ok = True)
+    eva_validator.get_validator() # a carga do validador nao faz parte da medicao da validacao
+    stages = STAGES
+    if optimize:
+        stages = STAGES[:-1] + [("optimize", _optimize)] + STAGES[-1:]
+
+    instruments = []
+    if trace_memory:
+        instruments.append("memory")
+    if profile_dir != None:
+        instruments.append("profile")
+    if instruments and not isinstance(source, str): # cada execucao le o script de novo (as etapas alteram a arvore)
+        data = io.BytesIO()
+        if eva_xml.is_tree(source):
+            source.write(data, "UTF-8")
+        else:
+            data.write(source.read())
+        data = data.getvalue()
+        open_source = lambda: io.BytesIO(data)
+    else:
+        open_source = lambda: source
+
+    tree, report = _run_pass(open_source(), defaults, json_file, stages)
+    for instrument in instruments:
+        with contextlib.redirect_stdout(io.StringIO()): # as mensagens das etapas ja foram impressas
+            _, measures = _run_pass(open_source(), defaults, os.devnull, stages, instrument, profile_dir)
+        if instrument == "memory":
+            for measure, traced in zip(report, measures):
+                measure["peak_memory"] = traced["peak_memory"]
+    return tree, report
+
+def print_report(report):
+    print("==> Profile (per stage)")
+    print("    %-10s %10s %10s %14s %8s %8s" % ("stage", "wall(s)", "cpu(s)", "peak mem(KiB)", "nodes", "links"))
+    for measure in report:
+        peak = "-" if measure["peak_memory"] == None else "%.1f" % (measure["peak_memory"] / 1024)
+        print("    %-10s %10.4f %10.4f %14s %8d %8d%s" % (measure["stage"], measure["wall"], measure["cpu"], peak,
+              measure["nodes"], measure["links"], "" if measure["ok"] else "  (error)"))
+    print("    %-10s %10.4f %10.4f" % ("total", sum(m["wall"] for m in report), sum(m["cpu"] for m in report)))
@@ -0,0 +1,829 @@
+# validador do EvaML gerado por eva_validator_gen.py a partir de evaml-schema/evaml_schema.xsd. Nao edite este arquivo:
+# depois de mudar o xsd, execute python3 eva_validator_gen.py
+
+import re
+
+# os tipos primitivos com whitespace "collapse" aceitam espacos antes e depois do valor
+# NCName: os caracteres de \i e \c do xsd (xml 1.0, 5a edicao), sem o ":"
+_NAME_START = "A-Z_a-z\u00C0-\u00D6\u00D8-\u00F6\u00F8-\u02FF\u0370-\u037D\u037F-\u1FFF\u200C-\u200D\u2070-\u218F\u2C00-\u2FEF\u3001-\uD7FF\uF900-\uFDCF\uFDF0-\uFFFD"
+_NAME_CHAR = _NAME_START + ".0-9\u00B7\u0300-\u036F\u203F\u2040-"
+_NCNAME = re.compile("[ \t\n\r]*[" + _NAME_START + "][" + _NAME_CHAR + "]*[ \t\n\r]*")
+_INTEGER = re.compile("[ \t\n\r]*[+-]?[0-9]+[ \t\n\r]*")
+_SPACES = re.compile("[ \t\n\r]+")
+
+# whitespace "collapse" do xsd
+def _collapse(value):
+    return _SPACES.sub(" ", value).strip(" ")
+
+def _ncname(value):
+    return _NCNAME.fullmatch(value) != None
+
+def _integer(value, min_value, max_value):
+    if _INTEGER.fullmatch(value) == None:
+        return False
+    number = int(value) # int() tambem ignora os espacos
+    return (min_value == None or number >= min_value) and (max_value == None or number <= max_value)
+
+def _invalid(name, value):
+    return "attribute " + name + "=" + repr(value) + ": invalid value"
+
+def _missing(name):
+    return "missing required attribute " + repr(name)
+
+# atributos do namespace xsi aceitos em qualquer elemento
+XSI_ATTRIBUTES = frozenset(["{http://www.w3.org/2001/XMLSchema-instance}noNamespaceSchemaLocation",
+                            "{http://www.w3.org/2001/XMLSchema-instance}schemaLocation"])
+
+# conteudo dos elementos: sem texto, apenas elementos (o texto entre eles deve ser espaco em branco) ou misto
+TEXT_EMPTY = 0
+TEXT_ELEMENTS = 1
+TEXT_MIXED = 2
+
+XSD_SHA256 = 'e76112fcb2153839b9b481cdf85d0ced539267e0b4eee1704593556e7ba9f729'
+
+ROOT = 'evaml'
+
+# valores default dos atributos, indexados pelo nome do elemento
+DEFAULTS = {'light': {'color': 'WHITE'}, 'audioEffects': {'vol': '100%'}}
+
+
+# tipos simples
+_ENUM_voiceListType = frozenset(['de-DE_BirgitV3Voice', 'de-DE_DieterV3Voice', 'en-US_AllisonExpressive', 'en-US_AllisonV3Voice', 'en-US_EmilyV3Voice', 'en-US_EmmaExpressive', 'en-US_HenryV3Voice', 'en-US_KevinV3Voice', 'en-US_LisaExpressive', 'en-US_MichaelExpressive', 'en-US_MichaelV3Voice', 'en-US_OliviaV3Voice', 'es-ES_EnriqueV3Voice', 'es-ES_LauraV3Voice', 'es-LA_SofiaV3Voice', 'fr-FR_NicolasV3Voice', 'fr-FR_ReneeV3Voice', 'pt-BR_IsabelaV3Voice'])
+_ENUM_lightStateType = frozenset(['OFF', 'ON'])
+_ENUM_lightListColorType = frozenset(['BLACK', 'BLUE', 'GREEN', 'PINK', 'RED', 'WHITE', 'YELLOW'])
+_RE_lightRgbColorType = re.compile('(?:#[\\dA-F | a-f ]{6}([\\dA-F | a-f][\\dA-F | a-f])?)')
+_ENUM_evaEmotionType = frozenset(['ANGRY', 'DISGUST', 'FEAR', 'HAPPY', 'INLOVE', 'NEUTRAL', 'SAD', 'SURPRISE'])
+_ENUM_languageType = frozenset(['DE', 'EN', 'FR', 'PT'])
+_ENUM_listenLanguageType = frozenset(['en-US', 'es-ES', 'pt-BR'])
+_ENUM_audioListType = frozenset(['MUTED-SOUND', 'efx-aplausos-bom', 'efx-blin', 'efx-blin2', 'efx-cheering', 'efx-crowdapplause1', 'efx-display', 'efx-display2', 'efx-fanfare', 'efx-harp-gliss', 'efx-mario-end-01', 'efx-mario-end-02', 'efx-mario-end-03', 'efx-mario-fundo', 'efx-mario-game-intro', 'efx-mario-sound1', 'efx-mario-sound1-longo', 'efx-mario-sound2', 'efx-mario-start-01', 'efx-mario-start-02', 'efx-robot', 'efx-robot-arm', 'efx-robot-head', 'efx-susto', 'efx-tic-toc', 'efx-trombone-triste', 'efx-wand1', 'song-aquarela', 'song-ben', 'song-caneta-azul', 'song-exodus', 'song-fear', 'song-happy', 'song-here-comes-the-sun', 'song-i-believe-i-can-fly', 'song-i-will-be-there', 'song-macarena-edit', 'song-mj-heal-the-world', 'song-mj-thriller2', 'song-mj-thriller3-laugh', 'song-oh-no', 'song-rude-magic', 'song-sad-violin', 'song-samba-loop', 'song-surprise', 'song-take-on-me', 'song-the-girl-from-ipanema', 'song-the-imperial-march', 'song-thriller-open', 'song-vivaldi-spring', 'song-weird-science'])
+_ENUM_audioBlockType = frozenset(['FALSE', 'TRUE'])
+_ENUM_ledAnimationType = frozenset(['ANGRY', 'ANGRY2', 'HAPPY', 'LISTEN', 'RAINBOW', 'SAD', 'SPEAK', 'STOP', 'SURPRISE', 'WHITE'])
+_RE_counterVarType = re.compile('(?:[a-zA-Z_][a-zA-Z0-9_]*)')
+_ENUM_counterOpType = frozenset(['%', '*', '+', '/', '='])
+_RE_switchVarOnlyDollar = re.compile('(?:\\$[1-9-]?[0-9]*)')
+_RE_switchVarAll = re.compile('(?:[a-zA-Z_][a-zA-Z0-9_]*)')
+_ENUM_headMotionListType = frozenset(['2DOWN', '2DOWN_LEFT', '2DOWN_RIGHT', '2LEFT', '2NO', '2RIGHT', '2UP', '2UP_LEFT', '2UP_RIGHT', '2YES', 'CENTER', 'CENTER_X', 'CENTER_Y', 'DOWN', 'DOWN1', 'DOWN2', 'DOWN_LEFT', 'DOWN_RIGHT', 'LEFT', 'LEFT1', 'LEFT2', 'LEFT3', 'LEFT_DOWN1', 'LEFT_DOWN2', 'LEFT_DOWN3', 'LEFT_UP1', 'LEFT_UP2', 'LEFT_UP3', 'NO', 'RIGHT', 'RIGHT1', 'RIGHT2', 'RIGHT3', 'RIGHT_DOWN1', 'RIGHT_DOWN2', 'RIGHT_DOWN3', 'RIGHT_UP1', 'RIGHT_UP2', 'RIGHT_UP3', 'UP', 'UP1', 'UP2', 'UP_LEFT', 'UP_RIGHT', 'YES'])
+_ENUM_armMotionListType = frozenset(['DOWN', 'POSITION 0', 'POSITION 1', 'POSITION 2', 'POSITION 3', 'SHAKE1', 'SHAKE2', 'UP'])
+_ENUM_modeType = frozenset(['OFF', 'ON'])
+_ENUM_caseOpType = frozenset(['contain', 'eq', 'exact', 'gt', 'gte', 'lt', 'lte', 'ne'])
+
+def _idType(value):
+    return _ncname(value)
+
+def _voiceListType(value):
+    return value in _ENUM_voiceListType
+
+def _lightStateType(value):
+    return value in _ENUM_lightStateType
+
+def _lightListColorType(value):
+    return value in _ENUM_lightListColorType
+
+def _lightRgbColorType(value):
+    value = _collapse(value)
+    return _RE_lightRgbColorType.fullmatch(value) != None
+
+def _lightColorType(value):
+    return _lightListColorType(value) or _lightRgbColorType(value)
+
+def _evaEmotionType(value):
+    return value in _ENUM_evaEmotionType
+
+def _languageType(value):
+    return value in _ENUM_languageType
+
+def _listenLanguageType(value):
+    return value in _ENUM_listenLanguageType
+
+def _audioListType(value):
+    return value in _ENUM_audioListType
+
+def _audioBlockType(value):
+    return value in _ENUM_audioBlockType
+
+def _ledAnimationType(value):
+    return value in _ENUM_ledAnimationType
+
+def _counterVarType(value):
+    value = _collapse(value)
+    return _RE_counterVarType.fullmatch(value) != None
+
+def _counterOpType(value):
+    return value in _ENUM_counterOpType
+
+def _switchVarOnlyDollar(value):
+    value = _collapse(value)
+    return _RE_switchVarOnlyDollar.fullmatch(value) != None
+
+def _switchVarAll(value):
+    value = _collapse(value)
+    return _RE_switchVarAll.fullmatch(value) != None
+
+def _switchVarType(value):
+    return _switchVarOnlyDollar(value) or _switchVarAll(value)
+
+def _headMotionListType(value):
+    return value in _ENUM_headMotionListType
+
+def _armMotionListType(value):
+    return value in _ENUM_armMotionListType
+
+def _modeType(value):
+    return value in _ENUM_modeType
+
+def _caseOpType(value):
+    return value in _ENUM_caseOpType
+
+
+# atributos de cada elemento. Os erros sao acrescentados em errors, os xs:ID em ids e os xs:IDREF em idrefs
+_NAMES_mqtt = frozenset(['topic', 'message'])
+_NAMES_random = frozenset(['id', 'min', 'max', 'var'])
+_NAMES_wait = frozenset(['id', 'duration'])
+_NAMES_talk = frozenset(['id', 'tone'])
+_NAMES_stop = frozenset([])
+_NAMES_light = frozenset(['id', 'state', 'color'])
+_NAMES_goto = frozenset(['target'])
+_NAMES_userEmotion = frozenset(['id', 'var'])
+_NAMES_userHandPose = frozenset(['id', 'var'])
+_NAMES_userID = frozenset(['id', 'var'])
+_NAMES_qrRead = frozenset(['id', 'var'])
+_NAMES_evaEmotion = frozenset(['id', 'emotion'])
+_NAMES_textEmotion = frozenset(['id', 'language', 'var'])
+_NAMES_useMacro = frozenset(['macro'])
+_NAMES_listen = frozenset(['id', 'var', 'language'])
+_NAMES_audio = frozenset(['id', 'source', 'block'])
+_NAMES_led = frozenset(['id', 'animation'])
+_NAMES_counter = frozenset(['id', 'var', 'op', 'value'])
+_NAMES_switch = frozenset(['id', 'var'])
+_NAMES_motion = frozenset(['id', 'type', 'head', 'left-arm', 'right-arm'])
+_NAMES_voice = frozenset(['tone'])
+_NAMES_lightEffects = frozenset(['mode'])
+_NAMES_audioEffects = frozenset(['mode', 'vol'])
+_NAMES_loop = frozenset(['id', 'var', 'times'])
+_NAMES_case = frozenset(['op', 'value'])
+_NAMES_default = frozenset([])
+_NAMES_macro = frozenset(['id'])
+_NAMES_evaml = frozenset(['name'])
+_NAMES_settings = frozenset([])
+_NAMES_script = frozenset([])
+_NAMES_macros = frozenset([])
+
+def _attributes_mqtt(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('topic')
+    if value != None:
+        present += 1
+    else:
+        errors.append(_missing('topic'))
+    value = attrib.get('message')
+    if value != None:
+        present += 1
+    else:
+        errors.append(_missing('message'))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_mqtt and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_random(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('min')
+    if value != None:
+        present += 1
+        if not _integer(value, 0, None):
+            errors.append(_invalid('min', value))
+    else:
+        errors.append(_missing('min'))
+    value = attrib.get('max')
+    if value != None:
+        present += 1
+        if not _integer(value, 0, None):
+            errors.append(_invalid('max', value))
+    else:
+        errors.append(_missing('max'))
+    value = attrib.get('var')
+    if value != None:
+        present += 1
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_random and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_wait(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('duration')
+    if value != None:
+        present += 1
+        if not _integer(value, 0, None):
+            errors.append(_invalid('duration', value))
+    else:
+        errors.append(_missing('duration'))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_wait and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_talk(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('tone')
+    if value != None:
+        present += 1
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_talk and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_stop(attrib, errors, ids, idrefs):
+    if attrib:
+        for attr_name in attrib:
+            if attr_name not in _NAMES_stop and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_light(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('state')
+    if value != None:
+        present += 1
+        if not _lightStateType(value):
+            errors.append(_invalid('state', value))
+    else:
+        errors.append(_missing('state'))
+    value = attrib.get('color')
+    if value != None:
+        present += 1
+        if not _lightColorType(value):
+            errors.append(_invalid('color', value))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_light and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_goto(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('target')
+    if value != None:
+        present += 1
+        if not _ncname(value):
+            errors.append(_invalid('target', value))
+        else:
+            value = value.strip(" \t\n\r")
+            idrefs.append(value)
+    else:
+        errors.append(_missing('target'))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_goto and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_userEmotion(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('var')
+    if value != None:
+        present += 1
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_userEmotion and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_userHandPose(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('var')
+    if value != None:
+        present += 1
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_userHandPose and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_userID(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('var')
+    if value != None:
+        present += 1
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_userID and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_qrRead(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('var')
+    if value != None:
+        present += 1
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_qrRead and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_evaEmotion(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('emotion')
+    if value != None:
+        present += 1
+        if not _evaEmotionType(value):
+            errors.append(_invalid('emotion', value))
+    else:
+        errors.append(_missing('emotion'))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_evaEmotion and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_textEmotion(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('language')
+    if value != None:
+        present += 1
+        if not _languageType(value):
+            errors.append(_invalid('language', value))
+    value = attrib.get('var')
+    if value != None:
+        present += 1
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_textEmotion and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_useMacro(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('macro')
+    if value != None:
+        present += 1
+        if not _ncname(value):
+            errors.append(_invalid('macro', value))
+        else:
+            value = value.strip(" \t\n\r")
+            idrefs.append(value)
+    else:
+        errors.append(_missing('macro'))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_useMacro and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_listen(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('var')
+    if value != None:
+        present += 1
+    value = attrib.get('language')
+    if value != None:
+        present += 1
+        if not _listenLanguageType(value):
+            errors.append(_invalid('language', value))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_listen and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_audio(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('source')
+    if value != None:
+        present += 1
+    else:
+        errors.append(_missing('source'))
+    value = attrib.get('block')
+    if value != None:
+        present += 1
+        if not _audioBlockType(value):
+            errors.append(_invalid('block', value))
+    else:
+        errors.append(_missing('block'))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_audio and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_led(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('animation')
+    if value != None:
+        present += 1
+        if not _ledAnimationType(value):
+            errors.append(_invalid('animation', value))
+    else:
+        errors.append(_missing('animation'))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_led and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_counter(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('var')
+    if value != None:
+        present += 1
+        if not _counterVarType(value):
+            errors.append(_invalid('var', value))
+    else:
+        errors.append(_missing('var'))
+    value = attrib.get('op')
+    if value != None:
+        present += 1
+        if not _counterOpType(value):
+            errors.append(_invalid('op', value))
+    else:
+        errors.append(_missing('op'))
+    value = attrib.get('value')
+    if value != None:
+        present += 1
+        if not _integer(value, None, None):
+            errors.append(_invalid('value', value))
+    else:
+        errors.append(_missing('value'))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_counter and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_switch(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('var')
+    if value != None:
+        present += 1
+        if not _switchVarType(value):
+            errors.append(_invalid('var', value))
+    else:
+        errors.append(_missing('var'))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_switch and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_motion(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('type')
+    if value != None:
+        present += 1
+        if not _headMotionListType(value):
+            errors.append(_invalid('type', value))
+    value = attrib.get('head')
+    if value != None:
+        present += 1
+        if not _headMotionListType(value):
+            errors.append(_invalid('head', value))
+    value = attrib.get('left-arm')
+    if value != None:
+        present += 1
+        if not _armMotionListType(value):
+            errors.append(_invalid('left-arm', value))
+    value = attrib.get('right-arm')
+    if value != None:
+        present += 1
+        if not _armMotionListType(value):
+            errors.append(_invalid('right-arm', value))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_motion and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_voice(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('tone')
+    if value != None:
+        present += 1
+    else:
+        errors.append(_missing('tone'))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_voice and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_lightEffects(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('mode')
+    if value != None:
+        present += 1
+        if not _modeType(value):
+            errors.append(_invalid('mode', value))
+    else:
+        errors.append(_missing('mode'))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_lightEffects and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_audioEffects(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('mode')
+    if value != None:
+        present += 1
+        if not _modeType(value):
+            errors.append(_invalid('mode', value))
+    else:
+        errors.append(_missing('mode'))
+    value = attrib.get('vol')
+    if value != None:
+        present += 1
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_audioEffects and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_loop(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    value = attrib.get('var')
+    if value != None:
+        present += 1
+        if not _switchVarType(value):
+            errors.append(_invalid('var', value))
+    value = attrib.get('times')
+    if value != None:
+        present += 1
+        if not _integer(value, -2 ** 31, 2 ** 31 - 1):
+            errors.append(_invalid('times', value))
+    else:
+        errors.append(_missing('times'))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_loop and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_case(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('op')
+    if value != None:
+        present += 1
+        if not _caseOpType(value):
+            errors.append(_invalid('op', value))
+    else:
+        errors.append(_missing('op'))
+    value = attrib.get('value')
+    if value != None:
+        present += 1
+    else:
+        errors.append(_missing('value'))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_case and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_default(attrib, errors, ids, idrefs):
+    if attrib:
+        for attr_name in attrib:
+            if attr_name not in _NAMES_default and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_macro(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('id')
+    if value != None:
+        present += 1
+        if not _idType(value):
+            errors.append(_invalid('id', value))
+        else:
+            value = value.strip(" \t\n\r")
+            if value in ids:
+                errors.append("attribute id=" + repr(value) + ": duplicated xs:ID value")
+            ids.add(value)
+    else:
+        errors.append(_missing('id'))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_macro and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_evaml(attrib, errors, ids, idrefs):
+    present = 0
+    value = attrib.get('name')
+    if value != None:
+        present += 1
+    else:
+        errors.append(_missing('name'))
+    if present != len(attrib):
+        for attr_name in attrib:
+            if attr_name not in _NAMES_evaml and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_settings(attrib, errors, ids, idrefs):
+    if attrib:
+        for attr_name in attrib:
+            if attr_name not in _NAMES_settings and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_script(attrib, errors, ids, idrefs):
+    if attrib:
+        for attr_name in attrib:
+            if attr_name not in _NAMES_script and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+def _attributes_macros(attrib, errors, ids, idrefs):
+    if attrib:
+        for attr_name in attrib:
+            if attr_name not in _NAMES_macros and attr_name not in XSI_ATTRIBUTES:
+                errors.append(repr(attr_name) + " attribute not allowed for element")
+
+
+# modelos de conteudo: (transicoes de cada estado por tag do filho, estados finais). O estado inicial e' o 0
+_CONTENT_EMPTY = (({},), frozenset([0]))
+_CONTENT_switch = (({'case': 1}, {'case': 1, 'default': 2}, {}), frozenset([1, 2]))
+_CONTENT_loop = (({'loop': 0, 'mqtt': 0, 'random': 0, 'wait': 0, 'talk': 0, 'stop': 0, 'light': 0, 'goto': 0, 'motion': 0, 'userEmotion': 0, 'userHandPose': 0, 'textEmotion': 0, 'userID': 0, 'qrRead': 0, 'evaEmotion': 0, 'useMacro': 0, 'listen': 0, 'audio': 0, 'led': 0, 'counter': 0, 'switch': 0},), frozenset([0]))
+_CONTENT_evaml = (({'settings': 1}, {'script': 2}, {'macros': 3}, {}), frozenset([2, 3]))
+_CONTENT_settings = (({'voice': 1, 'lightEffects': 2, 'audioEffects': 3}, {'lightEffects': 4, 'audioEffects': 5}, {'voice': 4, 'audioEffects': 6}, {'voice': 5, 'lightEffects': 6}, {'audioEffects': 7}, {'lightEffects': 7}, {'voice': 7}, {}), frozenset([1, 4, 5, 7]))
+_CONTENT_macros = (({'macro': 1}, {'macro': 1}), frozenset([1]))
+
+# tag -> (verificacao dos atributos, texto, modelo de conteudo)
+ELEMENTS = {
+    'mqtt': (_attributes_mqtt, TEXT_EMPTY, _CONTENT_EMPTY),
+    'random': (_attributes_random, TEXT_EMPTY, _CONTENT_EMPTY),
+    'wait': (_attributes_wait, TEXT_EMPTY, _CONTENT_EMPTY),
+    'talk': (_attributes_talk, TEXT_MIXED, _CONTENT_EMPTY),
+    'stop': (_attributes_stop, TEXT_EMPTY, _CONTENT_EMPTY),
+    'light': (_attributes_light, TEXT_EMPTY, _CONTENT_EMPTY),
+    'goto': (_attributes_goto, TEXT_EMPTY, _CONTENT_EMPTY),
+    'userEmotion': (_attributes_userEmotion, TEXT_EMPTY, _CONTENT_EMPTY),
+    'userHandPose': (_attributes_userHandPose, TEXT_EMPTY, _CONTENT_EMPTY),
+    'userID': (_attributes_userID, TEXT_EMPTY, _CONTENT_EMPTY),
+    'qrRead': (_attributes_qrRead, TEXT_EMPTY, _CONTENT_EMPTY),
+    'evaEmotion': (_attributes_evaEmotion, TEXT_EMPTY, _CONTENT_EMPTY),
+    'textEmotion': (_attributes_textEmotion, TEXT_EMPTY, _CONTENT_EMPTY),
+    'useMacro': (_attributes_useMacro, TEXT_EMPTY, _CONTENT_EMPTY),
+    'listen': (_attributes_listen, TEXT_EMPTY, _CONTENT_EMPTY),
+    'audio': (_attributes_audio, TEXT_EMPTY, _CONTENT_EMPTY),
+    'led': (_attributes_led, TEXT_EMPTY, _CONTENT_EMPTY),
+    'counter': (_attributes_counter, TEXT_EMPTY, _CONTENT_EMPTY),
+    'switch': (_attributes_switch, TEXT_ELEMENTS, _CONTENT_switch),
+    'motion': (_attributes_motion, TEXT_EMPTY, _CONTENT_EMPTY),
+    'voice': (_attributes_voice, TEXT_EMPTY, _CONTENT_EMPTY),
+    'lightEffects': (_attributes_lightEffects, TEXT_EMPTY, _CONTENT_EMPTY),
+    'audioEffects': (_attributes_audioEffects, TEXT_EMPTY, _CONTENT_EMPTY),
+    'loop': (_attributes_loop, TEXT_ELEMENTS, _CONTENT_loop),
+    'case': (_attributes_case, TEXT_ELEMENTS, _CONTENT_loop),
+    'default': (_attributes_default, TEXT_ELEMENTS, _CONTENT_loop),
+    'macro': (_attributes_macro, TEXT_ELEMENTS, _CONTENT_loop),
+    'evaml': (_attributes_evaml, TEXT_ELEMENTS, _CONTENT_evaml),
+    'settings': (_attributes_settings, TEXT_ELEMENTS, _CONTENT_settings),
+    'script': (_attributes_script, TEXT_ELEMENTS, _CONTENT_loop),
+    'macros': (_attributes_macros, TEXT_ELEMENTS, _CONTENT_macros),
+}
@@ -1,26 +1,207 @@
+import os
 import sys
 import json
+import sqlite3
+import tempfile
 
-def send_to_dbjson(script_id, script_name, output):
+# banco de dados do robô. O EVA le as interacoes deste arquivo
+DB_FILE = "../db.json"
+
+# os scripts ficam armazenados em um banco SQLite ao lado do db.json (db.json.sqlite), indexados pelo _id
+# cada interacao e' guardada ja serializada. Assim, salvar um script nao exige ler e converter o db.json inteiro
+# o db.json e' exportado a partir do banco, com o mesmo conteudo gerado pelo json.dump da versao anterior
+# salvar o ultimo script da lista (o caso comum: o mesmo script salvo varias vezes) ou um script novo regrava apenas
+# o fim do db.json, a partir da posicao desse script (update_dbjson). Nos demais casos, o db.json e' exportado inteiro
+def store_file(db_file = DB_FILE):
+    return db_file + ".sqlite"
+
+# retorna None se nao ha db.json nem o banco (o banco so e' criado a partir de um db.json existente)
+def open_store(db_file = DB_FILE):
+    if not os.path.exists(db_file) and not os.path.exists(store_file(db_file)):
+        print("  Error -> The robot's database file was not found: " + db_file)
+        return None
+    store = sqlite3.connect(store_file(db_file), timeout = 60, isolation_level = None) # as transacoes sao controladas abaixo
+    store.execute("CREATE TABLE IF NOT EXISTS db_keys (pos INTEGER PRIMARY KEY, key TEXT, value TEXT)") # demais chaves do db.json, na ordem original
+    store.execute("CREATE TABLE IF NOT EXISTS interaccion (seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE, data TEXT)")
+    store.execute("CREATE TABLE IF NOT EXISTS db_state (name TEXT PRIMARY KEY, value TEXT)")
+    return store
+
+# identifica a versao do db.json no disco. Se ela mudar (o robô tambem altera o arquivo), o banco e' recarregado
+def db_file_state(db_file):
+    st = os.stat(db_file)
+    return str(st.st_mtime_ns) + ":" + str(st.st_size)
+
+# (re)carrega o db.json no banco. Chamada dentro de uma transacao
+def import_dbjson(store, db_file):
+    with open(db_file, "r") as dbfile:
+        eva_db_dict = json.load(dbfile)
+    store.execute("DELETE FROM db_keys")
+    store.execute("DELETE FROM interaccion")
+    store.execute("DELETE FROM db_state WHERE name = 'tail'") # as posicoes do db.json anterior nao valem mais
+    for pos, (key, value) in enumerate(eva_db_dict.items()):
+        if key == "interaccion": # value NULL marca a posicao da lista de interacoes
+            store.execute("INSERT INTO db_keys VALUES (?, ?, NULL)", (pos, key))
+        else:
+            store.execute("INSERT INTO db_keys VALUES (?, ?, ?)", (pos, key, json.dumps(value)))
+    for item in eva_db_dict.get("interaccion", []):
+        upsert(store, item.get("_id"), json.dumps(item))
+
+# atualiza o banco caso o db.json tenha sido alterado desde o ultimo export. Chamada dentro de uma transacao
+# retorna False se nao ha db.json nem um banco carregado anteriormente
+def sync_store(store, db_file):
+    saved_state = store.execute("SELECT value FROM db_state WHERE name = 'db_file_state'").fetchone()
+    if os.path.exists(db_file):
+        if saved_state == None or saved_state[0] != db_file_state(db_file): # o banco esta desatualizado
+            try:
+                import_dbjson(store, db_file)
+            except ValueError: # json invalido. Ex.: a gravacao do fim do arquivo (update_dbjson) foi interrompida
+                if saved_state == None:
+                    raise
+                print("  WARNING -> The robot's database file is not a valid JSON file. It was written again from " + store_file(db_file) + ".")
+                store.execute("DELETE FROM db_state WHERE name = 'tail'")
+                export_dbjson(store, db_file)
+    elif saved_state == None:
+        print("  Error -> The robot's database file was not found: " + db_file)
+        return False
+    return True
+
+# insere ou substitui o script. O script salvo vai para o fim da lista, como na versao anterior
+def upsert(store, script_id, data):
+    store.execute("DELETE FROM interaccion WHERE id = ?", (script_id,))
+    store.execute("INSERT INTO interaccion (id, data) VALUES (?, ?)", (script_id, data))
+
+# texto do db.json antes e depois da lista de interacoes: (head, tail). tail e' None quando nao ha a lista de interacoes
+def dbjson_parts(store):
+    parts = ["{"]
+    head = None
+    for pos, (key, value) in enumerate(store.execute("SELECT key, value FROM db_keys ORDER BY pos").fetchall()):
+        if pos > 0:
+            parts.append(", ")
+        parts.append(json.dumps(key) + ": ")
+        if value != None:
+            parts.append(value)
+        else: # a lista de interacoes
+            head = "".join(parts) + "["
+            parts = ["]"]
+    parts.append("}")
+    if head == None:
+        return "".join(parts), None
+    return head, "".join(parts)
+
+# guarda a posicao (em bytes) do ultimo script da lista no db.json e a posicao do fim da lista
+# o db.json e' gravado em ASCII (json.dumps com ensure_ascii), entao cada caractere e' um byte
+def save_tail(store, script_id, start, end):
+    store.execute("INSERT OR REPLACE INTO db_state VALUES ('tail', ?)", (json.dumps({"id": script_id, "start": start, "end": end}),))
+
+# grava o db.json a partir do banco. O arquivo e' escrito em um temporario e depois renomeado (escrita atomica)
+# chamada dentro da transacao, para que outra gravacao nao exporte o banco ao mesmo tempo
+def export_dbjson(store, db_file):
+    head, tail = dbjson_parts(store)
+    fd, tmp_file = tempfile.mkstemp(dir = os.path.dirname(os.path.abspath(db_file)))
+    try:
+        # o temporario e' criado com permissao 0600. O db.json mantem a permissao que ja tinha
+        os.chmod(tmp_file, os.stat(db_file).st_mode if os.path.exists(db_file) else 0o644)
+        with os.fdopen(fd, "w") as fp:
+            fp.write(head)
+            if tail != None:
+                end = len(head)
+                last_id, last_start = None, None
+                for i, (script_id, data) in enumerate(store.execute("SELECT id, data FROM interaccion ORDER BY seq")):
+                    if i > 0:
+                        fp.write(", ")
+                        end += 2
+                    fp.write(data)
+                    last_id, last_start = script_id, end
+                    end += len(data)
+                fp.write(tail)
+        os.replace(tmp_file, db_file)
+    except BaseException:
+        os.remove(tmp_file)
+        raise
+    store.execute("DELETE FROM db_state WHERE name = 'tail'")
+    if tail != None:
+        save_tail(store, last_id, last_start, end)
+    store.execute("INSERT OR REPLACE INTO db_state VALUES ('db_file_state', ?)", (db_file_state(db_file),))
+
+# regrava apenas o fim do db.json, depois do upsert do script: a partir do proprio script, quando ele ja era o ultimo
+# da lista, ou a partir do fim da lista, quando o script e' novo. Chamada dentro da transacao
+# retorna False quando isso nao e' possivel (ex.: o script estava no meio da lista). Nesse caso, o db.json deve ser exportado
+def update_dbjson(store, db_file, script_id, data, was_last, is_new):
+    tail = store.execute("SELECT value FROM db_state WHERE name = 'tail'").fetchone()
+    if tail == None or not os.path.exists(db_file):
+        return False
+    tail = json.loads(tail[0])
+    if was_last and tail["start"] != None and tail["id"] == script_id:
+        offset = start = tail["start"] # o script substitui a versao anterior
+        text = data
+    elif is_new:
+        offset = tail["end"] # o script e' acrescentado no fim da lista
+        text = (", " if tail["start"] != None else "") + data
+        start = offset + len(text) - len(data)
+    else:
+        return False
+
+    with open(db_file, "r+b") as fp:
+        fp.seek(offset)
+        fp.write((text + dbjson_parts(store)[1]).encode("ascii"))
+        fp.truncate()
+    save_tail(store, script_id, start, start + len(data))
+    store.execute("INSERT OR REPLACE INTO db_state VALUES ('db_file_state', ?)", (db_file_state(db_file),))
+    return True
+
+# salva o script (output e' o conteudo do arquivo json gerado na etapa 04) no banco de dados do robô
+# com export = False, o db.json nao e' regravado (ex.: varios scripts salvos em sequencia, seguidos de um unico export_db())
+# retorna o nome do arquivo do banco (db_file) ou None, em caso de erro
+def send_to_dbjson(script_id, script_name, output, db_file = DB_FILE, export = True):
     print("==> Saving [" + script_name + "], id[" + script_id + "] into db.json")
-    
-    # read db.json
-    dbfile = open('db.json', 'r')
 
-    # transforma o arquivo de texto em um dict
-    eva_db_dict = json.load(dbfile)
+    # output é uma string. O script e' guardado no mesmo formato gerado pelo json.dump
+    data = json.dumps(json.loads(output))
 
-    # se o script já existe no bd, então apaga
-    for item in range(len(eva_db_dict["interaccion"])):
-        if eva_db_dict["interaccion"][item]['_id'] == script_id:
-            #print("o script de id", eva_db_dict["interaccion"][item]['_id'], "será deletado")
-            del(eva_db_dict["interaccion"][item])
+    store = open_store(db_file)
+    if store == None:
+        return None
+    try:
+        store.execute("BEGIN IMMEDIATE") # bloqueia as outras gravacoes (ex.: compilacao em paralelo) ate o commit
+        try:
+            if not sync_store(store, db_file):
+                store.execute("ROLLBACK")
+                return None
 
-    # output é uma string. a função json.loads transforma a string em um dict
-    eva_db_dict["interaccion"].append(json.loads(output))
+            # posicao do script na lista antes do upsert: o ultimo, um script novo ou no meio da lista
+            last = store.execute("SELECT id FROM interaccion ORDER BY seq DESC LIMIT 1").fetchone()
+            was_last = last != None and last[0] == script_id
+            is_new = store.execute("SELECT 1 FROM interaccion WHERE id = ?", (script_id,)).fetchone() == None
+            upsert(store, script_id, data)
 
-    # gera o arquivo
-    with open('../db.json', 'w') as fp:
-        json.dump(eva_db_dict, fp)
+            if not export: # o db.json nao corresponde mais ao banco: o proximo save exporta o arquivo inteiro
+                store.execute("DELETE FROM db_state WHERE name = 'tail'")
+            elif not update_dbjson(store, db_file, script_id, data, was_last, is_new):
+                export_dbjson(store, db_file)
+            store.execute("COMMIT")
+        except BaseException:
+            store.execute("ROLLBACK")
+            raise
+    finally:
+        store.close()
+    return db_file
 
-    #print("\nTotal scripts found:", len(eva_db_dict["interaccion"]))
+# regrava o db.json a partir do banco
+def export_db(db_file = DB_FILE):
+    store = open_store(db_file)
+    if store == None:
+        return None
+    try:
+        store.execute("BEGIN IMMEDIATE")
+        try:
+            if not sync_store(store, db_file):
+                store.execute("ROLLBACK")
+                return None
+            export_dbjson(store, db_file)
+            store.execute("COMMIT")
+        except BaseException:
+            store.execute("ROLLBACK")
+            raise
+    finally:
+        store.close()
+    return db_file
@@ -0,0 +1,642 @@
+"""
+Compilação em fluxo (streaming) de scripts EvaML muito grandes, com memória limitada.
+O arquivo é lido de forma incremental (iterparse) e cada elemento é processado e gravado no arquivo de saída assim que
+é lido: a expansão das macros e dos loops, a inserção dos <default>, a geração das chaves e a geração dos links são feitas
+em uma única passagem, sem carregar a árvore inteira. Ficam na memória apenas a pilha dos <switch>/<case> abertos,
+a tabela dos <goto> ainda não resolvidos e os ids que são alvo de algum <goto>. Os links são gravados em um arquivo
+temporário e copiados para a seção <links> no fim.
+
+O arquivo é lido três vezes: a validação (eva_validator.evaml_stream_validator), uma leitura prévia, que guarda a seção
+<macros> (ela vem depois do <script>), os alvos dos <goto> e a quantidade de loops internos de cada <loop> (para numerar
+os loops como na compilação em memória), e a compilação. Os avisos da análise do grafo são gerados com uma leitura do
+arquivo de saída.
+
+O resultado é o mesmo da compilação em memória (eva_compiler): os mesmos elementos, chaves e atributos e, para cada
+node, os mesmos links na mesma ordem. Apenas a ordem global dos <link> (e a das mensagens) pode mudar quando um <goto>
+(inclusive o de uma macro) aponta para um elemento que ainda não foi lido. Um <switch> logo depois de um <goto> só é percorrido na compilação em memória quando algum <goto>
+alcançado aponta para ele. Aqui, basta que algum <goto> do script aponte para ele.
+
+Uso:
+    python3 eva_parser.py codes-xml/script.xml -c --stream
+    import eva_stream
+    eva_stream.compile_file("codes-xml/script.xml") # grava o "name"_EvaML.xml e retorna o nome do arquivo (ou None)
+"""
+
+import os
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from array import array
+
+import eva_macro_exp
+import eva_node_keys
+import eva_validator
+import eva_xml_links
+
+EXCLUDED_NODES = set(['switch', 'script', 'stop', 'goto']) # elementos que nao recebem chaves (eva_node_keys)
+LINKS_BUFFER = 65536 # quantidade de chaves (from e to) acumuladas antes de cada gravacao no arquivo temporario dos links
+LINKS_LINE = 2048 # quantidade de chaves gravadas no arquivo de saida a cada vez (o texto dos links nao e' montado de uma vez)
+
+graph_report = None # resultado da analise do grafo da ultima compilacao (o mesmo formato de eva_xml_links.graph_report)
+
+
+###############################################################################
+# leitura previa: macros, alvos dos <goto> e loops internos                   #
+###############################################################################
+# quantidade de loops de uma macro, depois da expansao dos <useMacro> que ela contem (0 para macros com erro)
+def macro_loops(macros_index, macro_id, memo, in_use = ()):
+    if macro_id in memo:
+        return memo[macro_id]
+    if macro_id not in macros_index or macro_id in in_use:
+        return 0
+    total = 0
+    for elem in macros_index[macro_id].iter():
+        if elem.tag == "loop":
+            total += 1
+        elif elem.tag == "useMacro":
+            total += macro_loops(macros_index, elem.attrib["macro"], memo, in_use + (macro_id,))
+    memo[macro_id] = total
+    return total
+
+# le o arquivo uma vez. Os elementos do <script> sao descartados assim que terminam
+# retorna o nome do script, a secao <macros> (ou None), o conjunto dos alvos dos <goto> e a quantidade de loops internos
+# de cada <loop> do script, na ordem do documento (inclusive os loops das macros usadas dentro dele)
+def prescan(source, defaults = False):
+    schema_defaults = eva_validator.get_schema_defaults() if defaults else {}
+    goto_targets = set()
+    macros_node = None
+    loops_before = array("l") # para cada <loop>: quantidade de loops iniciados antes dele
+    uses_before = array("l") # para cada <loop>: quantidade de <useMacro> antes do seu inicio
+    loops_inner = array("l") # para cada <loop>: loops internos (sem as macros)
+    uses_inner = array("l") # para cada <loop>: quantidade de <useMacro> antes do seu fim
+    uses = array("l") # indice da macro de cada <useMacro> do script
+    macro_ids = {} # id da macro -> indice
+    open_loops = []
+    stack = []
+    section = None
+    name = None
+    for event, elem in ET.iterparse(source, events = ("start", "end")):
+        if event == "start":
+            if len(stack) == 0:
+                name = elem.attrib["name"]
+            elif len(stack) == 1:
+                section = elem.tag
+            stack.append(elem)
+            if section == "macros":
+                insert_defaults(elem, schema_defaults)
+            if elem.tag == "goto":
+                goto_targets.add(elem.attrib["target"])
+            elif section == "script" and elem.tag == "loop":
+                open_loops.append(len(loops_before))
+                loops_before.append(len(loops_before))
+                uses_before.append(len(uses))
+                loops_inner.append(0)
+                uses_inner.append(0)
+            elif section == "script" and elem.tag == "useMacro":
+                uses.append(macro_ids.setdefault(elem.attrib["macro"], len(macro_ids)))
+        else:
+            stack.pop()
+            if section == "script" and elem.tag == "loop":
+                k = open_loops.pop()
+                loops_inner[k] = len(loops_before) - loops_before[k] - 1
+                uses_inner[k] = len(uses)
+            if elem.tag == "macros" and len(stack) == 1:
+                macros_node = elem
+            elif section == "script" and len(stack) > 1: # o elemento do script ja foi lido e e' descartado
+                stack[-1].remove(elem)
+
+    # loops das macros usadas dentro de cada <loop> (soma acumulada dos loops de cada <useMacro>)
+    macros_index = {}
+    if macros_node != None:
+        for macro in macros_node:
+            macros_index[macro.attrib["id"]] = macro
+    memo = {}
+    loops_of_macro = [0] * len(macro_ids)
+    for macro_id, index in macro_ids.items():
+        loops_of_macro[index] = macro_loops(macros_index, macro_id, memo)
+    uses_loops = array("l", [0]) # uses_loops[i]: loops dos i primeiros <useMacro>
+    for index in uses:
+        uses_loops.append(uses_loops[-1] + loops_of_macro[index])
+    for k in range(len(loops_inner)):
+        loops_inner[k] += uses_loops[uses_inner[k]] - uses_loops[uses_before[k]]
+    return name, macros_node, goto_targets, loops_inner
+
+def insert_defaults(elem, schema_defaults):
+    if elem.tag in schema_defaults:
+        for attr_name, default_value in schema_defaults[elem.tag].items():
+            if elem.get(attr_name) == None:
+                elem.attrib[attr_name] = default_value
+
+
+###############################################################################
+# gravacao do xml de saida                                                    #
+###############################################################################
+# grava os elementos no mesmo formato de ElementTree.write(). O texto de um elemento so' e' conhecido no evento seguinte
+# ao seu inicio e o tail no evento seguinte ao seu fim (iterparse). Por isso, a tag de inicio e o tail sao gravados depois
+class _Writer:
+    def __init__(self, file_out):
+        self.file_out = file_out
+        self.pending_start = None # elemento cuja tag de inicio ainda nao foi gravada
+        self.pending_tail = None # elemento cujo tail ainda nao foi gravado
+        self.namespaces = {} # uri -> prefixo (ex.: o atributo xsi:noNamespaceSchemaLocation do <evaml>)
+
+    # nome qualificado, como em ElementTree.write(): "{uri}nome" -> "prefixo:nome"
+    # as declaracoes xmlns sao gravadas no elemento em que o namespace aparece pela primeira vez (o <evaml>)
+    def qname(self, name, declarations):
+        if name[:1] != "{":
+            return name
+        uri, local = name[1:].split("}", 1)
+        if uri not in self.namespaces:
+            prefix = ET._namespace_map.get(uri) or "ns%d" % len(self.namespaces)
+            self.namespaces[uri] = prefix
+            declarations.append(' xmlns:%s="%s"' % (prefix, ET._escape_attrib(uri)))
+        return self.namespaces[uri] + ":" + local
+
+    def start_tag(self, elem):
+        declarations = []
+        tag = self.qname(elem.tag, declarations)
+        attrs = "".join(' %s="%s"' % (self.qname(name, declarations), ET._escape_attrib(value)) for name, value in elem.attrib.items())
+        return "<" + tag + "".join(declarations) + attrs
+
+    def flush(self):
+        if self.pending_tail != None:
+            if self.pending_tail.tail:
+                self.file_out.write(ET._escape_cdata(self.pending_tail.tail))
+            self.pending_tail = None
+        if self.pending_start != None:
+            elem = self.pending_start
+            self.file_out.write(self.start_tag(elem) + ">")
+            if elem.text:
+                self.file_out.write(ET._escape_cdata(elem.text))
+            self.pending_start = None
+
+    def start(self, elem):
+        self.flush()
+        self.pending_start = elem
+
+    def end(self, elem):
+        if self.pending_start is elem: # elemento sem filhos
+            if elem.text:
+                self.file_out.write(self.start_tag(elem) + ">" + ET._escape_cdata(elem.text) + "</" + self.qname(elem.tag, []) + ">")
+            else:
+                self.file_out.write(self.start_tag(elem) + " />")
+            self.pending_start = None
+        else:
+            self.flush()
+            self.file_out.write("</" + self.qname(elem.tag, []) + ">")
+        self.pending_tail = elem
+
+    def write(self, text):
+        self.flush()
+        self.file_out.write(text)
+
+
+###############################################################################
+# compilacao                                                                  #
+###############################################################################
+# lista de comandos (o <script> ou o corpo de um <case>/<default>) aberta
+class _List:
+    __slots__ = ("elem", "removed", "active", "exits", "prev_tag", "removing", "empty")
+
+    def __init__(self, elem, removed, active, exits, prev_tag):
+        self.elem = elem
+        self.removed = removed # a lista esta' em um trecho removido (depois de um <stop>)
+        self.active = active # os links entre os comandos da lista sao gerados (o <case> foi alcancado)
+        self.exits = exits # chaves que se conectam ao proximo comando da lista (saidas do comando anterior)
+        self.prev_tag = prev_tag # tag do comando anterior
+        self.removing = False # os proximos comandos estao depois de um <stop> e sao removidos
+        self.empty = True
+
+# <switch> aberto
+class _Switch:
+    __slots__ = ("elem", "removed", "entered", "incoming", "cases", "listeners", "exits", "last_tag", "open")
+
+    def __init__(self, elem, removed, entered, incoming, listeners):
+        self.elem = elem
+        self.removed = removed
+        self.entered = entered # os <case> sao processados (o switch e' o destino de um link)
+        self.incoming = incoming # chaves que se conectam a cada <case>
+        self.cases = [] # chaves dos <case>/<default> ja lidos
+        self.listeners = listeners # chaves (origem de um <goto>) que tambem se conectam a cada <case>
+        self.exits = [] # saidas do switch: ultimo comando de cada <case>, ou o proprio <case>, se vazio
+        self.last_tag = None
+        self.open = True
+
+# comando sem filhos
+class _Command:
+    __slots__ = ("elem", "removed", "key")
+
+    def __init__(self, elem, removed, key):
+        self.elem = elem
+        self.removed = removed
+        self.key = key
+
+class _StreamCompiler:
+    def __init__(self, macros_node, goto_targets, loops_inner, links_file, defaults):
+        self.expander = eva_macro_exp.MacroExpander(macros_node)
+        self.goto_targets = goto_targets # ids que sao alvo de algum <goto> do script (ou das macros)
+        self.loops_inner = loops_inner
+        self.links_file = links_file
+        self.schema_defaults = eva_validator.get_schema_defaults() if defaults else {}
+        self.writer = None
+        self.frames = [] # pilha dos elementos abertos do script
+        self.loops = [] # pilha dos elementos gerados para os loops abertos
+        self.loops_read = 0 # <loop> do arquivo ja lidos
+        self.loops_done = 0 # loops ja processados (inclusive os das macros). Os loops sao numerados como em process_loop
+        self.key = 1001
+        self.targets = {} # id -> lista das chaves (ou dos _Switch) dos elementos com esse id ja lidos
+        self.loop_targets = set() # ids dos switches dos loops abertos
+        self.waiting = {} # id -> chaves que se conectam aos elementos com esse id que ainda serao lidos
+        self.waiting_message = {} # id -> posicao da mensagem em que o <goto> foi resolvido (para o erro de alvo inexistente)
+        self.gotos_resolved = bytearray() # para cada <goto> mantido no script: 1 se ele foi resolvido em algum link
+        self.links = array("q")
+        self.n_links = 0
+        self.messages = [] # mensagens da geracao dos links, impressas no fim (depois das mensagens das macros)
+        self.link_error = False
+
+    def message(self, text):
+        if not self.link_error:
+            self.messages.append(text)
+
+    def error(self, text):
+        self.message(text)
+        self.link_error = True
+
+    def add_link(self, key_from, key_to):
+        if self.link_error:
+            return
+        self.links.append(key_from)
+        self.links.append(key_to)
+        self.n_links += 1
+        if len(self.links) >= LINKS_BUFFER:
+            self.links.tofile(self.links_file)
+            self.links = array("q")
+
+    # conecta key_from aos elementos com o id target (os ja lidos agora, os proximos quando forem lidos)
+    def goto_link(self, key_from, target):
+        for entry in self.targets.get(target, ()):
+            if isinstance(entry, _Switch):
+                for case_key in entry.cases:
+                    self.add_link(key_from, case_key)
+                if entry.open:
+                    entry.listeners.append(key_from)
+            else:
+                self.add_link(key_from, entry)
+        if target in self.goto_targets:
+            self.waiting.setdefault(target, []).append(key_from)
+            self.waiting_message.setdefault(target, len(self.messages))
+
+    # elemento com id que e' alvo de algum <goto>
+    def add_target(self, target, entry):
+        self.targets.setdefault(target, []).append(entry)
+        if isinstance(entry, _Switch):
+            entry.listeners.extend(self.waiting.get(target, ()))
+        else:
+            for key_from in self.waiting.get(target, ()):
+                self.add_link(key_from, entry)
+
+    # prepara o <case>/<default> do switch alcancado (eva_xml_links.case_link)
+    def case_link(self, switch, case_elem):
+        if case_elem.tag == "case":
+            case_elem.attrib["var"] = switch.attrib["var"]
+            if case_elem.attrib["var"].isnumeric():
+                self.error('  Error -> The use of constants of any type in the "var" attribute of the <switch> command is not allowed. Please, check var="' + switch.attrib["var"] + '"')
+            elif ("$" not in case_elem.attrib["var"]) and (case_elem.attrib["op"] == "contain"):
+                self.error('  Error -> The "contain" comparison type should only be used with var="$" and not with var="' + switch.attrib["var"] + '"')
+            elif ("$" in case_elem.attrib["var"]) and (len(case_elem.attrib["var"]) > 1):
+                self.error('  Error -> Do not use "$" associated with an index in a "var" attribute of a <switch>, only use it in the texts of the <talk> command')
+            elif ("$" in case_elem.attrib["value"]) and (len(case_elem.attrib["value"]) > 1):
+                self.error('  Error -> Do not use "$" associated with an index in a "value" attribute of a <case>, only use it in the texts of the <talk> command')
+        else:
+            case_elem.attrib["value"] = ""
+            case_elem.attrib["op"] = "exact"
+
+    # inicio de um elemento do script (ja sem <loop> e <useMacro>)
+    def node_start(self, elem):
+        parent = self.frames[-1]
+        removed = parent.removed
+        linked = False # o par (comando anterior, elem) da lista e' processado
+        if isinstance(parent, _List) and not removed:
+            if parent.active and parent.prev_tag == "stop":
+                parent.removing = True
+            if parent.removing: # todos os elementos depois de um <stop> sao removidos
+                removed = True
+                if elem.get("id") == None:
+                    self.message("  WARNING - Removing unused (unreachable) commands ... <" + elem.tag + ">")
+                else:
+                    self.error('  WARNING - Removing unused (unreachable) commands ... <' + elem.tag + '>. ALERT! This element has an attribue "id" and it is "' + elem.attrib["id"] + '"')
+            elif parent.active:
+                if parent.prev_tag == "goto":
+                    self.message("  WARNING - There are elements after the <goto>. These elements may not be reached.")
+                else:
+                    linked = True
+            if not removed and parent.empty:
+                parent.empty = False
+                if parent.active and parent.elem.tag in ("case", "default"):
+                    parent.elem.attrib["child_proc"] = "true"
+
+        key = None
+        if elem.tag not in EXCLUDED_NODES:
+            if elem.tag == "light" and elem.get("state") == "ON" and elem.get("color") == None:
+                elem.attrib["color"] = "WHITE"
+            key = self.key
+            self.key += 1
+            elem.attrib["key"] = str(key)
+            if elem.tag == "case" or elem.tag == "default":
+                elem.attrib["child_proc"] = "false"
+
+        if elem.tag == "case" or elem.tag == "default":
+            parent.last_tag = elem.tag
+            if not removed:
+                if parent.entered:
+                    self.case_link(parent.elem, elem)
+                parent.cases.append(key)
+                for key_from in parent.listeners:
+                    self.add_link(key_from, key)
+                if parent.incoming: # os demais sao conectados no fim do switch, como na geracao em memoria
+                    self.add_link(parent.incoming[0], key)
+                self.writer.start(elem)
+            self.frames.append(_List(elem, removed, parent.entered and not removed, [key], elem.tag))
+            return
+
+        if elem.tag == "switch":
+            target = elem.get("id")
+            entered = not removed and (linked or target in self.goto_targets)
+            switch = _Switch(elem, removed, entered, parent.exits if linked else [], [])
+            if not removed:
+                if target in self.goto_targets or target in self.loop_targets:
+                    self.add_target(target, switch)
+                self.writer.start(elem)
+            self.frames.append(switch)
+            return
+
+        if not removed:
+            if elem.tag == "goto":
+                self.gotos_resolved.append(0)
+                if linked:
+                    self.gotos_resolved[-1] = 1
+                    for key_from in parent.exits:
+                        self.goto_link(key_from, elem.attrib["target"])
+            elif elem.tag != "stop":
+                if linked:
+                    for key_from in parent.exits:
+                        self.add_link(key_from, key)
+                if elem.get("id") in self.goto_targets:
+                    self.add_target(elem.attrib["id"], key)
+            self.writer.start(elem)
+        self.frames.append(_Command(elem, removed, key))
+
+    def node_end(self, elem):
+        frame = self.frames[-1]
+        if isinstance(frame, _Switch) and frame.last_tag != "default": # insere o <default> (eva_macro_exp.default_process)
+            default = ET.Element("default")
+            self.node_start(default)
+            self.node_end(default)
+        self.frames.pop()
+        parent = self.frames[-1]
+        if frame.removed:
+            return
+
+        if isinstance(frame, _List): # fim de um <case>/<default>
+            parent.exits.extend(frame.exits)
+        elif isinstance(frame, _Switch):
+            for key_from in frame.incoming[1:]:
+                for case_key in frame.cases:
+                    self.add_link(key_from, case_key)
+            frame.open = False
+            frame.listeners = None
+            parent.exits = frame.exits
+            parent.prev_tag = "switch"
+        else:
+            parent.exits = [] if elem.tag in ("stop", "goto") else [frame.key]
+            parent.prev_tag = elem.tag
+        self.writer.end(elem)
+
+    # o <loop> e' substituido pelos elementos de eva_macro_exp.lower_loop. O seu corpo e' lido entre o <case> e o incremento
+    def loop_start(self, loop_node, number):
+        c, s, cs, c_inc, g, df = eva_macro_exp.loop_elements(loop_node, number)
+        self.node_start(c)
+        self.node_end(c)
+        self.loop_targets.add(s.attrib["id"])
+        self.node_start(s)
+        self.node_start(cs)
+        self.loops.append((s, cs, c_inc, g, df))
+
+    def loop_end(self):
+        s, cs, c_inc, g, df = self.loops.pop()
+        for elem in (c_inc, g):
+            self.node_start(elem)
+            self.node_end(elem)
+        self.node_end(cs)
+        self.node_start(df)
+        self.node_end(df)
+        self.node_end(s)
+        self.loop_targets.discard(s.attrib["id"])
+        if s.attrib["id"] not in self.goto_targets:
+            self.targets.pop(s.attrib["id"], None)
+        self.loops_done += 1
+
+    # elementos gerados pela expansao de uma macro (ja sem <useMacro>)
+    def walk(self, elem):
+        if elem.tag == "loop":
+            self.loop_start(elem, self.loops_done + sum(1 for _ in elem.iter("loop")))
+            for child in elem:
+                self.walk(child)
+            self.loop_end()
+        else:
+            self.node_start(elem)
+            for child in elem:
+                self.walk(child)
+            self.node_end(elem)
+
+    # compila o arquivo source, gravando o xml em file_out
+    def run(self, source, file_out):
+        self.writer = _Writer(file_out)
+        stack = []
+        section = None
+        for event, elem in ET.iterparse(source, events = ("start", "end")):
+            if event == "start":
+                if len(stack) == 1:
+                    section = elem.tag
+                stack.append(elem)
+                if section != "macros":
+                    insert_defaults(elem, self.schema_defaults)
+                if len(stack) == 1: # <evaml>
+                    elem.attrib["id"] = eva_node_keys.script_id(elem.attrib["name"])
+                    self.writer.start(elem)
+                elif section == "settings":
+                    if elem.tag == "voice":
+                        elem.attrib["key"] = "1000"
+                    self.writer.start(elem)
+                elif section == "script":
+                    if len(stack) == 2:
+                        self.writer.start(elem)
+                        # o <voice> e' o primeiro comando da lista do script (eva_xml_links.xml_links)
+                        self.frames.append(_List(elem, False, True, [1000], "voice"))
+                    elif elem.tag == "loop":
+                        number = self.loops_done + self.loops_inner[self.loops_read] + 1
+                        self.loops_read += 1
+                        self.loop_start(elem, number)
+                    elif elem.tag != "useMacro":
+                        self.node_start(elem)
+            else:
+                stack.pop()
+                if len(stack) == 0: # </evaml>
+                    self.writer.flush()
+                    self.write_links()
+                    self.writer.write("</evaml>")
+                elif section == "settings":
+                    self.writer.end(elem)
+                elif section == "script":
+                    if len(stack) == 1:
+                        self.writer.end(elem)
+                        self.frames.pop()
+                    elif elem.tag == "loop":
+                        self.loop_end()
+                    elif elem.tag == "useMacro":
+                        for new_elem in self.expander.use_macro(elem):
+                            self.walk(new_elem)
+                    else:
+                        self.node_end(elem)
+                # o elemento lido e' descartado (o tail, lido depois, continua no objeto, que o _Writer ainda referencia)
+                if len(stack) > 1 and section != "macros":
+                    stack[-1].remove(elem)
+
+    def write_links(self):
+        self.links.tofile(self.links_file)
+        self.links = array("q")
+        self.links_file.flush()
+        if self.n_links == 0:
+            self.writer.write("<links />")
+            return
+        self.writer.write("<links>")
+        for links in iter_links(self.links_file):
+            for start in range(0, len(links), LINKS_LINE):
+                self.writer.write("".join('<link from="%d" to="%d" />' % (links[i], links[i + 1]) for i in range(start, min(start + LINKS_LINE, len(links)), 2)))
+        self.writer.write("</links>")
+
+
+# le os links do arquivo temporario, em blocos
+def iter_links(links_file):
+    links_file.seek(0)
+    while True:
+        data = links_file.read(LINKS_BUFFER * 8)
+        if not data:
+            return
+        links = array("q")
+        links.frombytes(data)
+        yield links
+
+
+###############################################################################
+# analise do grafo de execucao                                                #
+###############################################################################
+# o mesmo resultado de eva_xml_links.graph_analysis, sem carregar o grafo: os destinos e os nodes alcancados sao marcados
+# em um bytearray (um byte por chave), percorrendo o arquivo dos links ate' que nenhum node novo seja alcancado
+def graph_analysis(compiler, evaml_file, name):
+    n_keys = compiler.key - 1000
+    destinations = bytearray(n_keys)
+    reached = bytearray(n_keys)
+    reached[0] = 1 # voice
+    changed = True
+    first = True
+    while changed:
+        changed = False
+        for links in iter_links(compiler.links_file):
+            for i in range(0, len(links), 2):
+                key_from, key_to = links[i] - 1000, links[i + 1] - 1000
+                if first:
+                    destinations[key_to] = 1
+                if reached[key_from] and not reached[key_to]:
+                    reached[key_to] = 1
+                    changed = True
+        first = False
+
+    report = {"script": name, "nodes": 1, "links": compiler.n_links, "reachable": reached.count(1),
+        "disconnected": [], "unreachable": [], "dangling_gotos": []}
+    stack = []
+    in_script = False
+    n_gotos = 0
+    for event, elem in ET.iterparse(evaml_file, events = ("start", "end")):
+        if event == "end": # o elemento ja foi analisado e e' descartado
+            stack.pop()
+            if elem.tag == "script":
+                in_script = False
+            if len(stack) > 1:
+                stack[-1].remove(elem)
+            elif len(stack) == 1:
+                elem.clear()
+            continue
+        stack.append(elem)
+        if elem.tag == "script" and len(stack) == 2:
+            in_script = True
+        elif in_script and elem.tag == "goto": # os elementos sao analisados na ordem de script.iter() (pre-ordem)
+            if not compiler.gotos_resolved[n_gotos]:
+                report["dangling_gotos"].append(eva_xml_links.node_info(elem))
+            n_gotos += 1
+        elif in_script and elem.tag not in EXCLUDED_NODES and elem.get("key") != None:
+            report["nodes"] += 1
+            key = int(elem.attrib["key"]) - 1000
+            if not destinations[key]:
+                report["disconnected"].append(eva_xml_links.node_info(elem))
+            elif not reached[key]:
+                report["unreachable"].append(eva_xml_links.node_info(elem))
+    return report
+
+
+###############################################################################
+# compilacao em fluxo                                                         #
+###############################################################################
+# compila o arquivo source (caminho) e grava "name"_EvaML.xml em out_dir. Retorna o nome do arquivo gravado ou None
+# as mensagens sao as mesmas da compilacao em memoria (eva_compiler)
+def compile_file(source, out_dir = ".", defaults = False):
+    global graph_report
+    graph_report = None
+    if not eva_validator.evaml_stream_validator(source):
+        return None
+
+    name, macros_node, goto_targets, loops_inner = prescan(source, defaults)
+    eva_macro_exp._error = 0
+    evaml_file = os.path.join(out_dir, name + "_EvaML.xml")
+    tmp_file = evaml_file + ".tmp" # o arquivo de saida so' e' substituido depois de uma compilacao sem erros
+    try:
+        with tempfile.TemporaryFile() as links_file:
+            compiler = _StreamCompiler(macros_node, goto_targets, loops_inner, links_file, defaults)
+            with open(tmp_file, "w", encoding = "utf-8", errors = "xmlcharrefreplace", newline = "") as file_out:
+                compiler.run(source, file_out)
+            if eva_macro_exp._error == 1: # as mensagens de erro das macros ja foram impressas
+                return None
+            print("Step 01 - Processing Macros... (OK)")
+            print("Step 02 - Generating Elements keys... (OK)")
+
+            # <goto> cujo alvo nao existe: a mensagem de erro aparece no ponto em que o <goto> foi resolvido
+            missing = [(position, target) for target, position in compiler.waiting_message.items() if not compiler.targets.get(target)]
+            if missing:
+                position, target = min(missing)
+                compiler.messages[position:] = ['  Error -> The <goto> "target" attribute was not found: ' + target]
+                compiler.link_error = True
+            for text in compiler.messages:
+                print(text)
+            if compiler.link_error:
+                return None
+
+            report = graph_analysis(compiler, tmp_file, name)
+        for node in report["disconnected"]:
+            print("  WARNING -> The element <" + node["tag"] + "> is disconnected from the execution flow. Attributes: " + eva_xml_links.attrib_msg(node))
+        for node in report["unreachable"]:
+            print("  WARNING -> The element <" + node["tag"] + "> can not be reached from the beginning of the script. Attributes: " + eva_xml_links.attrib_msg(node))
+        for node in report["dangling_gotos"]:
+            print('  WARNING -> The <goto> with target "' + node["attributes"]["target"] + '" is never reached. Its jump never happens.')
+        print("step 03 - Creating the Elements <link>... (OK)")
+
+        os.replace(tmp_file, evaml_file)
+        graph_report = report
+        return evaml_file
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+if __name__ == "__main__":
+    if compile_file(sys.argv[1]) == None:
+        exit(1)
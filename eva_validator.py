@@ -1,33 +1,252 @@
-from tkinter.tix import Tree
-import xml.etree.ElementTree as ET
-import xmlschema # xmlschema validation
-from pprint import pprint
+import hashlib
+import os
+import pickle
+import tempfile
+import types
+import eva_xml # leitura do xml (ElementTree ou lxml, EVAML_XML)
+import eva_schema_validator # validador gerado a partir do xsd (eva_validator_gen.py). O caminho rapido da validacao
+import eva_validator_gen
+
+SCHEMA_FILE = "evaml-schema/evaml_schema.xsd"
+# o schema compilado (serializado com pickle) e' armazenado aqui, com o hash do xsd no nome do arquivo
+SCHEMA_CACHE_DIR = "evaml-schema/.schema_cache"
+
+_schema = None # schema carregado neste processo. Compartilhado por todas as compilacoes (ex.: compilacao em lote)
+_validator = None # validador gerado, conferido com o xsd atual
+
+# o xmlschema (a referencia) so' e' usado quando o validador gerado rejeita um arquivo. Ele gera as mensagens de erro
+# chave do cache: hash do conteudo do xsd + versao do xmlschema (um pickle de outra versao da lib nao e' compativel)
+def schema_cache_file(schema_file = SCHEMA_FILE):
+  import xmlschema
+  with open(schema_file, "rb") as xsd:
+    digest = hashlib.sha256(xsd.read())
+  digest.update(xmlschema.__version__.encode())
+  return os.path.join(SCHEMA_CACHE_DIR, "evaml_schema-" + digest.hexdigest() + ".pickle")
+
+# hash do xsd (sem o xmlschema)
+def schema_hash(schema_file = SCHEMA_FILE):
+  return eva_validator_gen.schema_hash(schema_file)
+
+# retorna o schema compilado do xmlschema. Ele e' construido apenas quando o xsd muda (ou quando o cache nao existe)
+def get_schema():
+  global _schema
+  if _schema != None:
+    return _schema
+
+  import xmlschema
+  cache_file = schema_cache_file()
+  try:
+    with open(cache_file, "rb") as cache:
+      _schema = pickle.load(cache)
+  except Exception: # cache inexistente ou corrompido. O schema e' construido novamente
+    _schema = xmlschema.XMLSchema(SCHEMA_FILE)
+    try:
+      os.makedirs(SCHEMA_CACHE_DIR, exist_ok = True)
+      # grava em um arquivo temporario e depois o renomeia. Assim, compilacoes paralelas nunca leem um cache pela metade
+      fd, tmp_file = tempfile.mkstemp(dir = SCHEMA_CACHE_DIR)
+      with os.fdopen(fd, "wb") as cache:
+        pickle.dump(_schema, cache, pickle.HIGHEST_PROTOCOL)
+      os.replace(tmp_file, cache_file)
+      for old_cache in os.listdir(SCHEMA_CACHE_DIR): # remove os caches de versoes anteriores do xsd
+        if old_cache.endswith(".pickle") and os.path.join(SCHEMA_CACHE_DIR, old_cache) != cache_file:
+          os.remove(os.path.join(SCHEMA_CACHE_DIR, old_cache))
+    except OSError: # sem permissao de escrita, por exemplo. O schema funciona mesmo sem o cache
+      pass
+  return _schema
+
+# retorna o validador gerado. Caso o xsd tenha mudado depois da geracao do eva_schema_validator.py, o validador e' gerado
+# novamente, apenas na memoria (para atualizar o arquivo, execute python3 eva_validator_gen.py)
+def get_validator():
+  global _validator
+  if _validator == None:
+    if eva_schema_validator.XSD_SHA256 == schema_hash():
+      _validator = eva_schema_validator
+    else:
+      _validator = types.ModuleType("eva_schema_validator")
+      exec(eva_validator_gen.generate_source(SCHEMA_FILE), _validator.__dict__)
+  return _validator
+
+# valores default dos atributos, definidos no xsd, indexados pelo nome do elemento. ex.: {"light": {"color": "WHITE"}}
+def get_schema_defaults():
+  return get_validator().DEFAULTS
+
+# insere na arvore (ja validada) os atributos omitidos que possuem valor default no schema
+def insert_defaults(evaml_root):
+  schema_defaults = get_schema_defaults()
+  for elem in evaml_root.iter():
+    if elem.tag in schema_defaults:
+      for attr_name, default_value in schema_defaults[elem.tag].items():
+        if elem.get(attr_name) == None:
+          elem.attrib[attr_name] = default_value
+
+
+###############################################################################
+# validador gerado (caminho rapido)                                           #
+###############################################################################
+# recebe os eventos start/end dos elementos (da arvore ou do iterparse) e verifica cada um com as regras geradas
+# o texto de um elemento e' verificado no inicio do primeiro filho (ou no fim do elemento) e o tail de um filho no inicio
+# do proximo filho (ou no fim do pai). No modo stream, o filho e' removido do pai depois dessa verificacao
+class _FastValidator:
+  def __init__(self, stream = False):
+    self.rules = get_validator()
+    self.stream = stream
+    self.stack = [] # elementos abertos: [elemento, regra, estado do automato do conteudo, ultimo filho]
+    self.errors = [] # (path, reason)
+    self.reasons = [] # erros dos atributos do elemento atual
+    self.ids = set()
+    self.idrefs = []
+
+  def error(self, reason):
+    self.errors.append(("/" + "/".join(frame[0].tag for frame in self.stack), reason))
+
+  def check_text(self, frame, text):
+    if text and frame[1] != None:
+      if frame[1][1] == self.rules.TEXT_EMPTY:
+        self.error("character data is not allowed because content is empty")
+      elif frame[1][1] == self.rules.TEXT_ELEMENTS and text.strip(" \t\n\r"):
+        self.error("character data between child elements not allowed")
+
+  # fecha o texto do elemento do frame (ou o tail do ultimo filho)
+  def close_text(self, frame):
+    if frame[3] == None:
+      self.check_text(frame, frame[0].text)
+    else:
+      self.check_text(frame, frame[3].tail)
+      if self.stream:
+        frame[0].remove(frame[3])
+
+  def start(self, elem):
+    parent = self.stack[-1] if self.stack else None
+    rule = self.rules.ELEMENTS.get(elem.tag)
+    if parent != None:
+      self.close_text(parent)
+      parent[3] = elem
+    self.stack.append([elem, rule, 0, None])
+    if parent == None:
+      if elem.tag != self.rules.ROOT:
+        self.error("the root element must be <" + self.rules.ROOT + ">")
+    elif parent[1] != None and parent[2] != None:
+      parent[2] = parent[1][2][0][parent[2]].get(elem.tag)
+      if parent[2] == None:
+        self.error("unexpected child element")
+    if rule == None:
+      self.error("unknown element")
+      return
+    rule[0](elem.attrib, self.reasons, self.ids, self.idrefs)
+    if self.reasons:
+      for reason in self.reasons:
+        self.error(reason)
+      self.reasons.clear()
+
+  def end(self, elem):
+    frame = self.stack[-1]
+    self.close_text(frame)
+    if frame[1] != None and frame[2] != None and frame[2] not in frame[1][2][1]:
+      expected = sorted(frame[1][2][0][frame[2]])
+      self.error("the content of the element is not complete. Tag " + " | ".join(expected) + " expected")
+    self.stack.pop()
+
+  # retorna a lista de erros (vazia, caso o arquivo seja valido)
+  def finish(self):
+    for ref in self.idrefs:
+      if ref not in self.ids:
+        self.errors.append(("/" + self.rules.ROOT, "IDREF " + repr(ref) + " not found in XML document"))
+    return self.errors
+
+  def walk(self, root):
+    self.start(root)
+    children = [iter(root)]
+    while children:
+      child = next(children[-1], None)
+      if child == None:
+        children.pop()
+        self.end(self.stack[-1][0])
+      else:
+        self.start(child)
+        children.append(iter(child))
+    return self.finish()
+
+  def iterparse(self, evaml_file):
+    for event, elem in eva_xml.iterparse(evaml_file, events = ("start", "end")):
+      if event == "start":
+        self.start(elem)
+      else:
+        self.end(elem)
+    return self.finish()
+
+# erros do validador gerado. Para um xml mal-formado, a lista tem um erro sem path
+def fast_validation_errors(evaml_file, stream = False):
+  try:
+    if stream:
+      return _FastValidator(stream = True).iterparse(evaml_file)
+    tree = evaml_file if eva_xml.is_tree(evaml_file) else eva_xml.parse(evaml_file)
+    return _FastValidator().walk(tree.getroot())
+  except Exception as e:
+    return [(None, str(e))]
+
+
+###############################################################################
+# xmlschema (referencia)                                                      #
+###############################################################################
+# valida com o xmlschema. Retorna o root lido pelo xmlschema e a lista de erros
+# sem o xmlschema instalado, os erros sao os do validador gerado (fast_errors)
+def _reference_validation(evaml_file, fast_errors = None, lazy = False):
+  try:
+    import xmlschema
+  except ImportError:
+    return None, fast_errors
+  try:
+    xml_resource = xmlschema.XMLResource(evaml_file, lazy = lazy) # faz o parsing do arquivo (ou usa a arvore recebida)
+    errors = [(validation_error.path, validation_error.reason) for validation_error in get_schema().iter_errors(xml_resource)]
+  except Exception as e:
+    return None, [(None, str(e))]
+  return xml_resource.root, errors
+
+def reference_validation_errors(evaml_file, lazy = False):
+  return _reference_validation(evaml_file, [(None, "xmlschema is not installed")], lazy)[1]
+
+def print_errors(errors):
+  for idx, (path, reason) in enumerate(errors, start=1):
+    if path == None: # xml mal-formado
+      print(reason)
+    else:
+      print(f'[{idx}] path: {path} | reason: {reason}')
+
 
 # schema validation
 # este trecho de codigo valida o xml
 # podem ocorrer dois tipos de erro (1) xml mal-formado (2) erro de validação
-schema = xmlschema.XMLSchema("evaml-schema/evaml_schema.xsd")
-
-def evaml_validator(evaml_file): # função que é chamado pelo mod. macro exp.
-  global tree
+# o arquivo e' lido e analisado uma unica vez. A mesma arvore e' validada e retornada para as proximas etapas.
+# o validador gerado decide os arquivos validos. Quando ele rejeita o arquivo, o xmlschema decide e gera as mensagens
+# com defaults = True, os valores default do schema sao inseridos na arvore retornada
+def evaml_validator(evaml_file, defaults = False): # função que é chamado pelo mod. macro exp.
+  # evaml_file pode ser o caminho do arquivo, um objeto file ou uma ElementTree ja carregada (ex.: compile_evaml())
+  tree = None
   try:
-    valido = True
-    val = schema.iter_errors(evaml_file)
-    for idx, validation_error in enumerate(val, start=1):
-      print(f'[{idx}] path: {validation_error.path} | reason: {validation_error.reason}')
-      valido = False
+    tree = evaml_file if eva_xml.is_tree(evaml_file) else eva_xml.parse(evaml_file)
+    errors = _FastValidator().walk(tree.getroot())
   except Exception as e:
-    print(val)
-    print(e)
-    return None
-  else:
-    if valido == True:
-      # obj = schema.decode(evaml_file) # retorna uma estrutura tipo dict com o XML processado (com a inserção dos valores default do schema)
-      # xml_validado_element = schema.encode(obj, path="evaml") # codifica a estrutura em obj para um etree.element
-      # xml_validade_string = xmlschema.etree_tostring(xml_validado_element, namespaces=False) # converte o etree.element para um xml em string
-      # print(xml_validade_string)
-      # with open("_xml_validated.xml", "w") as text_file: # grava o xml processado (temporario) em um arquivo para ser importado pelo parser
-      #   text_file.write(xml_validade_string)
-      return ET.parse(evaml_file) #
-    else:
+    errors = [(None, str(e))]
+  if errors:
+    if hasattr(evaml_file, "seek"):
+      evaml_file.seek(0)
+    root, errors = _reference_validation(evaml_file, errors)
+    if errors:
+      print_errors(errors)
       return None
+    if tree == None: # o xmlschema leu um arquivo que a eva_xml nao conseguiu ler
+      tree = eva_xml.ElementTree(root)
+  if defaults:
+    insert_defaults(tree.getroot())
+  return tree
+
+# validacao incremental (iterparse), sem manter a arvore inteira na memoria. Para arquivos muito grandes.
+# retorna True caso o arquivo seja valido
+def evaml_stream_validator(evaml_file):
+  errors = fast_validation_errors(evaml_file, stream = True)
+  if errors:
+    errors = _reference_validation(evaml_file, errors, lazy = True)[1]
+    if errors:
+      print_errors(errors)
+      return False
+  return True
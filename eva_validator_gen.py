@@ -0,0 +1,488 @@
+"""
+Gerador do validador especializado do EvaML.
+Lê o evaml-schema/evaml_schema.xsd e gera o módulo eva_schema_validator.py, com as verificações diretas das tags, dos
+atributos (obrigatórios, enumerações, padrões, inteiros, xs:ID e xs:IDREF) e do conteúdo de cada elemento (um autômato
+para cada modelo de conteúdo). O eva_validator usa esse módulo como caminho rápido e só recorre ao xmlschema quando o
+validador gerado rejeita o arquivo (o xmlschema continua sendo a referência e gera as mensagens de erro).
+Apenas as construções do XSD usadas pelo schema do EvaML são aceitas. Uma construção nova gera um erro na geração.
+
+Uso:
+    python3 eva_validator_gen.py                           # gera o eva_schema_validator.py (depois de mudar o xsd)
+    python3 eva_validator_gen.py --check codes-xml/ ...    # compara o validador gerado com o xmlschema (arquivos ou dirs)
+"""
+
+import glob
+import hashlib
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+SCHEMA_FILE = "evaml-schema/evaml_schema.xsd"
+OUTPUT_FILE = "eva_schema_validator.py"
+
+XS = "{http://www.w3.org/2001/XMLSchema}"
+UNBOUNDED = None
+
+# tipos primitivos do xsd: (funcao de verificacao, whitespace). O valor e' normalizado antes dos facets (pattern e enumeration)
+BUILTIN_TYPES = {
+    "string": ("True", "preserve"),
+    "token": ("True", "collapse"),
+    "ID": ("_ncname(value)", "collapse"),
+    "IDREF": ("_ncname(value)", "collapse"),
+    "NCName": ("_ncname(value)", "collapse"),
+    "integer": ("_integer(value, None, None)", "collapse"),
+    "int": ("_integer(value, -2 ** 31, 2 ** 31 - 1)", "collapse"),
+    "nonNegativeInteger": ("_integer(value, 0, None)", "collapse"),
+}
+
+# inicio do modulo gerado: funcoes auxiliares usadas pelas verificacoes dos tipos
+PRELUDE = '''import re
+
+# os tipos primitivos com whitespace "collapse" aceitam espacos antes e depois do valor
+# NCName: os caracteres de \\i e \\c do xsd (xml 1.0, 5a edicao), sem o ":"
+_NAME_START = "A-Z_a-z\\u00C0-\\u00D6\\u00D8-\\u00F6\\u00F8-\\u02FF\\u0370-\\u037D\\u037F-\\u1FFF\\u200C-\\u200D\\u2070-\\u218F\\u2C00-\\u2FEF\\u3001-\\uD7FF\\uF900-\\uFDCF\\uFDF0-\\uFFFD"
+_NAME_CHAR = _NAME_START + ".0-9\\u00B7\\u0300-\\u036F\\u203F\\u2040-"
+_NCNAME = re.compile("[ \\t\\n\\r]*[" + _NAME_START + "][" + _NAME_CHAR + "]*[ \\t\\n\\r]*")
+_INTEGER = re.compile("[ \\t\\n\\r]*[+-]?[0-9]+[ \\t\\n\\r]*")
+_SPACES = re.compile("[ \\t\\n\\r]+")
+
+# whitespace "collapse" do xsd
+def _collapse(value):
+    return _SPACES.sub(" ", value).strip(" ")
+
+def _ncname(value):
+    return _NCNAME.fullmatch(value) != None
+
+def _integer(value, min_value, max_value):
+    if _INTEGER.fullmatch(value) == None:
+        return False
+    number = int(value) # int() tambem ignora os espacos
+    return (min_value == None or number >= min_value) and (max_value == None or number <= max_value)
+
+def _invalid(name, value):
+    return "attribute " + name + "=" + repr(value) + ": invalid value"
+
+def _missing(name):
+    return "missing required attribute " + repr(name)
+
+# atributos do namespace xsi aceitos em qualquer elemento
+XSI_ATTRIBUTES = frozenset(["{http://www.w3.org/2001/XMLSchema-instance}noNamespaceSchemaLocation",
+                            "{http://www.w3.org/2001/XMLSchema-instance}schemaLocation"])
+
+# conteudo dos elementos: sem texto, apenas elementos (o texto entre eles deve ser espaco em branco) ou misto
+TEXT_EMPTY = 0
+TEXT_ELEMENTS = 1
+TEXT_MIXED = 2
+'''
+
+
+class SchemaError(Exception):
+    pass
+
+
+def local_name(qname):
+    return qname.split(":")[-1]
+
+def min_max(particle):
+    max_occurs = particle.get("maxOccurs", "1")
+    return int(particle.get("minOccurs", "1")), UNBOUNDED if max_occurs == "unbounded" else int(max_occurs)
+
+
+###############################################################################
+# tipos simples                                                               #
+###############################################################################
+class TypeGenerator:
+    def __init__(self, simple_types):
+        self.simple_types = simple_types # nome -> <xs:simpleType>
+        self.constants = [] # linhas das constantes (enumeracoes e padroes)
+        self.functions = [] # linhas das funcoes de verificacao
+        self.generated = set()
+        self.trivial = set() # tipos que aceitam qualquer valor (ex.: restricoes de xs:string sem facets)
+
+    # whitespace do tipo (o do tipo base, para as restricoes)
+    def whitespace(self, type_name):
+        if type_name.startswith("xs:"):
+            return BUILTIN_TYPES[local_name(type_name)][1]
+        restriction = self.simple_types[type_name].find(XS + "restriction")
+        if restriction == None:
+            return "preserve" # union: cada membro normaliza o valor
+        return self.whitespace(restriction.attrib["base"])
+
+    # tipo primitivo de onde o tipo deriva (ID e IDREF tem verificacoes adicionais)
+    def primitive(self, type_name):
+        if type_name.startswith("xs:"):
+            return local_name(type_name)
+        restriction = self.simple_types[type_name].find(XS + "restriction")
+        if restriction == None:
+            return None
+        return self.primitive(restriction.attrib["base"])
+
+    # expressao que verifica value com o tipo type_name
+    def check(self, type_name):
+        if type_name.startswith("xs:"):
+            name = local_name(type_name)
+            if name not in BUILTIN_TYPES:
+                raise SchemaError("Unsupported XSD type: " + type_name)
+            return BUILTIN_TYPES[name][0]
+        if type_name not in self.simple_types:
+            raise SchemaError("Unknown type: " + type_name)
+        self.generate(type_name)
+        if type_name in self.trivial:
+            return "True"
+        return "_" + type_name + "(value)"
+
+    def generate(self, type_name):
+        if type_name in self.generated:
+            return
+        self.generated.add(type_name)
+        simple_type = self.simple_types[type_name]
+        restriction = simple_type.find(XS + "restriction")
+        union = simple_type.find(XS + "union")
+        conditions = []
+        collapse = False
+        if restriction != None:
+            base = restriction.attrib["base"]
+            base_check = self.check(base)
+            if base_check != "True":
+                conditions.append(base_check)
+            enumeration = [facet.attrib["value"] for facet in restriction.findall(XS + "enumeration")]
+            patterns = [facet.attrib["value"] for facet in restriction.findall(XS + "pattern")]
+            for facet in restriction:
+                if facet.tag not in (XS + "enumeration", XS + "pattern"):
+                    raise SchemaError("Unsupported facet in " + type_name + ": " + facet.tag[len(XS):])
+            collapse = (enumeration or patterns) and self.whitespace(type_name) == "collapse"
+            if enumeration:
+                self.constants.append("_ENUM_" + type_name + " = frozenset(" + repr(sorted(set(enumeration))) + ")")
+                conditions.append("value in _ENUM_" + type_name)
+            if patterns:
+                for pattern in patterns: # xsd: \i, \c, \p{} e subtracao de classes nao existem no re do python
+                    if "\\i" in pattern or "\\c" in pattern or "\\p" in pattern or "-[" in pattern:
+                        raise SchemaError("Unsupported pattern in " + type_name + ": " + pattern)
+                self.constants.append("_RE_" + type_name + " = re.compile(" + repr("|".join("(?:" + p + ")" for p in patterns)) + ")")
+                conditions.append("_RE_" + type_name + ".fullmatch(value) != None")
+        elif union != None:
+            checks = [self.check(member) for member in union.attrib["memberTypes"].split()]
+            if "True" not in checks:
+                conditions.append(" or ".join(checks))
+        else:
+            raise SchemaError("Unsupported simpleType: " + type_name)
+        if not conditions:
+            self.trivial.add(type_name)
+            return
+        self.functions.append("def _" + type_name + "(value):")
+        if collapse:
+            self.functions.append("    value = _collapse(value)")
+        self.functions.append("    return " + " and ".join(conditions))
+        self.functions.append("")
+
+
+###############################################################################
+# modelos de conteudo                                                         #
+###############################################################################
+# automato (nfa) de um particle: estados numerados, transicoes por tag e transicoes vazias
+class NFA:
+    def __init__(self):
+        self.moves = [] # estado -> lista de (tag, proximo estado)
+        self.empty = [] # estado -> lista de proximos estados (transicoes vazias)
+
+    def state(self):
+        self.moves.append([])
+        self.empty.append([])
+        return len(self.moves) - 1
+
+    # liga start a end pelo particle. Retorna o estado final
+    def particle(self, particle, start):
+        min_occurs, max_occurs = min_max(particle)
+        end = start
+        for i in range(min_occurs):
+            end = self.once(particle, end)
+        if max_occurs == UNBOUNDED:
+            loop = self.state()
+            self.empty[end].append(loop)
+            after = self.once(particle, loop)
+            self.empty[after].append(loop)
+            end = loop
+        else:
+            for i in range(max_occurs - min_occurs):
+                after = self.once(particle, end)
+                self.empty[end].append(after)
+                end = after
+        return end
+
+    def once(self, particle, start):
+        if particle.tag == XS + "element":
+            if "ref" not in particle.attrib:
+                raise SchemaError("Only global elements (ref) are supported in content models")
+            end = self.state()
+            self.moves[start].append((particle.attrib["ref"], end))
+            return end
+        if particle.tag == XS + "sequence":
+            end = start
+            for child in particle:
+                end = self.particle(child, end)
+            return end
+        if particle.tag == XS + "choice":
+            end = self.state()
+            for child in particle:
+                self.empty[self.particle(child, start)].append(end)
+            return end
+        raise SchemaError("Unsupported particle: " + particle.tag[len(XS):])
+
+    def closure(self, states):
+        pending = list(states)
+        result = set(states)
+        while pending:
+            for next_state in self.empty[pending.pop()]:
+                if next_state not in result:
+                    result.add(next_state)
+                    pending.append(next_state)
+        return frozenset(result)
+
+# dfa de um particle (<xs:sequence>, <xs:choice>) ou de um <xs:all>. Retorna (transicoes por estado, estados finais)
+def content_dfa(particle):
+    if particle == None:
+        return [{}], {0}
+    if particle.tag == XS + "all":
+        return all_dfa(particle)
+    nfa = NFA()
+    start = nfa.state()
+    final = nfa.particle(particle, start)
+    states = [nfa.closure([start])]
+    index = {states[0]: 0}
+    transitions = []
+    finals = set()
+    n = 0
+    while n < len(states):
+        moves = {}
+        for state in states[n]:
+            for tag, next_state in nfa.moves[state]:
+                moves.setdefault(tag, set()).add(next_state)
+        transitions.append({})
+        for tag, next_states in moves.items():
+            target = nfa.closure(next_states)
+            if target not in index:
+                index[target] = len(states)
+                states.append(target)
+            transitions[n][tag] = index[target]
+        if final in states[n]:
+            finals.add(n)
+        n += 1
+    return minimize(transitions, finals)
+
+# <xs:all>: cada elemento aparece no maximo uma vez, em qualquer ordem. Os estados sao os conjuntos de elementos lidos
+def all_dfa(particle):
+    elements = []
+    for child in particle:
+        if child.tag != XS + "element" or "ref" not in child.attrib or min_max(child)[1] != 1:
+            raise SchemaError("Unsupported <xs:all> content")
+        elements.append((child.attrib["ref"], min_max(child)[0] == 1))
+    states = [frozenset()]
+    index = {states[0]: 0}
+    transitions = []
+    finals = set()
+    n = 0
+    while n < len(states):
+        transitions.append({})
+        for tag, required in elements:
+            if tag not in states[n]:
+                target = states[n] | {tag}
+                if target not in index:
+                    index[target] = len(states)
+                    states.append(target)
+                transitions[n][tag] = index[target]
+        if all(tag in states[n] for tag, required in elements if required):
+            finals.add(n)
+        n += 1
+    return minimize(transitions, finals)
+
+# minimizacao do dfa (refinamento de particoes). O estado inicial continua sendo o 0
+def minimize(transitions, finals):
+    tags = sorted(set(tag for moves in transitions for tag in moves))
+    group = [1 if state in finals else 0 for state in range(len(transitions))]
+    while True:
+        signatures = {}
+        new_group = []
+        for state, moves in enumerate(transitions):
+            signature = (group[state],) + tuple(group[moves[tag]] if tag in moves else -1 for tag in tags)
+            new_group.append(signatures.setdefault(signature, len(signatures)))
+        if len(signatures) == len(set(group)):
+            break
+        group = new_group
+    order = {} # renumera os grupos na ordem em que aparecem, a partir do estado inicial
+    for state in range(len(transitions)):
+        order.setdefault(group[state], len(order))
+    result = [None] * len(order)
+    for state, moves in enumerate(transitions):
+        if result[order[group[state]]] == None:
+            result[order[group[state]]] = {tag: order[group[next_state]] for tag, next_state in moves.items()}
+    return result, set(order[group[state]] for state in finals)
+
+
+###############################################################################
+# geracao do modulo                                                           #
+###############################################################################
+def schema_hash(schema_file = SCHEMA_FILE):
+    with open(schema_file, "rb") as xsd:
+        return hashlib.sha256(xsd.read()).hexdigest()
+
+# codigo do modulo do validador gerado a partir do xsd
+def generate_source(schema_file = SCHEMA_FILE):
+    schema = ET.parse(schema_file).getroot()
+    simple_types = {}
+    elements = []
+    for child in schema:
+        if child.tag == XS + "simpleType":
+            simple_types[child.attrib["name"]] = child
+        elif child.tag == XS + "element":
+            elements.append(child)
+        else:
+            raise SchemaError("Unsupported XSD construct: " + child.tag[len(XS):])
+    types = TypeGenerator(simple_types)
+
+    attribute_lines = []
+    names_lines = []
+    content_lines = []
+    element_entries = []
+    contents = {} # dfa (repr) -> nome da constante. Elementos com o mesmo modelo de conteudo compartilham o automato
+    defaults = {}
+    for element in elements:
+        name = element.attrib["name"]
+        complex_type = element.find(XS + "complexType")
+        if complex_type == None or len(element) != 1:
+            raise SchemaError("Unsupported element declaration: " + name)
+
+        # atributos
+        attributes = []
+        particle = None
+        for child in complex_type:
+            if child.tag == XS + "attribute":
+                attributes.append(child)
+            elif child.tag in (XS + "sequence", XS + "choice", XS + "all") and particle == None:
+                particle = child
+            else:
+                raise SchemaError("Unsupported content of <" + name + ">: " + child.tag[len(XS):])
+        attribute_lines.append("def _attributes_" + name + "(attrib, errors, ids, idrefs):")
+        if attributes:
+            attribute_lines.append("    present = 0")
+        for attribute in attributes:
+            if "name" not in attribute.attrib or "fixed" in attribute.attrib or attribute.get("use") == "prohibited":
+                raise SchemaError("Unsupported attribute declaration in <" + name + ">")
+            attr_name = attribute.attrib["name"]
+            type_name = attribute.get("type", "xs:string")
+            check = types.check(type_name)
+            primitive = types.primitive(type_name)
+            required = attribute.get("use", "optional") == "required"
+            if attribute.get("default") != None:
+                defaults.setdefault(name, {})[attr_name] = attribute.attrib["default"]
+            attribute_lines.append("    value = attrib.get(" + repr(attr_name) + ")")
+            attribute_lines.append("    if value != None:")
+            attribute_lines.append("        present += 1")
+            if check != "True":
+                attribute_lines.append("        if not " + check + ":")
+                attribute_lines.append("            errors.append(_invalid(" + repr(attr_name) + ", value))")
+            if primitive in ("ID", "IDREF"): # o valor ja' foi verificado (_ncname)
+                attribute_lines.append("        else:")
+                attribute_lines.append("            value = value.strip(\" \\t\\n\\r\")")
+                if primitive == "ID":
+                    attribute_lines.append("            if value in ids:")
+                    attribute_lines.append("                errors.append(\"attribute " + attr_name + "=\" + repr(value) + \": duplicated xs:ID value\")")
+                    attribute_lines.append("            ids.add(value)")
+                else:
+                    attribute_lines.append("            idrefs.append(value)")
+            if required:
+                attribute_lines.append("    else:")
+                attribute_lines.append("        errors.append(_missing(" + repr(attr_name) + "))")
+        if attributes:
+            attribute_lines.append("    if present != len(attrib):")
+        else:
+            attribute_lines.append("    if attrib:")
+        attribute_lines.append("        for attr_name in attrib:")
+        attribute_lines.append("            if attr_name not in _NAMES_" + name + " and attr_name not in XSI_ATTRIBUTES:")
+        attribute_lines.append("                errors.append(repr(attr_name) + \" attribute not allowed for element\")")
+        attribute_lines.append("")
+        names_lines.append("_NAMES_" + name + " = frozenset(" + repr([a.attrib["name"] for a in attributes]) + ")")
+
+        # conteudo
+        transitions, finals = content_dfa(particle)
+        dfa = repr(tuple(transitions)) + ", frozenset(" + repr(sorted(finals)) + ")"
+        if dfa not in contents:
+            contents[dfa] = "_CONTENT_EMPTY" if particle == None else "_CONTENT_" + name
+            content_lines.append(contents[dfa] + " = (" + dfa + ")")
+        if complex_type.get("mixed") == "true":
+            text = "TEXT_MIXED"
+        elif particle == None:
+            text = "TEXT_EMPTY"
+        else:
+            text = "TEXT_ELEMENTS"
+        element_entries.append("    " + repr(name) + ": (_attributes_" + name + ", " + text + ", " + contents[dfa] + "),")
+
+    lines = [
+        "# validador do EvaML gerado por eva_validator_gen.py a partir de " + SCHEMA_FILE + ". Nao edite este arquivo:",
+        "# depois de mudar o xsd, execute python3 eva_validator_gen.py",
+        "",
+        PRELUDE,
+        "XSD_SHA256 = " + repr(schema_hash(schema_file)),
+        "",
+        "ROOT = " + repr(elements_root(schema, elements)),
+        "",
+        "# valores default dos atributos, indexados pelo nome do elemento",
+        "DEFAULTS = " + repr(defaults),
+        "",
+        "",
+        "# tipos simples",
+    ]
+    lines += types.constants + [""] + types.functions
+    lines += ["", "# atributos de cada elemento. Os erros sao acrescentados em errors, os xs:ID em ids e os xs:IDREF em idrefs"]
+    lines += names_lines + [""]
+    lines += attribute_lines
+    lines += ["", "# modelos de conteudo: (transicoes de cada estado por tag do filho, estados finais). O estado inicial e' o 0"]
+    lines += content_lines
+    lines += ["", "# tag -> (verificacao dos atributos, texto, modelo de conteudo)", "ELEMENTS = {"] + element_entries + ["}", ""]
+    return "\n".join(lines)
+
+# elemento raiz: o elemento global que nao e' referenciado por nenhum outro
+def elements_root(schema, elements):
+    referenced = set(particle.attrib["ref"] for particle in schema.iter(XS + "element") if "ref" in particle.attrib)
+    roots = [element.attrib["name"] for element in elements if element.attrib["name"] not in referenced]
+    if len(roots) != 1:
+        raise SchemaError("The schema must have a single root element: " + str(roots))
+    return roots[0]
+
+def write_module(schema_file = SCHEMA_FILE, output_file = OUTPUT_FILE):
+    source = generate_source(schema_file)
+    with open(output_file, "w", encoding = "utf-8") as module_file:
+        module_file.write(source)
+    return output_file
+
+
+###############################################################################
+# comparacao com o xmlschema                                                  #
+###############################################################################
+# valida cada arquivo com o validador gerado (arvore e iterparse) e com o xmlschema (a referencia) e mostra os arquivos
+# com resultados diferentes
+# retorna o numero de diferencas
+def check_files(paths):
+    import eva_validator
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "*.xml")))
+        else:
+            files += sorted(glob.glob(path))
+    differences = 0
+    for file_name in files:
+        fast = eva_validator.fast_validation_errors(file_name) == []
+        fast_stream = eva_validator.fast_validation_errors(file_name, stream = True) == []
+        reference = eva_validator.reference_validation_errors(file_name) == []
+        if fast != reference or fast_stream != reference:
+            differences += 1
+            print("DIFFERENT: " + file_name + " (generated validator: " + ("valid" if fast else "invalid") +
+                  ", xmlschema: " + ("valid" if reference else "invalid") + ")")
+    print(str(len(files)) + " files checked, " + str(differences) + " differences.")
+    return differences
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--check":
+        exit(1 if check_files(sys.argv[2:]) else 0)
+    print("Generated " + write_module())
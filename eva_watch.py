@@ -0,0 +1,110 @@
+"""
+Modo watch do compilador EvaML.
+O processo fica residente: o schema e os módulos das etapas são carregados uma única vez.
+Os arquivos observados são verificados periodicamente (polling, sem dependências externas) e, a cada vez que um
+arquivo é salvo, apenas esse arquivo é compilado novamente, gerando o "name"_EvaML.xml (e, opcionalmente, o "name".json).
+O arquivo salvo é lido uma única vez (hash + compilação) e os modelos dos registros Json da compilação anterior
+de cada arquivo ficam na memória: apenas os registros dos comandos alterados são codificados novamente.
+O cache em disco (eva_cache) é opcional (--cache): em um script que acabou de ser salvo ele não tem o que reaproveitar.
+
+Uso:
+    python3 eva_parser.py --watch codes-xml/
+    python3 eva_parser.py --watch "codes-xml/*.xml" --json
+"""
+
+import hashlib
+import os
+import sys
+import time
+
+import eva_batch
+import eva_validator
+
+POLL_INTERVAL = 0.2 # segundos entre duas verificacoes dos arquivos
+
+
+# lista dos arquivos observados. source pode ser um diretorio, um padrao glob ou um unico arquivo
+def watched_files(source):
+    if eva_batch.is_batch(source):
+        return eva_batch.batch_files(source)
+    return [source] if os.path.isfile(source) else []
+
+# estado (mtime e tamanho) de cada arquivo. Um arquivo salvo tem o estado alterado
+def snapshot(files):
+    states = {}
+    for evaml_file in files:
+        try:
+            stat = os.stat(evaml_file)
+        except OSError: # o arquivo foi removido entre a listagem e o stat
+            continue
+        states[evaml_file] = (stat.st_mtime_ns, stat.st_size)
+    return states
+
+# conteudo do arquivo (ou None, caso ele nao possa ser lido). O mesmo conteudo e' usado no hash e na compilacao
+def read_source(evaml_file):
+    try:
+        with open(evaml_file, "rb") as source:
+            return source.read()
+    except OSError:
+        return None
+
+
+class Watcher:
+    def __init__(self, source, out_dir = ".", use_cache = False, json_output = False, optimize = False):
+        self.source = source
+        self.out_dir = out_dir
+        self.use_cache = use_cache
+        self.json_output = json_output
+        self.optimize = optimize
+        self.states = {} # arquivo -> (mtime, tamanho) da ultima verificacao
+        self.hashes = {} # arquivo -> hash do conteudo da ultima compilacao
+        self.templates = {} # arquivo -> modelos dos registros Json da ultima compilacao (eva_json_gen.json_gen)
+        self.outputs = set() # arquivos gerados pelo watch. Nao sao compilados, caso estejam no diretorio observado
+
+    # verifica os arquivos e compila os que mudaram. Retorna a lista com os resultados (eva_batch.compile_file)
+    def poll(self):
+        files = [f for f in watched_files(self.source) if os.path.abspath(f) not in self.outputs]
+        states = snapshot(files)
+        changed = [f for f in files if f in states and states[f] != self.states.get(f)]
+        self.states = states
+        for removed in [f for f in self.hashes if f not in states]:
+            del self.hashes[removed]
+            self.templates.pop(removed, None)
+
+        results = []
+        for evaml_file in changed:
+            data = read_source(evaml_file)
+            if data == None:
+                continue
+            digest = hashlib.sha256(data).hexdigest()
+            if digest == self.hashes.get(evaml_file): # o arquivo foi "tocado", mas o conteudo nao mudou
+                continue
+            templates = self.templates.setdefault(evaml_file, {})
+            result = eva_batch.compile_file(evaml_file, self.out_dir, self.use_cache, self.json_output, self.optimize, data, templates)
+            # depois de um erro, o arquivo e' compilado novamente no proximo save, mesmo que o conteudo volte a ser o mesmo
+            self.hashes[evaml_file] = digest if result["ok"] else None
+            for output in (result["output"], result["json"]):
+                if output != None:
+                    self.outputs.add(os.path.abspath(output))
+            eva_batch.print_result(result)
+            results.append(result)
+        return results
+
+    # compila todos os arquivos e, depois, apenas os que forem salvos. Termina com Ctrl+C
+    def run(self, interval = POLL_INTERVAL):
+        eva_validator.get_validator() # o validador e' carregado antes do primeiro save
+        print('==> Watching "' + self.source + '". Press Ctrl+C to stop.')
+        try:
+            while True:
+                self.poll()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\n==> Watch finished.")
+
+
+def watch(source, out_dir = ".", use_cache = False, json_output = False, interval = POLL_INTERVAL, optimize = False):
+    Watcher(source, out_dir, use_cache, json_output, optimize).run(interval)
+
+
+if __name__ == "__main__":
+    watch(sys.argv[1], json_output = "--json" in sys.argv, optimize = "--optimize" in sys.argv)
@@ -0,0 +1,130 @@
+"""
+Camada de acesso ao XML usada pelo compilador e pelo EvaSIM, com dois backends: o xml.etree.ElementTree e o lxml.
+O backend é escolhido pela variável de ambiente EVAML_XML (etree, o default, ou lxml). Com EVAML_XML=lxml e sem o lxml
+instalado, o ElementTree é usado.
+
+O lxml (libxml2) lê o arquivo mais rápido que o expat do ElementTree, mas cada acesso a um elemento do lxml, a partir do
+Python, cria um objeto intermediário (proxy). Nas etapas do compilador, que percorrem e alteram a árvore inteira várias
+vezes, isso custa mais do que a leitura economiza. Script de 80 mil nodes (eva_bench.py), ElementTree -> lxml:
+leitura 0,17s -> 0,09s, compilação completa (com a gravação) 3,3s -> 5,3s, validação em fluxo 0,58s -> 0,58s.
+Por isso o ElementTree é o default. O lxml é útil quando o programa só lê o arquivo (ex.: eva_parser.py lendo o nome
+do script) ou quando a árvore é consultada com XPath (iter_with_attrib).
+
+O resultado é o mesmo com os dois backends:
+  - a gravação (write/tostring) sempre usa o serializador do ElementTree, que aceita os elementos do lxml. Assim, o
+    arquivo gerado é idêntico, byte a byte (ex.: "<wait />", e não "<wait/>", e o mesmo escape dos atributos);
+  - comentários e instruções de processamento são descartados na leitura, como no ElementTree;
+  - parse() retorna sempre uma xml.etree.ElementTree.ElementTree (com o root do backend), com getroot() e write();
+  - os elementos novos devem ser criados com SubElement(parent, ...) ou com parent.makeelement(...), que criam um elemento
+    do mesmo tipo do pai. Um elemento do lxml não aceita filhos do ElementTree (e vice-versa);
+  - no lxml, um elemento tem um único pai: inserir um elemento em outro lugar o remove do lugar anterior;
+  - os elementos do lxml podem ser gravados com pickle: eles são serializados como xml.
+
+Uso:
+    import eva_xml
+    tree = eva_xml.parse("codes-xml/script.xml")
+    eva_xml.SubElement(tree.getroot(), "links")
+    tree.write("script_EvaML.xml", "UTF-8")
+
+    EVAML_XML=lxml python3 eva_parser.py codes-xml/script.xml -c   # com o lxml
+"""
+
+import copyreg
+import os
+import xml.etree.ElementTree as ET
+
+try:
+    if os.environ.get("EVAML_XML", "etree") != "lxml":
+        raise ImportError("lxml backend not selected (EVAML_XML)")
+    from lxml import etree
+except ImportError:
+    etree = None
+
+BACKEND = "etree" if etree == None else "lxml"
+
+ElementTree = ET.ElementTree # a arvore retornada por parse(), nos dois backends
+
+if etree == None:
+    ParseError = ET.ParseError
+    _parser = None
+else:
+    ParseError = (ET.ParseError, etree.XMLSyntaxError)
+    # o mesmo conteudo lido pelo ElementTree: sem comentarios e sem instrucoes de processamento. huge_tree permite
+    # textos e arvores maiores que os limites de seguranca do libxml2 (scripts muito grandes)
+    _parser = etree.XMLParser(remove_comments = True, remove_pis = True, huge_tree = True)
+
+
+###############################################################################
+# leitura                                                                     #
+###############################################################################
+# source pode ser o caminho do arquivo ou um objeto file (binario ou texto)
+def parse(source):
+    if etree == None:
+        return ET.parse(source)
+    return ET.ElementTree(etree.parse(source, _parser).getroot())
+
+# retorna o root do xml contido em text (str ou bytes)
+def fromstring(text):
+    if etree == None:
+        return ET.fromstring(text)
+    if isinstance(text, str):
+        text = text.encode("utf-8") # o lxml nao aceita str com a declaracao <?xml ... encoding=...?>
+    return etree.fromstring(text, _parser)
+
+# eventos ("start"/"end", elemento) da leitura incremental
+def iterparse(source, events = ("end",)):
+    if etree == None:
+        return ET.iterparse(source, events = events)
+    return etree.iterparse(source, events = events, remove_comments = True, remove_pis = True, huge_tree = True)
+
+def is_tree(obj):
+    return isinstance(obj, ET.ElementTree) or (etree != None and isinstance(obj, etree._ElementTree))
+
+
+###############################################################################
+# criacao e busca                                                             #
+###############################################################################
+# cria um elemento sem pai (ex.: o root de um documento novo), do backend atual
+def Element(tag, attrib = {}):
+    if etree == None:
+        return ET.Element(tag, attrib)
+    return etree.Element(tag, attrib)
+
+# cria um filho do mesmo tipo do pai (funciona com os elementos dos dois backends)
+def SubElement(parent, tag, attrib = {}):
+    if etree != None and isinstance(parent, etree._Element):
+        return etree.SubElement(parent, tag, attrib)
+    elem = parent.makeelement(tag, attrib)
+    parent.append(elem)
+    return elem
+
+# elementos da subarvore de root (inclusive o root) que possuem o atributo attr_name, na ordem do documento.
+# no lxml, a busca e' feita com XPath, sem criar um objeto python para cada elemento da arvore
+def iter_with_attrib(root, attr_name):
+    if etree != None and isinstance(root, etree._Element):
+        return root.xpath("descendant-or-self::*[@" + attr_name + "]")
+    return [elem for elem in root.iter() if attr_name in elem.attrib]
+
+
+###############################################################################
+# gravacao                                                                    #
+###############################################################################
+# sempre com o serializador do ElementTree (mesmo resultado nos dois backends)
+def tostring(elem, encoding = None):
+    return ET.tostring(elem, encoding)
+
+def write(root, file, encoding = "UTF-8"):
+    ET.ElementTree(root).write(file, encoding)
+
+
+# pickle dos elementos do lxml: o elemento (com os filhos) e' gravado como xml e o tail, separadamente
+def _unpickle_element(data, tail):
+    elem = etree.fromstring(data, _parser)
+    elem.tail = tail
+    return elem
+
+def _pickle_element(elem):
+    return _unpickle_element, (etree.tostring(elem, with_tail = False), elem.tail)
+
+if etree != None:
+    copyreg.pickle(etree._Element, _pickle_element)
@@ -1,17 +1,40 @@
-from platform import node
 import sys
-import xml.etree.ElementTree as ET
+from array import array
+from collections import deque
+import eva_xml
 
-tree = ET.parse(sys.argv[1])  # arquivo de codigo xml
-root = tree.getroot() # evaml root node
-script_node = root.find("script")
-pilha = [] # pilha de nodes (enderecos)
+root = None # evaml root node (definido por xml_links())
+script_node = None
+
+# interrompe a geracao dos links quando um erro e' encontrado. A mensagem ja foi impressa.
+class _LinkError(Exception):
+    pass
 
 ###############################################################################
 # aqui estão os métodos que geram os links que conectam os nós                #
 ###############################################################################
+# a geracao dos links nao e' recursiva. As chamadas pendentes ficam em uma pilha explicita (pilha), na mesma ordem
+# em que a versao recursiva as faria. Assim, scripts com muitos <switch>/<case> aninhados nao atingem o limite de recursao do Python.
+
+# tipos de tarefa na pilha
+_LINK = 0 # (_LINK, node_from, node_to) -> cria_link(node_from, node_to)
+_CASE = 1 # (_CASE, node_from, switch, case_elem) -> prepara o <case>/<default> do switch e o conecta ao node_from
+_LISTA = 2 # (_LISTA, node_list, i, filhos) -> processa os pares de nodes da lista a partir da posicao i
+
+pilha = [] # pilha de tarefas pendentes
+ids_index = {} # id -> lista de elementos com esse id (na ordem do documento). Usado para resolver o "target" dos <goto>
+links_from = array("l") # chaves (inteiras) de origem dos links gerados
+links_to = array("l") # chaves (inteiras) de destino dos links gerados
+gotos_resolvidos = set() # <goto> que foram substituidos pelo seu alvo em algum link. Os demais nunca sao alcancados
+graph_report = None # resultado da analise do grafo (graph_analysis) da ultima geracao de links
 
-lista_links = [] # lista provisoria com os links gerados
+# empilha as tarefas na ordem inversa, para que a primeira seja executada primeiro
+def empilha(tarefas):
+    pilha.extend(reversed(tarefas))
+
+def add_link(node_from, node_to):
+    links_from.append(int(node_from.attrib["key"]))
+    links_to.append(int(node_to.attrib["key"]))
 
 def cria_link(node_from, node_to):
     # node stop como node_to
@@ -27,86 +50,46 @@ def cria_link(node_from, node_to):
     # a concexão não ocorrerá caso o ultimo elemento de um <case> seja o <stop> ou seja um <goto>
     if node_from.tag == "switch":
         # Eu pensei que esse caso não funcionasse, mas ele funcionou tanto no robô quanto no EvaSIM
+        tarefas = []
         for case_elem in node_from:
             qtd = len(case_elem)
             # só precisamos do ultimo elemento de cada bloco case/default
             if (qtd == 0): # case vazio, conecta o <case> ao node_to
-                cria_link(case_elem, node_to)
+                tarefas.append((_LINK, case_elem, node_to))
             else:
                 # caso do <stop> e do <goto>. Nesses casos ocorre um bypass
-                if (case_elem[qtd -1].tag == "stop") or (case_elem[qtd -1].tag == "goto"):
+                if (case_elem[-1].tag == "stop") or (case_elem[-1].tag == "goto"):
                     pass
                 else: # caso seja outro comando, cria a conexao do comando com o node_to
-                    cria_link(case_elem[qtd -1], node_to)
+                    tarefas.append((_LINK, case_elem[-1], node_to))
+        empilha(tarefas)
         return
 
     # node <goto> com node_to. O node_to, é substituido pelo nó indicado no atrib. "target" do <goto>
     if node_to.tag == "goto":
-        target_found = False # indica se o id referenciado no target foi encontrado
-        for elem in script_node.iter(): # procura por target na interação
-            if elem.get("id") != None:
-                if elem.attrib["id"] == node_to.attrib["target"]:
-                    # cria um link entre o no que queria se conectar ao goto (node_from) e o no para o qual o goto aponta
-                    # isso trás mais flexibilidade à conexão de nós que se conectam a elementos goto
-                    # com isso, um switch passou a poder ter o atributo id
-                    cria_link(node_from, elem)
-                    # lista_links.append(node_from.attrib["key"] + "," + elem.attrib["key"])
-                    target_found = True
-        if not (target_found):
+        targets = ids_index.get(node_to.attrib["target"]) # procura por target no indice de ids
+        if not (targets):
             # target id not found
             print('  Error -> The <goto> "target" attribute was not found:', node_to.attrib["target"])
-            exit(1) # termina com erro
+            raise _LinkError() # termina com erro
+        # cria um link entre o no que queria se conectar ao goto (node_from) e o no para o qual o goto aponta
+        # isso trás mais flexibilidade à conexão de nós que se conectam a elementos goto
+        # com isso, um switch passou a poder ter o atributo id
+        gotos_resolvidos.add(node_to)
+        empilha([(_LINK, node_from, elem) for elem in targets])
         return
 
     # "node_to" e' uma folha, que nao contem filhos. ex.: <wait>, <light>, <case> vazio e etc
     if len(node_to) == 0:
-        lista_links.append(node_from.attrib["key"] + "," + node_to.attrib["key"])
+        add_link(node_from, node_to)
         
     # trata os nodes com filhos
     elif (node_to.tag == "switch"): # trata o node "switch"
-        for case_elem in node_to:
-            # todas os cases passam a ter o atrib. "var" igual ao "var" do switch (node_to)
-            # sempre havera conteudo em var do <switch>. Isso é garantido pelo xmlschema
-            # restrição. "exact" e "contain" só podem ser usados com va="$"" no switch.
-            if case_elem.tag == "case":
-                case_elem.attrib["var"] = node_to.attrib["var"] # copia "var" do <switch> para <case>
-                if case_elem.attrib["var"].isnumeric(): # var só pode conter vars e nunca números (ESSA RESTRIÇÃO FOI MINHA OPÇÃO)
-                    print('  Error -> The use of constants of any type in the "var" attribute of the <switch> command is not allowed. Please, check var="' + node_to.attrib["var"] + '"')
-                    exit(1) # termina com erro
-                if ("$" not in case_elem.attrib["var"]) and (case_elem.attrib["op"] == "exact"):
-                    # uso indevido de exact com outra variavel que não é o $
-                    pass
-
-                    # Esta restrição foi removida pela utilização de variáveis def. pelos usuários em vez de apenas o dollar.
-                    # print('  Error -> The "exact" comparison type should only be used with var="$" and not with var="' + node_to.attrib["var"] + '"')
-                    # exit(1) # termina com erro
-                if ("$" not in case_elem.attrib["var"]) and (case_elem.attrib["op"] == "contain"): 
-                    # uso indevido de contain com outra variavel que não é o $
-                    print('  Error -> The "contain" comparison type should only be used with var="$" and not with var="' + node_to.attrib["var"] + '"')
-                    exit(1) # termina com erro
-                # o uso de $ com indices, em var e em value, não é permitido no robô físico
-                # uso indevido de $ com indice no atributo var do <switch>  
-                if ("$" in case_elem.attrib["var"]) and (len(case_elem.attrib["var"]) > 1):
-                    print('  Error -> Do not use "$" associated with an index in a "var" attribute of a <switch>, only use it in the texts of the <talk> command')
-                    exit(1) # termina com erro 
-                # uso indevido de $ com indice no atributo value do <case>  
-                if ("$" in case_elem.attrib["value"]) and (len(case_elem.attrib["value"]) > 1):
-                    print('  Error -> Do not use "$" associated with an index in a "value" attribute of a <case>, only use it in the texts of the <talk> command')
-                    exit(1) # termina com erro 
-
-            elif case_elem.tag == "default": # preenche o default com os parametros default
-                # nao precisa de var="$" pois sendo do tipo exact, o robô físico sabe que var="$"
-                # e no EvaSIM, um case (default) é sempre verdadeiro
-                case_elem.attrib["value"] = ""
-                case_elem.attrib["op"] = "exact"
-
-            # gera o link de node_from (que veio na chamada) com o elem. (case ou default)
-            #lista_links.append(node_from.attrib["key"] + "," + case_elem.attrib["key"])
-            cria_link(node_from, case_elem)
+        empilha([(_CASE, node_from, node_to, case_elem) for case_elem in node_to])
             
     # processa os node_to do tipo <case>            
     elif (node_to.tag == "case") or (node_to.tag == "default"):
-        lista_links.append(node_from.attrib["key"] + "," + node_to.attrib["key"])
+        add_link(node_from, node_to)
         # caso o case não seja vazio, gera o link entre o <case> e o primeiro elemento e depois processa o conteudo do <case>
         if (len(node_to) == 0): # case o <case> seja vazio
             # nao conecta o <case>
@@ -116,94 +99,234 @@ def cria_link(node_from, node_to):
             # sem o processamento dos elementos internos ao case, que já foram processados anteriormente
             if (node_to.attrib["child_proc"] == "false"): # verifica se o case/defalut já teve eus elementos processados
                 node_to.attrib["child_proc"] = "true" # marca o case/default como já processado
-                cria_link(node_to, node_to[0]) # conecta o <case> com o seu primeiro elemento filho
-                link_process(node_to) # processa a lista de elem. do <case>
+                # conecta o <case> com o seu primeiro elemento filho e depois processa a lista de elem. do <case>
+                empilha([(_LINK, node_to, node_to[0]), (_LISTA, node_to, 0, None)])
 
 
-def link_process(node_list):
+# prepara um <case>/<default> do switch (node_to) e gera o link de node_from com o elem.
+def case_link(node_from, node_to, case_elem):
+    # todas os cases passam a ter o atrib. "var" igual ao "var" do switch (node_to)
+    # sempre havera conteudo em var do <switch>. Isso é garantido pelo xmlschema
+    # restrição. "exact" e "contain" só podem ser usados com va="$"" no switch.
+    if case_elem.tag == "case":
+        case_elem.attrib["var"] = node_to.attrib["var"] # copia "var" do <switch> para <case>
+        if case_elem.attrib["var"].isnumeric(): # var só pode conter vars e nunca números (ESSA RESTRIÇÃO FOI MINHA OPÇÃO)
+            print('  Error -> The use of constants of any type in the "var" attribute of the <switch> command is not allowed. Please, check var="' + node_to.attrib["var"] + '"')
+            raise _LinkError() # termina com erro
+        if ("$" not in case_elem.attrib["var"]) and (case_elem.attrib["op"] == "exact"):
+            # uso indevido de exact com outra variavel que não é o $
+            pass
+
+            # Esta restrição foi removida pela utilização de variáveis def. pelos usuários em vez de apenas o dollar.
+            # print('  Error -> The "exact" comparison type should only be used with var="$" and not with var="' + node_to.attrib["var"] + '"')
+            # exit(1) # termina com erro
+        if ("$" not in case_elem.attrib["var"]) and (case_elem.attrib["op"] == "contain"): 
+            # uso indevido de contain com outra variavel que não é o $
+            print('  Error -> The "contain" comparison type should only be used with var="$" and not with var="' + node_to.attrib["var"] + '"')
+            raise _LinkError() # termina com erro
+        # o uso de $ com indices, em var e em value, não é permitido no robô físico
+        # uso indevido de $ com indice no atributo var do <switch>  
+        if ("$" in case_elem.attrib["var"]) and (len(case_elem.attrib["var"]) > 1):
+            print('  Error -> Do not use "$" associated with an index in a "var" attribute of a <switch>, only use it in the texts of the <talk> command')
+            raise _LinkError() # termina com erro 
+        # uso indevido de $ com indice no atributo value do <case>  
+        if ("$" in case_elem.attrib["value"]) and (len(case_elem.attrib["value"]) > 1):
+            print('  Error -> Do not use "$" associated with an index in a "value" attribute of a <case>, only use it in the texts of the <talk> command')
+            raise _LinkError() # termina com erro 
+
+    elif case_elem.tag == "default": # preenche o default com os parametros default
+        # nao precisa de var="$" pois sendo do tipo exact, o robô físico sabe que var="$"
+        # e no EvaSIM, um case (default) é sempre verdadeiro
+        case_elem.attrib["value"] = ""
+        case_elem.attrib["op"] = "exact"
+
+    # gera o link de node_from (que veio na chamada) com o elem. (case ou default)
+    cria_link(node_from, case_elem)
+
 
-    qtd = len(node_list)
-
-    for i in range(0, qtd-1): # processa uma lista de nós (dois a dois) A->B, B->C,...,Y->Z
-        node_from = node_list[i]
-        node_to = node_list[i+1]
-
-        # emite um aviso caso haja elemento(s) após um <goto>
-        # se esse elemento não for referenciado em outra parte do script, ele poderá ficar desconectado do fluxo.
-        if node_from.tag == "goto":
-            print("  WARNING - There are elements after the <goto>. These elements may not be reached.")
-
-        # case especifico da tag <stop> que deve interromper a conexao dos do fluxo sendo processado
-        # todos os elem. após um <stop> são removidos. O parser emite um aviso de remoção e os exibe no terminal.
-        if (node_from.tag == "stop"):
-            for s in range(i, qtd-1):
-                if (node_list[i+1].get("id")) == None:
-                    print("  WARNING - Removing unused (unreachable) commands ... <" + node_list[i+1].tag + ">")
-                else:
-                    # emite um aviso especial caso um elemento com id seja excluído.
-                    print('  WARNING - Removing unused (unreachable) commands ... <' + node_list[i+1].tag + '>. ALERT! This element has an attribue "id" and it is "' + node_list[i+1].attrib["id"] + '"')
-                    exit(1)
-                node_list.remove(node_list[i+1])
-            break
+# processa o par de nodes (i, i + 1) da lista e empilha a continuacao da lista: A->B, B->C,...,Y->Z
+# filhos e' a lista dos filhos de node_list, criada uma unica vez (no lxml, node_list[i] percorre os filhos a partir do primeiro)
+def lista_process(node_list, i, filhos):
+    if filhos == None:
+        filhos = list(node_list)
+    qtd = len(filhos)
+    if i >= qtd - 1: # fim da lista
+        return
+
+    node_from = filhos[i]
+    node_to = filhos[i+1]
+
+    # emite um aviso caso haja elemento(s) após um <goto>
+    # se esse elemento não for referenciado em outra parte do script, ele poderá ficar desconectado do fluxo.
+    if node_from.tag == "goto":
+        print("  WARNING - There are elements after the <goto>. These elements may not be reached.")
+
+    # case especifico da tag <stop> que deve interromper a conexao dos do fluxo sendo processado
+    # todos os elem. após um <stop> são removidos. O parser emite um aviso de remoção e os exibe no terminal.
+    if (node_from.tag == "stop"):
+        for s in range(i + 1, qtd):
+            if (filhos[s].get("id")) == None:
+                print("  WARNING - Removing unused (unreachable) commands ... <" + filhos[s].tag + ">")
+            else:
+                # emite um aviso especial caso um elemento com id seja excluído.
+                print('  WARNING - Removing unused (unreachable) commands ... <' + filhos[s].tag + '>. ALERT! This element has an attribue "id" and it is "' + filhos[s].attrib["id"] + '"')
+                raise _LinkError()
+            for elem in filhos[s].iter(): # os elementos removidos deixam de ser alvos de <goto>
+                if elem.get("id") != None:
+                    ids_index[elem.attrib["id"]].remove(elem)
+            node_list.remove(filhos[s])
+    else:
+        pilha.append((_LISTA, node_list, i + 1, filhos)) # continuacao da lista, executada depois dos links de (node_from, node_to)
+        cria_link(node_from, node_to)
+
+
+def link_process(node_list):
+    pilha.append((_LISTA, node_list, 0, None))
+    while pilha:
+        tarefa = pilha.pop()
+        if tarefa[0] == _LINK:
+            cria_link(tarefa[1], tarefa[2])
+        elif tarefa[0] == _CASE:
+            case_link(tarefa[1], tarefa[2], tarefa[3])
         else:
-            cria_link(node_from, node_to)
+            lista_process(tarefa[1], tarefa[2], tarefa[3])
+
+
+# indexa os elementos do script pelo id, uma unica vez (com o lxml, a busca dos elementos com id e' feita com XPath)
+def index_ids(script):
+    ids_index.clear()
+    for elem in eva_xml.iter_with_attrib(script, "id"):
+        ids_index.setdefault(elem.attrib["id"], []).append(elem)
         
 
 def saida_links():
     # insere a tag links como ultimo elemento de root (<evaml>)
-    # len(root) retorna o valor que sera o indice para o ultimo elemento
-    tag_links = ET.Element("links") # cria a tag links (mae de varios links)
-    root.insert(len(root), tag_links) #
-
-    for i in range(len(lista_links)): # insere cada link como os atributos from e to, dentro do elemento <links>
-        tag_link = ET.Element("link", attrib={"from" : lista_links[i].split(",")[0], "to" : lista_links[i].split(",")[1]})
-        root[len(root) - 1].insert(i, tag_link)
-
-# inserindo o elemento voice como primeiro elemento do script_node a ser processado
-# neste caso, o elem. voice é inserido (temporriamente) para que ele seja sempre o primeiro elemento a ser processado
-root.find("script").insert(0, root.find("settings").find("voice"))
-
-# processa os links na lista de links auxiliar
-link_process(script_node)
-
-# gera os links no arquivo xml
-saida_links()
-
-# verifica se há elementos não referenciados nos links (exceto para: 'voice', 'script', 'switch', 'stop', 'goto')
-links_node = root.find("links")
-script_node = root.find("script")
-excluded_nodes = set(['voice', 'script', 'switch', 'stop', 'goto'])
-error = False
-for elem in script_node.iter():
-    encontrado = False
-    for link in links_node.iter():
-        if (elem.get("key") != None):
-            if (elem.get("key") == link.get("to")):
-                encontrado = True
-                break
-    if not (encontrado) and not (elem.tag in excluded_nodes):
-        error = False # para que o erro interrompa o parser, trocar para True
-        # a descontinuidade no grafo de execução, gera mais de um grafo, e faz com que o script não execute no robô, porém funciona no simulador
-        error_msg = "  WARNING -> The element <" + elem.tag + "> is disconnected from the execution flow. Attributes: "
-        for info in elem.attrib.items():
-            error_msg += '('
-            error_msg += ' = '.join(info)
-            error_msg += '),'
-        # o erro abaixo foi resolvido com a função que adiciona os defaults automaticamente no módulo de expansão de macros    
-        # error_msg += '\n  WARNING: This may indicate the lack of a <default> element within a <switch>.'
-        print(error_msg)
-
-if error:
-    exit(1)
-
-print("step 03 - Creating the Elements <link>... (OK)")
-
-# O elemento voice foi inserido ao script_node (list) para processamento, somente. 
-# Agora será removido da seção script
-script_node.remove(root.find("script").find("voice"))
-
-# arquivo de saida
-tree.write(root.attrib['name'] + "_EvaML.xml", "UTF-8") # versao para o EvaSIM
-
-
-#tree.write("_xml_links.xml", "UTF-8") # versao para a etapa 4 do parser
+    tag_links = eva_xml.SubElement(root, "links") # cria a tag links (mae de varios links)
+
+    for i in range(len(links_from)): # insere cada link como os atributos from e to, dentro do elemento <links>
+        eva_xml.SubElement(tag_links, "link", {"from" : str(links_from[i]), "to" : str(links_to[i])})
+
+###############################################################################
+# analise do grafo de execucao (depois da geracao dos links)                  #
+###############################################################################
+# tempo linear no numero de elementos + links. Retorna um dict (pode ser gravado como JSON) com:
+#  disconnected: elementos que nao sao destino de nenhum link
+#  unreachable: elementos que sao destino de algum link, mas nao sao alcancados a partir do <voice> (busca em largura)
+#  dangling_gotos: <goto> que nunca sao alcancados (so e' possivel saber durante a geracao dos links, por isso gotos_resolvidos)
+def graph_analysis(evaml_root, gotos_resolvidos = None):
+    script = evaml_root.find("script")
+    voice = evaml_root.find("settings").find("voice")
+
+    sucessores = {} # chave -> lista com as chaves dos sucessores
+    destinos = set() # chaves que sao destino de algum link
+    qtd_links = 0
+    for link in evaml_root.find("links"):
+        key_from = int(link.attrib["from"])
+        key_to = int(link.attrib["to"])
+        sucessores.setdefault(key_from, []).append(key_to)
+        destinos.add(key_to)
+        qtd_links += 1
+
+    # busca em largura a partir do voice, que e' sempre o primeiro elemento executado
+    alcancados = set([int(voice.attrib["key"])])
+    fila = deque(alcancados)
+    while fila:
+        for key_to in sucessores.get(fila.popleft(), ()):
+            if key_to not in alcancados:
+                alcancados.add(key_to)
+                fila.append(key_to)
+
+    excluded_nodes = set(['voice', 'script', 'switch', 'stop', 'goto'])
+    report = {"script": evaml_root.get("name"), "nodes": 1, "links": qtd_links, "reachable": len(alcancados),
+        "disconnected": [], "unreachable": [], "dangling_gotos": []}
+    for elem in script.iter():
+        if elem.tag == "goto":
+            if (gotos_resolvidos != None) and (elem not in gotos_resolvidos):
+                report["dangling_gotos"].append(node_info(elem))
+        elif not (elem.tag in excluded_nodes) and (elem.get("key") != None):
+            report["nodes"] += 1
+            key = int(elem.attrib["key"])
+            if key not in destinos:
+                report["disconnected"].append(node_info(elem))
+            elif key not in alcancados:
+                report["unreachable"].append(node_info(elem))
+    return report
+
+def node_info(elem):
+    return {"tag": elem.tag, "key": elem.get("key"), "attributes": dict(elem.attrib)}
+
+# atributos do elemento no formato das mensagens de aviso: (nome = valor),(nome = valor),
+def attrib_msg(node):
+    error_msg = ""
+    for info in node["attributes"].items():
+        error_msg += '('
+        error_msg += ' = '.join(info)
+        error_msg += '),'
+    return error_msg
+
+###############################################################################
+# Etapa 03 - geracao dos links. Recebe o root com as chaves ja geradas        #
+###############################################################################
+# retorna o root com a secao <links> ou None, caso algum erro tenha sido encontrado
+def xml_links(evaml_root):
+    global root, script_node, links_from, links_to, graph_report
+    root = evaml_root
+    script_node = root.find("script")
+    links_from = array("l")
+    links_to = array("l")
+    del pilha[:] # descarta as tarefas de uma compilacao anterior que terminou com erro
+    gotos_resolvidos.clear()
+
+    # inserindo o elemento voice como primeiro elemento do script_node a ser processado
+    # neste caso, o elem. voice é inserido (temporriamente) para que ele seja sempre o primeiro elemento a ser processado
+    # no lxml, o voice sai de <settings> ao ser inserido no script. Ele volta para a mesma posicao depois dos links
+    settings_node = root.find("settings")
+    voice = settings_node.find("voice")
+    voice_index = list(settings_node).index(voice)
+    script_node.insert(0, voice)
+
+    index_ids(script_node)
+
+    try:
+        # processa os links na lista de links auxiliar
+        link_process(script_node)
+    except _LinkError:
+        return None
+
+    # gera os links no arquivo xml
+    saida_links()
+
+    # O elemento voice foi inserido ao script_node (list) para processamento, somente. 
+    # Agora será removido da seção script
+    script_node.remove(voice)
+    if not any(child is voice for child in settings_node):
+        settings_node.insert(voice_index, voice)
+
+    # verifica se há elementos não referenciados nos links (exceto para: 'voice', 'script', 'switch', 'stop', 'goto')
+    # e se há elementos que não podem ser alcançados a partir do início do script (voice)
+    graph_report = graph_analysis(root, gotos_resolvidos)
+    error = False # para que o erro interrompa o parser, trocar para True
+    # a descontinuidade no grafo de execução, gera mais de um grafo, e faz com que o script não execute no robô, porém funciona no simulador
+    for node in graph_report["disconnected"]:
+        print("  WARNING -> The element <" + node["tag"] + "> is disconnected from the execution flow. Attributes: " + attrib_msg(node))
+    for node in graph_report["unreachable"]:
+        print("  WARNING -> The element <" + node["tag"] + "> can not be reached from the beginning of the script. Attributes: " + attrib_msg(node))
+    for node in graph_report["dangling_gotos"]:
+        print('  WARNING -> The <goto> with target "' + node["attributes"]["target"] + '" is never reached. Its jump never happens.')
+
+    if error:
+        return None
+
+    print("step 03 - Creating the Elements <link>... (OK)")
+
+    return root
+
+
+if __name__ == "__main__":
+    tree = eva_xml.parse(sys.argv[1])  # arquivo de codigo xml
+
+    if xml_links(tree.getroot()) == None:
+        exit(1) # termina com erro
+
+    # arquivo de saida
+    tree.write(tree.getroot().attrib['name'] + "_EvaML.xml", "UTF-8") # versao para o EvaSIM
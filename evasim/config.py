@@ -19,4 +19,17 @@ LANG_DEFAULT_GOOGLE_TRANSLATING = "PT"
 LANG_DEFAULT_SPEECH_RECOGNITION = "pt-BR"
 
 # Audio files used to play music and sound effects
-AUDIO_FILES_PATH = "audio_files"
\ No newline at end of file
+AUDIO_FILES_PATH = "audio_files"
+
+# Maximum time (in seconds) that EvaSIM waits for the robot to finish a blocking command (robot mode).
+# None waits forever (the default, as the robot may take any time to finish a command, e.g. a long <listen>).
+# If a timeout is set and the robot does not publish its state in this time, the script is stopped with an error
+ROBOT_COMMAND_TIMEOUTS = {
+    "talk": None,
+    "listen": None,
+    "audio": None,
+    "textEmotion": None,
+    "userEmotion": None,
+    "qrRead": None,
+    "userID": None
+}
@@ -0,0 +1,150 @@
+# Loader of the precompiled binary program (.evab) generated by the EvaML compiler (eva_bin_gen.py)
+# The file is read at once and decoded with struct. The XML is never parsed.
+# The tables are not turned into a tree: the VM lowers the instructions straight from them (eva_vm.lower_program).
+# Only the <evaml> root and its <settings> (the name of the script, the voice and the effects) are built as nodes.
+#
+# Format (little-endian):
+#   header        HEADER: magic "EVAB", version, flags, sha256 of the rest of the file and the size of each table
+#   strings       n_strings u32 end offsets, followed by the utf-8 bytes of all the strings (each string is stored once)
+#   instructions  n_instr INSTR records, in document order (<evaml>, <settings> and <script>, without the <links> section):
+#                 key (-1 if the element has no key), tag, text (NO_STRING if none), attributes (start and count),
+#                 parent index (-1 for <evaml>) and successors (start and count)
+#   attributes    n_attrs ATTR pairs (name, value), indexes of the string table
+#   successors    n_succ u32 instruction indexes. The links, already resolved, in the order of the links of each node
+
+import hashlib
+import struct
+
+MAGIC = b"EVAB"
+VERSION = 1
+NO_STRING = 0xFFFFFFFF
+HEADER = struct.Struct("<4sHH32sIIIII") # magic, version, flags, sha256, n_strings, strings_size, n_instr, n_attrs, n_succ
+INSTR = struct.Struct("<iIIIIiII") # key, tag, text, attr_start, attr_count, parent, succ_start, succ_count
+ATTR = struct.Struct("<II")
+
+
+# A command of the program (or an element of the root). It has the part of the ElementTree interface that the VM uses
+# (tag, attrib, text, get, find, iter, len, [] and iteration over the children)
+class Node:
+    __slots__ = ("tag", "attrib", "text", "tail", "children")
+
+    def __init__(self, tag, attrib, text = None):
+        self.tag = tag
+        self.attrib = attrib
+        self.text = text
+        self.tail = None
+        self.children = []
+
+    def get(self, name, default = None):
+        return self.attrib.get(name, default)
+
+    def find(self, tag):
+        for child in self.children:
+            if child.tag == tag:
+                return child
+        return None
+
+    def iter(self, tag = None):
+        pending = [self]
+        while pending:
+            node = pending.pop()
+            if tag == None or node.tag == tag:
+                yield node
+            pending.extend(reversed(node.children))
+
+    def __iter__(self):
+        return iter(self.children)
+
+    def __len__(self):
+        return len(self.children)
+
+    def __getitem__(self, index):
+        return self.children[index]
+
+
+class ProgramError(Exception):
+    pass
+
+
+# The loaded program: the decoded tables, the root (<evaml>, with the <settings> and an empty <script>) and the content hash
+class Program:
+    def __init__(self, strings, instrs, pairs, succ, content_hash):
+        self.strings = strings
+        self.instrs = instrs # INSTR records, in document order
+        self.pairs = pairs # (name, value) of the attributes
+        self.succ = succ # instruction indexes
+        self.content_hash = content_hash
+        self.header = {} # instruction index -> node, for the nodes of the root
+        self.root = self.build_root()
+
+    # Node of the instruction (index in the instruction table). The nodes of the root are built once
+    def node(self, index):
+        node = self.header.get(index)
+        if node == None:
+            key, tag, text, attr_start, attr_count = self.instrs[index][:5]
+            node = Node(self.strings[tag], dict(self.pairs[attr_start:attr_start + attr_count]), None if text == NO_STRING else self.strings[text])
+        return node
+
+    # (index, key, node) of the instructions with a key, in document order. The nodes of the root are reused
+    def commands(self):
+        strings = self.strings
+        pairs = self.pairs
+        header = self.header
+        for index, (key, tag, text, attr_start, attr_count, parent, succ_start, succ_count) in enumerate(self.instrs):
+            if key >= 0:
+                node = header.get(index)
+                if node == None:
+                    node = Node(strings[tag], dict(pairs[attr_start:attr_start + attr_count]), None if text == NO_STRING else strings[text])
+                yield index, key, node
+
+    # The <evaml> root and the elements before the <script> (the <settings>, which comes first in the schema)
+    # The commands of the script are not built here
+    def build_root(self):
+        for index, instr in enumerate(self.instrs):
+            node = self.node(index)
+            self.header[index] = node
+            parent = instr[5]
+            if parent >= 0:
+                self.header[parent].children.append(node)
+            if parent == 0 and node.tag == "script":
+                break
+        return self.header[0]
+
+
+# Decodes the program. With verify = True the sha256 of the content is checked
+def loads(data, verify = True):
+    data = memoryview(data)
+    if len(data) < HEADER.size:
+        raise ProgramError("The file is not an EvaML binary program.")
+    magic, version, flags, content_hash, n_strings, strings_size, n_instr, n_attrs, n_succ = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ProgramError("The file is not an EvaML binary program.")
+    if version != VERSION:
+        raise ProgramError("Unsupported version of the EvaML binary program: " + str(version))
+    if verify and hashlib.sha256(data[HEADER.size:]).digest() != content_hash:
+        raise ProgramError("The EvaML binary program is corrupted (content hash mismatch).")
+
+    pos = HEADER.size
+    offsets = struct.unpack_from("<" + str(n_strings) + "I", data, pos)
+    pos += 4 * n_strings
+    blob = bytes(data[pos:pos + strings_size])
+    pos += strings_size
+    strings = []
+    start = 0
+    for end in offsets:
+        strings.append(blob[start:end].decode("utf-8"))
+        start = end
+
+    instrs = list(INSTR.iter_unpack(data[pos:pos + INSTR.size * n_instr]))
+    pos += INSTR.size * n_instr
+    pairs = [(strings[name], strings[value]) for name, value in ATTR.iter_unpack(data[pos:pos + ATTR.size * n_attrs])]
+    pos += ATTR.size * n_attrs
+    succ = struct.unpack_from("<" + str(n_succ) + "I", data, pos)
+    if n_instr == 0:
+        raise ProgramError("The EvaML binary program is empty.")
+    return Program(strings, instrs, pairs, succ, content_hash.hex())
+
+# Reads the file at once and decodes the program
+def load(file_name, verify = True):
+    with open(file_name, "rb") as bin_file:
+        return loads(bin_file.read(), verify)
@@ -11,9 +11,15 @@ import re
 import os
 
 import random as rnd
-import xml.etree.ElementTree as ET
+import sys
+
+# XML layer of the compiler (eva_xml.py, in the parent directory): lxml when it is installed, otherwise ElementTree
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import eva_xml
 
 import eva_memory # EvaSIM memory module
+import eva_program # Loader of the precompiled binary program (.evab)
+import eva_vm # Instruction array and dispatch table of the virtual machine
 import json_to_evaml_conv # json to XML conversion module (No longer used in this version of the simulator)
 
 from tkinter import *
@@ -28,7 +34,6 @@ from play_audio import playsound
 
 import time
 import threading
-import sys
 
 # importing libraries to place Listen using API
 
@@ -88,6 +93,8 @@ port = config.MQTT_PORT # broker port
 topic_base = config.EVA_TOPIC_BASE
 
 EVA_ROBOT_STATE = "FREE"
+robot_free = threading.Event() # Set when the robot finishes a blocking command (/state topic) or when the script is stopped
+robot_free.set()
 EVA_DOLLAR = ""
 RUNNING_MODE = "SIMULATOR" # EvaSIM operating mode (Physical Robot Simulator or Player)
 
@@ -134,6 +141,7 @@ if ROBOT_MODE_ENABLED: # Only if robot-mode=on was selected in command line
         global EVA_DOLLAR
         if msg.topic == topic_base + '/state':
             EVA_ROBOT_STATE = "FREE" # msg.payload.decode()
+            robot_free.set() # Wakes up the command that is waiting for the robot
         elif msg.topic == topic_base + '/var/dollar':
             EVA_DOLLAR = msg.payload.decode()
             
@@ -157,7 +165,9 @@ else: # User not selected the robot-mode=on in commend line
 root = {}
 script_node = {}
 links_node = {}
-fila_links =  [] # Link queue (commands)
+fila_links =  [] # Link queue (commands). Each link is a pair of instruction indexes (from, to)
+program = [] # Instructions of the loaded script (eva_vm). Rebuilt by load_program() on import and reload
+key_index = {} # key -> index of its instruction in program
 thread_pop_pause = False
 play = False # Play status of the script. This variable has an influence on the function. link_process
 script_file = "" # Variable that stores the pointer to the xml script file on disk.
@@ -287,8 +297,7 @@ def runScript():
     gui.bt_stop.bind("<Button-1>", stopScript)
     gui.bt_import.unbind("<Button-1>")
     play = True # ativa a var do play do script
-    root.find("settings").find("voice").attrib["key"]
-    busca_links(root.find("settings").find("voice").attrib["key"]) # o primeiro elemento da interação é o voice
+    busca_links(key_index[root.find("settings").find("voice").attrib["key"]]) # o primeiro elemento da interação é o voice
     threading.Thread(target=link_process, args=()).start()
 
 # Activate the script play var
@@ -305,32 +314,45 @@ def stopScript(self):
     gui.bt_import.bind("<Button-1>", importFileThread)
     play = False # desativa a var de play do script. Faz com que o script seja interrompido
     EVA_ROBOT_STATE = "FREE" # libera a execução, caso esteja executando algum comando bloqueante
+    robot_free.set()
 
 # Import file thread
 def importFileThread(self):
     threading.Thread(target=importFile, args=()).start()
 
+# Returns the EvaML root node of the script file and, for a precompiled binary program (.evab), the decoded program
+# (its root has only the <settings>: the commands are lowered straight from the tables of the program)
+def load_root(script_file):
+    file_name = getattr(script_file, "name", script_file)
+    if str(file_name).lower().endswith(".evab"):
+        binary = eva_program.load(file_name)
+        return binary.root, binary
+    return eva_xml.parse(script_file).getroot(), None
+
 # Eva Import Script function
 def importFile():
     global root, script_node, links_node, script_file
     print("Importing a file.")
     # Now EvaSIM can read json
-    filetypes = (('evaML files', '*.xml *.json'), )
+    filetypes = (('evaML files', '*.xml *.json *.evab'), )
     script_file = fd.askopenfile(mode = "r", title = 'Open an EvaML Script File', initialdir = './', filetypes = filetypes)
-    # imagine that the guy will read a json or an xml
-    if (re.findall(r'\.(xml|json|JSON|XML)', str(script_file)))[0].lower() == "json": # leitura de json
+    # imagine that the guy will read a json, an xml or a precompiled (binary) program
+    file_type = (re.findall(r'\.(xml|json|evab|JSON|XML|EVAB)', str(script_file)))[0].lower()
+    if file_type == "json": # leitura de json
         print("Converting and running a JSON file.")
         # Script_file is not a string and still has information beyond the file path
         # So it needs to be processed before being passed to the conversion module
         json_to_evaml_conv.converte(str(script_file).split("'")[1], tkinter)
         script_file = "_json_to_evaml_converted.xml" # Json file converted to XML
+    elif file_type == "evab": # Reading a binary program. The file is read again in binary mode, without XML parsing
+        print("Running a precompiled (binary) file.")
     else: # Reading an XML
         print("Running a XML file.")
     # VM variables
-    tree = ET.parse(script_file)  # XML code file
-    root = tree.getroot() # EvaML root node
+    root, binary = load_root(script_file) # EvaML root node
     script_node = root.find("script")
     links_node = root.find("links")
+    load_program(binary)
     gui.bt_run_sim['state'] = NORMAL
     gui.bt_run_sim.bind("<Button-1>", setSimMode)
     if ROBOT_MODE_ENABLED: gui.bt_run_robot['state'] = NORMAL
@@ -346,10 +368,10 @@ def importFile():
 def reloadFile(self):
     global root, script_node, links_node, script_file
     script_file.seek(0) # Places the file object pointer at the beginning
-    tree = ET.parse(script_file) # # XML code file
-    root = tree.getroot() # EvaML root node
+    root, binary = load_root(script_file) # EvaML root node
     script_node = root.find("script")
     links_node = root.find("links")
+    load_program(binary)
     evaEmotion("NEUTRAL")
     only_file_name = str(script_file).split("/")[-1].split("'")[0]
     gui.terminal.insert(INSERT, '\nSTATE: Script => ' + only_file_name + ' was RELOADED.')
@@ -615,6 +637,29 @@ def ledAnimation(animation):
     else: print("A wrong led animation was selected.")
 
 
+# Blocking commands (robot mode). The robot is busy until it publishes its state (/state topic)
+# robot_busy() must be called before the command is published, so the answer of the robot is not lost
+def robot_busy():
+    global EVA_ROBOT_STATE
+    EVA_ROBOT_STATE = "BUSY"
+    robot_free.clear()
+
+# Waits (without using the CPU) until the robot is free, the timeout of the command (config.py) expires or the script
+# is stopped. Returns False if the script was stopped. A timeout stops the script (like the Stop button)
+def wait_robot_free(command):
+    timeout = config.ROBOT_COMMAND_TIMEOUTS.get(command)
+    if not robot_free.wait(timeout):
+        stopScript(None) # restores the buttons (Run, Import, ...) and frees the robot state
+        ledAnimation("STOP")
+        gui.terminal.insert(INSERT, "\nError -> The robot did not finish the <" + command + "> command in " + str(timeout) + " seconds. The script was stopped. Please, check the robot (or the timeouts in config.py).", "error")
+        gui.terminal.see(tkinter.END)
+        return False
+    if not play: # stopScript
+        ledAnimation("STOP")
+        return False
+    return True
+
+
 # Set the Eva emotion
 def evaEmotion(expression):
     if expression == "NEUTRAL":
@@ -673,633 +718,660 @@ def light(color, state):
 
 
 # Virtual machine functions
-# Execute the commands
-def exec_comando(node):
-    global EVA_ROBOT_STATE
-    global img_neutral, img_happy, img_angry, img_sad, img_surprise
-    if node.tag == "voice":
-        gui.terminal.insert(INSERT, "\nSTATE: Selected Voice => " + node.attrib["tone"])
-        gui.terminal.see(tkinter.END)
-        gui.terminal.insert(INSERT, "\nTIP: If the <talk> command doesn't speak some text, try emptying the audio_cache_files folder", "tip")
-        if RUNNING_MODE == "EVA_ROBOT":
-            client.publish(topic_base + "/log", "Using the voice: " + node.attrib["tone"]) # 
+# Command handlers (dispatch table of eva_vm). Each handler executes one instruction
+# node is the command element and args are its operands, decoded by eva_vm when the script was loaded
+@eva_vm.command("voice")
+def exec_voice(node, args):
+    gui.terminal.insert(INSERT, "\nSTATE: Selected Voice => " + node.attrib["tone"])
+    gui.terminal.see(tkinter.END)
+    gui.terminal.insert(INSERT, "\nTIP: If the <talk> command doesn't speak some text, try emptying the audio_cache_files folder", "tip")
+    if RUNNING_MODE == "EVA_ROBOT":
+        client.publish(topic_base + "/log", "Using the voice: " + node.attrib["tone"]) # 
 
 
-    if node.tag == "motion": # Movement of the head and arms
-        if node.get("left-arm") != None: # Move the left arm
-            gui.terminal.insert(INSERT, "\nSTATE: Moving the left arm! Movement type => " + node.attrib["left-arm"], "motion")
+# <motion> movement of the head and arms
+@eva_vm.command("motion")
+def exec_motion(node, args):
+    if node.get("left-arm") != None: # Move the left arm
+        gui.terminal.insert(INSERT, "\nSTATE: Moving the left arm! Movement type => " + node.attrib["left-arm"], "motion")
+        gui.terminal.see(tkinter.END)
+    if node.get("right-arm") != None: # Move the right arm
+        gui.terminal.insert(INSERT, "\nSTATE: Moving the right arm! Movement type => " + node.attrib["right-arm"], "motion")
+        gui.terminal.see(tkinter.END)
+    if node.get("head") != None: # Move head with the new format (<head> element)
+            gui.terminal.insert(INSERT, "\nSTATE: Moving the head! Movement type => " + node.attrib["head"], "motion")
             gui.terminal.see(tkinter.END)
-        if node.get("right-arm") != None: # Move the right arm
-            gui.terminal.insert(INSERT, "\nSTATE: Moving the right arm! Movement type => " + node.attrib["right-arm"], "motion")
+    else: # Check if the old version was used
+        if node.get("type") != None: # Maintaining compatibility with the old version of the motion element
+            gui.terminal.insert(INSERT, "\nSTATE: Moving the head! Movement type => " + node.attrib["type"], "motion")
             gui.terminal.see(tkinter.END)
+    print("Moving the head and/or the arms.")
+    if RUNNING_MODE == "EVA_ROBOT":
+        if node.get("left-arm") != None: # Move the left arm
+            client.publish(topic_base + "/motion/arm/left", node.attrib["left-arm"]); # comando para o robô físico
+        if node.get("right-arm") != None:  # Move the right arm
+            client.publish(topic_base + "/motion/arm/right", node.attrib["right-arm"]); # comando para o robô físico
         if node.get("head") != None: # Move head with the new format (<head> element)
-                gui.terminal.insert(INSERT, "\nSTATE: Moving the head! Movement type => " + node.attrib["head"], "motion")
-                gui.terminal.see(tkinter.END)
+                client.publish(topic_base + "/motion/head", node.attrib["head"]); # Command for the physical robot
+                time.sleep(0.2) # This pause is necessary for arm commands to be received via the serial port
         else: # Check if the old version was used
-            if node.get("type") != None: # Maintaining compatibility with the old version of the motion element
-                gui.terminal.insert(INSERT, "\nSTATE: Moving the head! Movement type => " + node.attrib["type"], "motion")
-                gui.terminal.see(tkinter.END)
-        print("Moving the head and/or the arms.")
-        if RUNNING_MODE == "EVA_ROBOT":
-            if node.get("left-arm") != None: # Move the left arm
-                client.publish(topic_base + "/motion/arm/left", node.attrib["left-arm"]); # comando para o robô físico
-            if node.get("right-arm") != None:  # Move the right arm
-                client.publish(topic_base + "/motion/arm/right", node.attrib["right-arm"]); # comando para o robô físico
-            if node.get("head") != None: # Move head with the new format (<head> element)
-                    client.publish(topic_base + "/motion/head", node.attrib["head"]); # Command for the physical robot
-                    time.sleep(0.2) # This pause is necessary for arm commands to be received via the serial port
-            else: # Check if the old version was used
-                if node.get("type") != None: # Maintaining compatibility with the old version of the motion element    
-                    client.publish(topic_base + "/motion/head", node.attrib["type"]); # Command for the physical robot
-                    time.sleep(0.2) # This pause is necessary for arm commands to be received via the serial port
-        else:
-            time.sleep(0.1) # A symbolic time. In the robot, the movement does not block the script and takes different times
+            if node.get("type") != None: # Maintaining compatibility with the old version of the motion element    
+                client.publish(topic_base + "/motion/head", node.attrib["type"]); # Command for the physical robot
+                time.sleep(0.2) # This pause is necessary for arm commands to be received via the serial port
+    else:
+        time.sleep(0.1) # A symbolic time. In the robot, the movement does not block the script and takes different times
 
 
-    elif node.tag == "light":
-        lightEffect = "ON"
-        state = node.attrib["state"]
-        # Process light Effects settings
-        if root.find("settings").find("lightEffects") != None:
-            if root.find("settings").find("lightEffects").attrib["mode"] == "OFF":
-                lightEffect = "OFF"
-        
-        # Following case, if the state is off, and may not have a color attribute defined
-        if state == "OFF":
-            color = "BLACK"
-            if lightEffect == "OFF":
-                message_state = "\nSTATE: Light Effects DISABLED."
-            else:
-                message_state = "\nSTATE: Turnning off the light."
-            gui.terminal.insert(INSERT, message_state)
-            gui.terminal.see(tkinter.END)
-        else:
-            color = node.attrib["color"]
-            if lightEffect == "OFF":
-                message_state = "\nSTATE: Light Effects DISABLED."
-                state = "OFF"
-            else:
-                message_state = "\nSTATE: Turnning on the light. Color = " + color + "."
-            gui.terminal.insert(INSERT, message_state)
-            gui.terminal.see(tkinter.END) # Autoscrolling
-        light(color , state)
+@eva_vm.command("light")
+def exec_light(node, args):
+    color, state, message_state = args # Light Effects settings already applied (eva_vm.decode_light)
+    gui.terminal.insert(INSERT, message_state)
+    gui.terminal.see(tkinter.END) # Autoscrolling
+    light(color , state)
 
-        if RUNNING_MODE == "EVA_ROBOT":
-            client.publish(topic_base + "/light", color + "|" + state); # Command for the physical robot
-        else:
-            time.sleep(0.1) # Emulates real bulb response time
+    if RUNNING_MODE == "EVA_ROBOT":
+        client.publish(topic_base + "/light", color + "|" + state); # Command for the physical robot
+    else:
+        time.sleep(0.1) # Emulates real bulb response time
 
 
-    elif node.tag == "wait":
-        duration = node.attrib["duration"]
-        gui.terminal.insert(INSERT, "\nSTATE: Pausing. Duration = " + duration + " ms")
+@eva_vm.command("wait")
+def exec_wait(node, args):
+    duration, seconds = args
+    gui.terminal.insert(INSERT, "\nSTATE: Pausing. Duration = " + duration + " ms")
+    gui.terminal.see(tkinter.END)
+    time.sleep(seconds)
+
+
+@eva_vm.command("led")
+def exec_led(node, args):
+    # Selection of the execution mode is done within the ledAnimation() function
+    ledAnimation(node.attrib["animation"])
+    gui.terminal.insert(INSERT, "\nSTATE: Matrix Leds. Animation = " + node.attrib["animation"])
+    gui.terminal.see(tkinter.END)
+
+
+@eva_vm.command("mqtt")
+def exec_mqtt(node, args):
+    mqtt_topic = node.attrib["topic"]
+    mqtt_message = node.attrib["message"]
+    if (len(mqtt_topic) or len(mqtt_message)) == 0: # erro
+        gui.terminal.insert(INSERT, "\nError -> The topic or message attribute is empty.")
+        gui.terminal.see(tkinter.END)
+        exit(1)
+    else:
+        client.publish(mqtt_topic, mqtt_message)
+        print("Publishing a MQTT message to an external device.", mqtt_topic, mqtt_message)
+        gui.terminal.insert(INSERT, "\nSTATE: MQTT publishing. Topic = " + mqtt_topic + " and Message = " + mqtt_message + ".")
         gui.terminal.see(tkinter.END)
-        time.sleep(int(duration)/1000) # Convert to seconds
 
 
-    elif node.tag == "led":
-        # Selection of the execution mode is done within the ledAnimation() function
-        ledAnimation(node.attrib["animation"])
-        gui.terminal.insert(INSERT, "\nSTATE: Matrix Leds. Animation = " + node.attrib["animation"])
+@eva_vm.command("random")
+def exec_random(node, args):
+    min, max, int_min, int_max = args
+    # Check if min <= max
+    if (int_min > int_max):
+        gui.terminal.insert(INSERT, "\nError -> The 'min' attribute of the random command must be less than or equal to the 'max' attribute. Please, check your code.", "error")
         gui.terminal.see(tkinter.END)
-        
+        exit(1)
 
-    elif node.tag == "mqtt":
-        mqtt_topic = node.attrib["topic"]
-        mqtt_message = node.attrib["message"]
-        if (len(mqtt_topic) or len(mqtt_message)) == 0: # erro
-            gui.terminal.insert(INSERT, "\nError -> The topic or message attribute is empty.")
-            gui.terminal.see(tkinter.END)
-            exit(1)
-        else:
-            client.publish(mqtt_topic, mqtt_message)
-            print("Publishing a MQTT message to an external device.", mqtt_topic, mqtt_message)
-            gui.terminal.insert(INSERT, "\nSTATE: MQTT publishing. Topic = " + mqtt_topic + " and Message = " + mqtt_message + ".")
-            gui.terminal.see(tkinter.END)
+    if node.get("var") == None: # Maintains compatibility with the use of the $ variable
+        eva_memory.var_dolar.append([str(rnd.randint(int_min, int_max)), "<random>"])
+        gui.terminal.insert(INSERT, "\nSTATE: Generating a random number (using the variable $): " + eva_memory.var_dolar[-1][0])
+        tab_load_mem_dollar()
+        gui.terminal.see(tkinter.END)
+        print("random command, min = " + min + ", max = " + max + ", valor = " + eva_memory.var_dolar[-1][0])
+    else:
+        var_name = node.attrib["var"]
+        eva_memory.vars[var_name] = str(rnd.randint(int_min, int_max))
+        print("Eva ram => ", eva_memory.vars)
+        gui.terminal.insert(INSERT, "\nSTATE: Generating a random number (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
+        tab_load_mem_vars() # Enter data from variable memory into the var table
+        gui.terminal.see(tkinter.END)
+        print("random command USING VAR, min = " + min + ", max = " + max + ", valor = ")
 
 
-    elif node.tag == "random":
-        min = node.attrib["min"]
-        max = node.attrib["max"]
-        # Check if min <= max
-        if (int(min) > int(max)):
-            gui.terminal.insert(INSERT, "\nError -> The 'min' attribute of the random command must be less than or equal to the 'max' attribute. Please, check your code.", "error")
-            gui.terminal.see(tkinter.END)
-            exit(1)
+@eva_vm.command("listen")
+def exec_listen(node, args):
+    if node.get("language") == None: # Maintains compatibility with the use of <listen> in old scripts
+        # It will be used the default value defined in config.py file
+        language_for_listen = config.LANG_DEFAULT_SPEECH_RECOGNITION
+    else:
+        language_for_listen =  node.attrib["language"]
+
+    if RUNNING_MODE == "EVA_ROBOT": 
+        client.publish(topic_base + "/log", "EVA is listening...")
+        robot_busy()
+        ledAnimation("LISTEN")
+        client.publish(topic_base + "/listen", language_for_listen)
+
+        if not wait_robot_free("listen"): # The script was stopped
+            return
 
         if node.get("var") == None: # Maintains compatibility with the use of the $ variable
-            eva_memory.var_dolar.append([str(rnd.randint(int(min), int(max))), "<random>"])
-            gui.terminal.insert(INSERT, "\nSTATE: Generating a random number (using the variable $): " + eva_memory.var_dolar[-1][0])
+            eva_memory.var_dolar.append([EVA_DOLLAR, "<listen>"])
+            gui.terminal.insert(INSERT, "\nSTATE: Listening (language -> " + language_for_listen + "): var = $" + ", value = " + eva_memory.var_dolar[-1][0])
             tab_load_mem_dollar()
             gui.terminal.see(tkinter.END)
-            print("random command, min = " + min + ", max = " + max + ", valor = " + eva_memory.var_dolar[-1][0])
+            ledAnimation("STOP")
+            
         else:
             var_name = node.attrib["var"]
-            eva_memory.vars[var_name] = str(rnd.randint(int(min), int(max)))
+            eva_memory.vars[var_name] = EVA_DOLLAR
             print("Eva ram => ", eva_memory.vars)
-            gui.terminal.insert(INSERT, "\nSTATE: Generating a random number (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
+            gui.terminal.insert(INSERT, "\nSTATE: Listening (language -> " + language_for_listen + "): (using the user variable '" + var_name + "'): " + EVA_DOLLAR)
             tab_load_mem_vars() # Enter data from variable memory into the var table
             gui.terminal.see(tkinter.END)
-            print("random command USING VAR, min = " + min + ", max = " + max + ", valor = ")
-
-
-    elif node.tag == "listen":
-        if node.get("language") == None: # Maintains compatibility with the use of <listen> in old scripts
-            # It will be used the default value defined in config.py file
-            language_for_listen = config.LANG_DEFAULT_SPEECH_RECOGNITION
-        else:
-            language_for_listen =  node.attrib["language"]
-
-        if RUNNING_MODE == "EVA_ROBOT": 
-            client.publish(topic_base + "/log", "EVA is listening...")
-            EVA_ROBOT_STATE = "BUSY"
-            ledAnimation("LISTEN")
-            client.publish(topic_base + "/listen", language_for_listen)
-
-            while (EVA_ROBOT_STATE != "FREE"):
-                pass
+            print("Listen command USING VAR...")
+            ledAnimation("STOP")
 
+    else:
+        lock_thread_pop()
+        ledAnimation("LISTEN")
+        # Pop up window closing function for the <return> key)
+        def fechar_pop_ret(self): 
+            print(var.get())
             if node.get("var") == None: # Maintains compatibility with the use of the $ variable
-                eva_memory.var_dolar.append([EVA_DOLLAR, "<listen>"])
+                eva_memory.var_dolar.append([var.get(), "<listen>"])
                 gui.terminal.insert(INSERT, "\nSTATE: Listening (language -> " + language_for_listen + "): var = $" + ", value = " + eva_memory.var_dolar[-1][0])
                 tab_load_mem_dollar()
                 gui.terminal.see(tkinter.END)
-                ledAnimation("STOP")
-                
+                pop.destroy()
+                unlock_thread_pop() # Reactivate the script processing thread
             else:
                 var_name = node.attrib["var"]
-                eva_memory.vars[var_name] = EVA_DOLLAR
+                eva_memory.vars[var_name] = var.get()
                 print("Eva ram => ", eva_memory.vars)
-                gui.terminal.insert(INSERT, "\nSTATE: Listening (language -> " + language_for_listen + "): (using the user variable '" + var_name + "'): " + EVA_DOLLAR)
+                gui.terminal.insert(INSERT, "\nSTATE: Listening (language -> " + language_for_listen + "): (using the user variable '" + var_name + "'): " + var.get())
                 tab_load_mem_vars() # Enter data from variable memory into the var table
                 gui.terminal.see(tkinter.END)
                 print("Listen command USING VAR...")
-                ledAnimation("STOP")
-
-        else:
-            lock_thread_pop()
-            ledAnimation("LISTEN")
-            # Pop up window closing function for the <return> key)
-            def fechar_pop_ret(self): 
-                print(var.get())
-                if node.get("var") == None: # Maintains compatibility with the use of the $ variable
-                    eva_memory.var_dolar.append([var.get(), "<listen>"])
-                    gui.terminal.insert(INSERT, "\nSTATE: Listening (language -> " + language_for_listen + "): var = $" + ", value = " + eva_memory.var_dolar[-1][0])
-                    tab_load_mem_dollar()
-                    gui.terminal.see(tkinter.END)
-                    pop.destroy()
-                    unlock_thread_pop() # Reactivate the script processing thread
-                else:
-                    var_name = node.attrib["var"]
-                    eva_memory.vars[var_name] = var.get()
-                    print("Eva ram => ", eva_memory.vars)
-                    gui.terminal.insert(INSERT, "\nSTATE: Listening (language -> " + language_for_listen + "): (using the user variable '" + var_name + "'): " + var.get())
-                    tab_load_mem_vars() # Enter data from variable memory into the var table
-                    gui.terminal.see(tkinter.END)
-                    print("Listen command USING VAR...")
-                    pop.destroy()
-                    unlock_thread_pop() # Reactivate the script processing thread
-            
-            # Pop up window closing function for OK button
-            def fechar_pop_bt(): 
-                print(var.get())
-                if node.get("var") == None: # Maintains compatibility with the use of the $ variable
-                    eva_memory.var_dolar.append([var.get(), "<listen>"])
-                    gui.terminal.insert(INSERT, "\nSTATE: Listening (language -> " + language_for_listen + ">: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
-                    tab_load_mem_dollar()
-                    gui.terminal.see(tkinter.END)
-                    pop.destroy()
-                    unlock_thread_pop() # Reactivate the script processing thread
-                else:
-                    var_name = node.attrib["var"]
-                    eva_memory.vars[var_name] = var.get()
-                    print("Eva ram => ", eva_memory.vars)
-                    gui.terminal.insert(INSERT, "\nSTATE: Listening (language -> " + language_for_listen + "): (using the user variable '" + var_name + "'): " + var.get())
-                    tab_load_mem_vars() # Enter data from variable memory into the var table
-                    gui.terminal.see(tkinter.END)
-                    print("Listen command USING VAR...")
-                    pop.destroy()
-                    unlock_thread_pop() # Reactivate the script processing thread
-                
-            # Window (GUI) creation
-            var = StringVar()
-            pop = Toplevel(gui)
-            pop.title("Listen Command")
-            # Disable the maximize and close buttons
-            pop.resizable(False, False)
-            pop.protocol("WM_DELETE_WINDOW", False)
-            w = 450
-            h = 150
-            ws = gui.winfo_screenwidth()
-            hs = gui.winfo_screenheight()
-            x = (ws/2) - (w/2)
-            y = (hs/2) - (h/2)  
-            pop.geometry('%dx%d+%d+%d' % (w, h, x, y))
-            label = Label(pop, text="Eva is listening (language -> " + language_for_listen + ")... Please, enter your answer!", font = ('Arial', 10))
-            label.pack(pady=20)
-            E1 = Entry(pop, textvariable = var, font = ('Arial', 10))
-            E1.bind("<Return>", fechar_pop_ret)
-            E1.pack()
-            Button(pop, text="    OK    ", font = font1, command=fechar_pop_bt).pack(pady=20)
-            # Wait for release, waiting for the user's response
-            while thread_pop_pause: 
-                time.sleep(0.5)
-            ledAnimation("STOP")
-
-
-    elif node.tag == "talk": # Blocking function
-        if node.text == None: # There is no text to speech
-            print("There is no text to speech in the element <talk>.")
-            gui.terminal.insert(INSERT, "\nError -> There is no text to speech in the element <talk>. Please, check your code.", "error")
-            gui.terminal.see(tkinter.END)
-            exit(1)
-
-        texto = node.text
-        # Replace variables throughout the text. variables must exist in memory
-        if "#" in texto:
-            # Checks if the robot's memory (vars) is empty
-            if eva_memory.vars == {}:
-                gui.terminal.insert(INSERT, "\nError -> No variables have been defined. Please, check your code.", "error")
+                pop.destroy()
+                unlock_thread_pop() # Reactivate the script processing thread
+        
+        # Pop up window closing function for OK button
+        def fechar_pop_bt(): 
+            print(var.get())
+            if node.get("var") == None: # Maintains compatibility with the use of the $ variable
+                eva_memory.var_dolar.append([var.get(), "<listen>"])
+                gui.terminal.insert(INSERT, "\nSTATE: Listening (language -> " + language_for_listen + ">: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
+                tab_load_mem_dollar()
                 gui.terminal.see(tkinter.END)
-                exit(1)
-
-            var_list = re.findall(r'\#[a-zA-Z]+[0-9]*', texto) # Generate list of occurrences of vars (#...)
-            for v in var_list:
-                if v[1:] in eva_memory.vars:
-                    texto = texto.replace(v, str(eva_memory.vars[v[1:]]))
-                else:
-                    # If the variable does not exist in the robot's memory, it displays an error message
-                    print("================================")
-                    error_string = "\nError -> The variable #" + v[1:] + " has not been declared. Please, check your code."
-                    gui.terminal.insert(INSERT, error_string, "error")
-                    gui.terminal.see(tkinter.END)
-                    exit(1)
-
-        # This part replaces the $, or the $-1 or the $1 in the text
-        if "$" in texto: # Check if there is $ in the text
-            # Checks if var_dollar has any value in the robot's memory
-            if (len(eva_memory.var_dolar)) == 0:
-                gui.terminal.insert(INSERT, "\nError-> The variable $ has no value. Please, check your code.", "error")
+                pop.destroy()
+                unlock_thread_pop() # Reactivate the script processing thread
+            else:
+                var_name = node.attrib["var"]
+                eva_memory.vars[var_name] = var.get()
+                print("Eva ram => ", eva_memory.vars)
+                gui.terminal.insert(INSERT, "\nSTATE: Listening (language -> " + language_for_listen + "): (using the user variable '" + var_name + "'): " + var.get())
+                tab_load_mem_vars() # Enter data from variable memory into the var table
                 gui.terminal.see(tkinter.END)
-                exit(1)
-            else: # Find the patterns $ $n or $-n in the string and replace with the corresponding values
-                dollars_list = re.findall(r'\$[-0-9]*', texto) # Find dollar patterns and return a list of occurrences
-                dollars_list = sorted(dollars_list, key=len, reverse=True) # Sort the list in descending order of length (of the element)
-                for var_dollar in dollars_list:
-                    if len(var_dollar) == 1: # Is the dollar ($)
-                        texto = texto.replace(var_dollar, eva_memory.var_dolar[-1][0])
-                    else: # May be of type $n or $-n
-                        if "-" in var_dollar: # $-n type
-                            indice = int(var_dollar[2:]) # Var dollar is of type $-n. then just take n and convert it to int
-                            texto = texto.replace(var_dollar, eva_memory.var_dolar[-(indice + 1)][0]) 
-                        else: # tipo $n
-                            indice = int(var_dollar[1:]) # Var dollar is of type $n. then just take n and convert it to int
-                            texto = texto.replace(var_dollar, eva_memory.var_dolar[(indice - 1)][0])
+                print("Listen command USING VAR...")
+                pop.destroy()
+                unlock_thread_pop() # Reactivate the script processing thread
             
-        # This part implements the random text generated by using the / character
-        texto = texto.split(sep="/") # Text becomes a list with the number of sentences divided by character. /
-        print(texto)
-        ind_random = rnd.randint(0, len(texto)-1)
-        gui.terminal.insert(INSERT, '\nSTATE: Speaking: "' + texto[ind_random] + '"')
+        # Window (GUI) creation
+        var = StringVar()
+        pop = Toplevel(gui)
+        pop.title("Listen Command")
+        # Disable the maximize and close buttons
+        pop.resizable(False, False)
+        pop.protocol("WM_DELETE_WINDOW", False)
+        w = 450
+        h = 150
+        ws = gui.winfo_screenwidth()
+        hs = gui.winfo_screenheight()
+        x = (ws/2) - (w/2)
+        y = (hs/2) - (h/2)  
+        pop.geometry('%dx%d+%d+%d' % (w, h, x, y))
+        label = Label(pop, text="Eva is listening (language -> " + language_for_listen + ")... Please, enter your answer!", font = ('Arial', 10))
+        label.pack(pady=20)
+        E1 = Entry(pop, textvariable = var, font = ('Arial', 10))
+        E1.bind("<Return>", fechar_pop_ret)
+        E1.pack()
+        Button(pop, text="    OK    ", font = font1, command=fechar_pop_bt).pack(pady=20)
+        # Wait for release, waiting for the user's response
+        while thread_pop_pause: 
+            time.sleep(0.5)
+        ledAnimation("STOP")
+
+
+# <talk> blocking function
+@eva_vm.command("talk")
+def exec_talk(node, args):
+    template = args # eva_vm.TalkTemplate
+    if template == None: # There is no text to speech
+        print("There is no text to speech in the element <talk>.")
+        gui.terminal.insert(INSERT, "\nError -> There is no text to speech in the element <talk>. Please, check your code.", "error")
         gui.terminal.see(tkinter.END)
+        exit(1)
+
+    # The variables ($ and #var) must exist in memory. The random text is one of the alternatives (split by the / character)
+    try:
+        template.check()
+        ind_random = rnd.randint(0, len(template.alternatives)-1)
+        texto = template.render(ind_random)
+    except eva_vm.ScriptError as e:
+        script_error(e)
+    print(texto)
+    gui.terminal.insert(INSERT, '\nSTATE: Speaking: "' + texto + '"')
+    gui.terminal.see(tkinter.END)
 
-        if RUNNING_MODE == "EVA_ROBOT":
-            client.publish(topic_base + "/log", "EVA will try to speak a text: " + texto[ind_random])
-            ledAnimation("SPEAK")
-            EVA_ROBOT_STATE = "BUSY" # Speech is a blocking function. the robot is busy
-            if node.get("tone") == None: # Usuario não selecionou a voz no talk. A opção global será utilizada
-                client.publish(topic_base + "/talk", root.find("settings")[0].attrib["tone"] + "|" + texto[ind_random])
+    if RUNNING_MODE == "EVA_ROBOT":
+        client.publish(topic_base + "/log", "EVA will try to speak a text: " + texto)
+        ledAnimation("SPEAK")
+        robot_busy() # Speech is a blocking function. the robot is busy
+        client.publish(topic_base + "/talk", template.tone + "|" + texto) # voz selecionada em talk ou a voz do script
+        if not wait_robot_free("talk"): # The script was stopped
+            return
+        ledAnimation("STOP")
+    else:
+        if not TTS_IBM_WATSON: # without IBM-Watson
+            gui.option_add('*Dialog.msg.width', 30)
+            gui.option_add('*Dialog.msg.font', 'Arial 14')
+            lock_thread_pop()
+            messagebox.showinfo("TTS - Message Box - EVA is speaking!", texto)
+            unlock_thread_pop() # Reactivate the script processing thread
+
+        elif TTS_IBM_WATSON:
+            # Using IBM Watson ################################
+            # Assume the default UTF-8 (Generates the hashing of the audio file)
+            # Also, uses the voice tone attribute in file hashing
+            tone_voice = template.tone # voz selecionada em talk ou a voz do script
+
+            hash_object = hashlib.md5(texto.encode())
+            file_name = "_audio_"  + tone_voice + hash_object.hexdigest()
+
+            # Checks if the speech audio already exists in the folder
+            if not (os.path.isfile("audio_cache_files/" + file_name + audio_ext)): # If it doesn't exist, call Watson
+                audio_file_is_ok = False
+                while(not audio_file_is_ok):
+                    # Eva TTS functions
+                    with open("audio_cache_files/" + file_name + audio_ext, 'wb') as audio_file:
+                        try:
+                            res = tts.synthesize(texto, accept = ibm_audio_ext, voice = tone_voice).get_result()
+                            audio_file.write(res.content)
+                            playsound("audio_cache_files/" + file_name + audio_ext, block = True) # Play the audio of the speech
+                        except:
+                            print("Voice exception")
+                            gui.terminal.insert(INSERT, "\nError when trying to select voice tone, please verify the tone atribute.\n", "error")
+                            gui.terminal.see(tkinter.END)
+                            exit(1)
+                    file_size = os.path.getsize("audio_cache_files/" + file_name + audio_ext)
+                    if file_size == 0: # Corrupted file
+                        print("#### Corrupted file.. (It's necessary to use the same implementation like in tts-module in EVA robot!)")
+                        os.remove("audio_cache_files/" + file_name + audio_ext)
+                    else:
+                        audio_file_is_ok = True
             else:
-                client.publish(topic_base + "/talk", node.attrib["tone"] + "|" + texto[ind_random]) # voz selecionado em talk será utilizada
-            while(EVA_ROBOT_STATE != "FREE"):
-                pass
-            ledAnimation("STOP")
-        else:
-            if not TTS_IBM_WATSON: # without IBM-Watson
-                gui.option_add('*Dialog.msg.width', 30)
-                gui.option_add('*Dialog.msg.font', 'Arial 14')
-                lock_thread_pop()
-                messagebox.showinfo("TTS - Message Box - EVA is speaking!", texto[ind_random])
-                unlock_thread_pop() # Reactivate the script processing thread
+                playsound("audio_cache_files/" + file_name + audio_ext, block = True) # Play the audio of the speech
+        ##############################
 
-            elif TTS_IBM_WATSON:
-                # Using IBM Watson ################################
-                # Assume the default UTF-8 (Generates the hashing of the audio file)
-                # Also, uses the voice tone attribute in file hashing
-                if node.get("tone") == None: # Usuario não selecionou a voz no talk. A opção global será utilizada
-                    tone_voice = root.find("settings")[0].attrib["tone"]
-                else:
-                    tone_voice = node.attrib["tone"]
-
-                hash_object = hashlib.md5(texto[ind_random].encode())
-                file_name = "_audio_"  + tone_voice + hash_object.hexdigest()
-
-                # Checks if the speech audio already exists in the folder
-                if not (os.path.isfile("audio_cache_files/" + file_name + audio_ext)): # If it doesn't exist, call Watson
-                    audio_file_is_ok = False
-                    while(not audio_file_is_ok):
-                        # Eva TTS functions
-                        with open("audio_cache_files/" + file_name + audio_ext, 'wb') as audio_file:
-                            try:
-                                res = tts.synthesize(texto[ind_random], accept = ibm_audio_ext, voice = tone_voice).get_result()
-                                audio_file.write(res.content)
-                                playsound("audio_cache_files/" + file_name + audio_ext, block = True) # Play the audio of the speech
-                            except:
-                                print("Voice exception")
-                                gui.terminal.insert(INSERT, "\nError when trying to select voice tone, please verify the tone atribute.\n", "error")
-                                gui.terminal.see(tkinter.END)
-                                exit(1)
-                        file_size = os.path.getsize("audio_cache_files/" + file_name + audio_ext)
-                        if file_size == 0: # Corrupted file
-                            print("#### Corrupted file.. (It's necessary to use the same implementation like in tts-module in EVA robot!)")
-                            os.remove("audio_cache_files/" + file_name + audio_ext)
-                        else:
-                            audio_file_is_ok = True
-                else:
-                    playsound("audio_cache_files/" + file_name + audio_ext, block = True) # Play the audio of the speech
-            ##############################
 
-
-    elif node.tag == "evaEmotion":
-        emotion = node.attrib["emotion"]
-        if RUNNING_MODE == "EVA_ROBOT":
-            client.publish(topic_base + "/evaEmotion", emotion) # Command for physical EVA
-        gui.terminal.insert(INSERT, "\nSTATE: Expressing an emotion => " + emotion)
-        gui.terminal.see(tkinter.END)
-        evaEmotion(emotion)
+@eva_vm.command("evaEmotion")
+def exec_evaEmotion(node, args):
+    emotion = node.attrib["emotion"]
+    if RUNNING_MODE == "EVA_ROBOT":
+        client.publish(topic_base + "/evaEmotion", emotion) # Command for physical EVA
+    gui.terminal.insert(INSERT, "\nSTATE: Expressing an emotion => " + emotion)
+    gui.terminal.see(tkinter.END)
+    evaEmotion(emotion)
 
 
-    elif node.tag == "audio":
-        sound_file =  node.attrib["source"]
-        block = False # Audio play does not block script execution
-        if node.attrib["block"] == "TRUE":
-            block = True
-        message_audio = '\nSTATE: Playing a sound: "' + "audio_files/" + sound_file + ".wav" + '", block=' + str(block)
+@eva_vm.command("audio")
+def exec_audio(node, args):
+    sound_file, block, message_audio = args # Audio Effects settings already applied (eva_vm.decode_audio)
+    gui.terminal.insert(INSERT, message_audio)
+    gui.terminal.see(tkinter.END)
 
-        # Process Audio Effects settings
-        if root.find("settings").find("audioEffects") != None:
-            if root.find("settings").find("audioEffects").attrib["mode"] == "OFF":
-                # Mode off implies the use of MUTED-SOUND file 
-                sound_file = "my_sounds/MUTED-SOUND.wav"
-                message_audio = "\nSTATE: Audio Effects DISABLED."
+    try:
+        if block == True:
+            if RUNNING_MODE == "EVA_ROBOT":
+                client.publish(topic_base + "/log", "EVA will play a sound in blocking mode.")
+                robot_busy()
+                client.publish(topic_base + "/audio", sound_file + "|" + "TRUE")
+                if not wait_robot_free("audio"): # The script was stopped
+                    return
+            else:
+                print(sound_file)
+                playsound("audio_files/" + sound_file + ".wav", block = block)
 
-        gui.terminal.insert(INSERT, message_audio)
+        else: # Block = False
+            if RUNNING_MODE == "EVA_ROBOT":
+                client.publish(topic_base + "/log", "EVA will play a sound in no-blocking mode.")
+                client.publish(topic_base + "/audio", sound_file + "|" + "FALSE")
+            else:
+                playsound("audio_files/" + sound_file + ".wav", block = block) 
+    except Exception as e:
+        # Handle an exception. I didn't find any exceptions in the library documentation
+        error_string = "\nError -> " + str(e) + "."
+        gui.terminal.insert(INSERT, error_string, "error")
         gui.terminal.see(tkinter.END)
+        exit(1)
+
+
+@eva_vm.command("case")
+def exec_case(node, args):
+    eva_memory.reg_case = 0 # Clear the case flag
+    try:
+        if args(): # The predicate of the case (eva_vm.compile_case)
+            print("case = true")
+            eva_memory.reg_case = 1 # Turn on the reg case indicating that the comparison result was true
+    except eva_vm.ScriptError as e:
+        script_error(e)
+
+
+# First case of a <switch> compiled into a hash table (eva_vm.SwitchJump)
+# Returns the index of the case (or default) that matches, as if the cases had been tested one by one, or None
+def exec_switch_jump(jump):
+    eva_memory.reg_case = 0 # Clear the case flag
+    try:
+        case_index = jump.select()
+    except eva_vm.ScriptError as e:
+        script_error(e)
+        return None
+    if case_index != None:
+        print("case = true")
+        eva_memory.reg_case = 1 # Turn on the reg case indicating that the comparison result was true
+    return case_index
+
+
+# Reports an error of the script. Fatal errors stop the script
+def script_error(e):
+    gui.terminal.insert(INSERT, "\n" + str(e), "error")
+    gui.terminal.see(tkinter.END)
+    if e.fatal:
+        exit(1)
 
-        try:
-            if block == True:
-                if RUNNING_MODE == "EVA_ROBOT":
-                    client.publish(topic_base + "/log", "EVA will play a sound in blocking mode.")
-                    EVA_ROBOT_STATE = "BUSY"
-                    client.publish(topic_base + "/audio", sound_file + "|" + "TRUE")
-                    while (EVA_ROBOT_STATE != "FREE"):
-                        pass
-                else:
-                    print(sound_file)
-                    playsound("audio_files/" + sound_file + ".wav", block = block)
 
-            else: # Block = False
-                if RUNNING_MODE == "EVA_ROBOT":
-                    client.publish(topic_base + "/log", "EVA will play a sound in no-blocking mode.")
-                    client.publish(topic_base + "/audio", sound_file + "|" + "FALSE")
-                else:
-                    playsound("audio_files/" + sound_file + ".wav", block = block) 
-        except Exception as e:
-            # Handle an exception. I didn't find any exceptions in the library documentation
-            error_string = "\nError -> " + str(e) + "."
+# <default> default is always true
+@eva_vm.command("default")
+def exec_default(node, args):
+    print("Default = true")
+    eva_memory.reg_case = 1 # Turn on the reg_case indicating that the comparison result was true
+
+
+@eva_vm.command("counter")
+def exec_counter(node, args):
+    var_name, var_value, op, op_function = args
+    # Checks if the operation is different from assignment and checks if var ... DOES NOT exist in memory
+    if op != "=":
+        if (var_name not in eva_memory.vars):
+            error_string = "\nError -> The variable " + var_name + " has not been declared. Please, check your code."
             gui.terminal.insert(INSERT, error_string, "error")
             gui.terminal.see(tkinter.END)
             exit(1)
 
-
-##########################################################
-    elif node.tag == "case": 
-        global valor
-        eva_memory.reg_case = 0 # Clear the case flag
-        valor = node.attrib["value"]
-        valor = valor.lower() # Comparisons are not case sensitive
-        # Handles comparison types and operators
-        # Case 1 (op = "exact")
-        if node.attrib['op'] == "exact": # Exact é sempre uma comparação de STRINGS
-            # Case in which a user variable was defined for a command: QRcode, random, userEmotion or userId
-            if node.attrib['var'] != "$":
-                # It remains to check whether the variable exists in the robot's memory
-                # eva_memory.vars[st_var_value[1:]
-                print("value: ", valor, type(valor), node.attrib['var'], eva_memory.vars[node.attrib['var']])
-                if valor[0] == "#": # é uma referência a uma variável
-                    valor = valor[1:] # remove o # da referência
-                if valor == str(eva_memory.vars[node.attrib['var']]).lower(): # Comparação de STRINGS
-                    print("case = true")
-                    eva_memory.reg_case = 1 # Turn on the reg case indicating that the comparison result was true
-
-            # Checks if var_dollar memory has any value
-            elif (len(eva_memory.var_dolar)) == 0:
-                gui.terminal.insert(INSERT, "\nError -> The variable $ has no value. Please, check your code.", "error")
-                gui.terminal.see(tkinter.END)
-                exit(1)  
-
-            
-            elif valor == eva_memory.var_dolar[-1][0].lower():
-                # Compare value with the top of the stack of the var_dollar variable
-                print("value: ", valor, type(valor))
-                print("case = true")
-                eva_memory.reg_case = 1 # Turn on the reg_case indicating that the comparison result was true
-        
-        # Case 2 (op = "contain")
-        elif node.attrib['op'] == "contain":      
-            # Checa se a comparação é com o dollar
-            if "$" == node.attrib['var'][0]:
-                if (len(eva_memory.var_dolar)) == 0: # Checks if var_dollar memory has any value
-                    gui.terminal.insert(INSERT, "\nError -> The variable $ has no value. Please, check your code.", "error")
-                    gui.terminal.see(tkinter.END)
-                    exit(1)  
-                else:
-                    # Checks if the string in value is contained in $
-                    print("value: ", valor, type(valor))
-                    if valor in eva_memory.var_dolar[-1][0].lower(): 
-                        print("case = true")
-                        eva_memory.reg_case = 1 # Turn on the reg case indicating that the comparison result was true
-            # se não é com dollar então é com uma var do usuário
-            elif node.attrib['var'] in eva_memory.vars: # verifica se a variável de usuário existe na memória
-                if "#" == valor[0]:
-                    valor = valor[1:]
-                    if str(eva_memory.vars[valor]).lower() in str(eva_memory.vars[node.attrib['var']]).lower():
-                        print("case = true")
-                        eva_memory.reg_case = 1 # Turn on the reg case indicating that the comparison result was true
-                else:
-                    if valor in eva_memory.vars[node.attrib['var']]:
-                        print("case = true")
-                        eva_memory.reg_case = 1 # Turn on the reg case indicating that the comparison result was true
-            else:
-                gui.terminal.insert(INSERT, "\nError -> The variable '" + node.attrib['var'] + "' does no exist. Please, check your code.", "error")
-                gui.terminal.see(tkinter.END)
-##########################################################
+    if op == "=": # Perform the assignment
+        eva_memory.vars[var_name] = var_value
+    elif op_function != None: # +, *, / (integer division) or % (eva_vm.COUNTER_OPS)
+        eva_memory.vars[var_name] = op_function(eva_memory.vars[var_name], var_value)
+    
+    print("Eva ram => ", eva_memory.vars)
+    gui.terminal.insert(INSERT, "\nSTATE: Counter: var = " + var_name + ", value = " + str(var_value) + ", op(" + op + "), result = " + str(eva_memory.vars[var_name]))
+    tab_load_mem_vars() # Enter data from variable memory into the variable table
+    gui.terminal.see(tkinter.END)
 
 
-        # case 3 (MATHEMATICAL COMPARISON)
+@eva_vm.command("textEmotion")
+def exec_textEmotion(node, args):
+    global img_neutral, img_happy, img_angry, img_sad, img_surprise
+    # Falta implementar o modo Simulador ###############
+    if RUNNING_MODE == "EVA_ROBOT": 
+        client.publish(topic_base + "/log", "EVA is analysing the text emotion...")
+        robot_busy()
+        ledAnimation("RAINBOW")
+        if node.get("language") == None:
+            client.publish(topic_base + "/textEmotion", config.LANG_DEFAULT_GOOGLE_TRANSLATING + "|" + eva_memory.var_dolar[-1][0])
         else:
-            # Function to obtain an operand from $, n, #n, or value
-            def get_op(st_var_value):
-                # Is a constant?
-                if st_var_value.isnumeric():
-                    return int(st_var_value)
-
-                # Is $?
-                if st_var_value == "$":
-                    # Checks if var_dollar memory has any value
-                    if (len(eva_memory.var_dolar)) == 0:
-                        gui.terminal.insert(INSERT, "\nError -> The variable $ has no value. Please, check your code.", "error")
-                        gui.terminal.see(tkinter.END)
-                        exit(1)
-                    return int(eva_memory.var_dolar[-1][0]) # Returns the value of $ converted for int
-
-                # Is a variable of type #n?
-                if "#" in st_var_value:
-                    # Checks if var #... DOES NOT exist in memory
-                    if (st_var_value[1:] not in eva_memory.vars):
-                        error_string = "\nError -> The variable #" + valor[1:] + " has not been declared. Please, check your code."
-                        gui.terminal.insert(INSERT, error_string, "error")
-                        gui.terminal.see(tkinter.END)
-                        exit(1)
-                    return int(eva_memory.vars[st_var_value[1:]]) # Returns the value of #n converted for int
-                
-                # If it is not a number, nor a dollar, nor a #, then it is a variable of this type var = "x" in <switch>
-                # Checks if the variable exists in memory
-                if (st_var_value not in eva_memory.vars):
-                    error_string = "\nError -> The variable #" + valor[1:] + " has not been declared. Please, check your code."
-                    gui.terminal.insert(INSERT, error_string, "error")
-                    gui.terminal.see(tkinter.END)
-                    exit(1)
-                return int(eva_memory.vars[st_var_value]) # Returns the value of n converted for int
-
-            # Obtains the operands to perform mathematical comparison operations
-            # The restriction on not using constants in var of <switch> was guaranteed in the parser
-            op1 = get_op(node.attrib['var'])
-            op2 = get_op(valor)
-
-            # Performs the operations ==, >, <, >=, <= and != to compare operands 1 and 2
-            if node.attrib['op'] == "eq": # Equality
-                if op1 == op2: # It is needed to remove the # from the variable
-                    print("case = true")
-                    eva_memory.reg_case = 1 # Turn on the reg_case indicating that the comparison result was true
-
-            elif node.attrib['op'] == "lt": # Less than
-                if op1 < op2:
-                    print("case = true")
-                    eva_memory.reg_case = 1 # Turn on the reg_case indicating that the comparison result was true
-
-            elif node.attrib['op'] == "gt": # Greater than
-                if op1 > op2:
-                    print("case = true")
-                    eva_memory.reg_case = 1 # Turn on the reg_case indicating that the comparison result was true
+            client.publish(topic_base + "/textEmotion", node.attrib["language"] + "|" + eva_memory.var_dolar[-1][0])
             
-            elif node.attrib['op'] == "lte": # Less than or Equal
-                if op1 <= op2:
-                    print("case = true")
-                    eva_memory.reg_case = 1 # Turn on the reg_case indicating that the comparison result was true
 
-            elif node.attrib['op'] == "gte": # Greater than or Equal
-                if op1 >= op2:
-                    print("case = true")
-                    eva_memory.reg_case = 1 # Turn on the reg_case indicating that the comparison result was true
-
-            elif node.attrib['op'] == "ne": # Not equal
-                if op1 != op2:
-                    print("case = true")
-                    eva_memory.reg_case = 1 # Turn on the reg_case indicating that the comparison result was true        
+        if not wait_robot_free("textEmotion"): # The script was stopped
+            return
+        
+        if node.get("var") == None: # Maintains compatibility with the use of the $ variable
+            eva_memory.var_dolar.append([EVA_DOLLAR, "<textEmotion>"])
+            gui.terminal.insert(INSERT, "\nSTATE: textEmotion: var=$" + ", value = " + eva_memory.var_dolar[-1][0])
+            tab_load_mem_dollar()
+            gui.terminal.see(tkinter.END)
+            ledAnimation("STOP")
+        else:
+            var_name = node.attrib["var"]
+            eva_memory.vars[var_name] = EVA_DOLLAR
+            print("Eva ram => ", eva_memory.vars)
+            gui.terminal.insert(INSERT, "\nSTATE: textEmotion (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
+            tab_load_mem_vars() # Enter data from variable memory into the var table
+            gui.terminal.see(tkinter.END)
+            print("textEmotion command USING VAR...")
+        ledAnimation("STOP")
+    
+    else:
 
+        lock_thread_pop()
+        ledAnimation("LISTEN")
+        def fechar_pop(): # Pop up window closing function
+            print(var.get())
+            if node.get("var") == None: # Maintains compatibility with the use of the $ variable
+                eva_memory.var_dolar.append([var.get(), "<textEmotion>"])
+                gui.terminal.insert(INSERT, "\nSTATE: textEmotion: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
+                tab_load_mem_dollar()
+                gui.terminal.see(tkinter.END)
+            else:
+                var_name = node.attrib["var"]
+                eva_memory.vars[var_name] = var.get()
+                print("Eva ram => ", eva_memory.vars)
+                gui.terminal.insert(INSERT, "\nSTATE: textEmotion (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
+                tab_load_mem_vars() # Enter data from variable memory into the var table
+                gui.terminal.see(tkinter.END)
+                print("textEmotion command USING VAR...")
+            pop.destroy()
+            ledAnimation("STOP")
+            unlock_thread_pop() # Reactivate the script processing thread
+
+        var = StringVar()
+        var.set("NEUTRAL")
+        img_neutral = PhotoImage(file = "images/img_neutral.png")
+        img_happy = PhotoImage(file = "images/img_happy.png")
+        img_angry = PhotoImage(file = "images/img_angry.png")
+        img_sad = PhotoImage(file = "images/img_sad.png")
+        img_surprise = PhotoImage(file = "images/img_surprise.png")
+        img_fear = PhotoImage(file = "images/img_fear.png")
+        img_disgust = PhotoImage(file = "images/img_disgust.png")
+        pop = Toplevel(gui)
+        pop.title("textEmotion Command")
+        # Disable the maximize and close buttons
+        pop.resizable(False, False)
+        pop.protocol("WM_DELETE_WINDOW", False)
+        w = 970
+        h = 250
+        ws = gui.winfo_screenwidth()
+        hs = gui.winfo_screenheight()
+        x = (ws/2) - (w/2)
+        y = (hs/2) - (h/2)  
+        pop.geometry('%dx%d+%d+%d' % (w, h, x, y))
+        Label(pop, text="Eva is analysing the sentiment of your text. Please, choose one emotion!", font = ('Arial', 10)).place(x = 290, y = 10)
+        # Images are displayed using labels
+        Label(pop, image=img_neutral).place(x = 10, y = 50)
+        Label(pop, image=img_happy).place(x = 147, y = 50)
+        Label(pop, image=img_angry).place(x = 284, y = 50)
+        Label(pop, image=img_sad).place(x = 421, y = 50)
+        Label(pop, image=img_surprise).place(x = 558, y = 50)
+        Label(pop, image=img_fear).place(x = 695, y = 50)
+        Label(pop, image=img_disgust).place(x = 832, y = 50)
+        Radiobutton(pop, text = "Neutral", variable = var, font = font1, command = None, value = "NEUTRAL").place(x = 35, y = 185)
+        Radiobutton(pop, text = "Happy", variable = var, font = font1, command = None, value = "HAPPY").place(x = 172, y = 185)
+        Radiobutton(pop, text = "Angry", variable = var, font = font1, command = None, value = "ANGRY").place(x = 312, y = 185)
+        Radiobutton(pop, text = "Sad", variable = var, font = font1, command = None, value = "SAD").place(x = 452, y = 185)
+        Radiobutton(pop, text = "Surprise", variable = var, font = font1, command = None, value = "SURPRISE").place(x = 580, y = 185)
+        Radiobutton(pop, text = "Fear", variable = var, font = font1, command = None, value = "FEAR").place(x = 725, y = 185)
+        Radiobutton(pop, text = "Disgust", variable = var, font = font1, command = None, value = "DISGUST").place(x = 855, y = 185)
+        Button(pop, text = "           OK          ", font = font1, command = fechar_pop).place(x = 430, y = 215)
+        # Wait for release, waiting for the user's response
+        while thread_pop_pause: 
+            time.sleep(0.5)
+
+
+@eva_vm.command("userHandPose")
+def exec_userHandPose(node, args):
+    global img_thumbsup, img_thumbsdown, img_peace, img_open, img_three
+
+    if gui.chk_handpose_value.get() == 1:
+        
+        lock_thread_pop()
+        ledAnimation("LISTEN")
+        
+        result_pose = hp.run()
 
-    elif node.tag == "default": # Default is always true
-        print("Default = true")
-        eva_memory.reg_case = 1 # Turn on the reg_case indicating that the comparison result was true
 
+        var = StringVar(value=result_pose)
 
-    elif node.tag == "counter":
-        var_name = node.attrib["var"]
-        var_value = int(node.attrib["value"])
-        op = node.attrib["op"]
-        # Checks if the operation is different from assignment and checks if var ... DOES NOT exist in memory
-        if op != "=":
-            if (var_name not in eva_memory.vars):
-                error_string = "\nError -> The variable " + var_name + " has not been declared. Please, check your code."
-                gui.terminal.insert(INSERT, error_string, "error")
-                gui.terminal.see(tkinter.END)
-                exit(1)
+        if node.get("var") == None: # mantém a compatibilidade com o uso da variável $
+            eva_memory.var_dolar.append([var.get(), "<userHandPose>"])
+            gui.terminal.insert(INSERT, "\nSTATE: userHandPose : var=$" + ", value=" + eva_memory.var_dolar[-1][0])
+            tab_load_mem_dollar()
+            gui.terminal.see(tkinter.END)
+        else:
+            var_name = node.attrib["var"]
+            eva_memory.vars[var_name] = var.get()
+            print("Eva ram => ", eva_memory.vars)
+            gui.terminal.insert(INSERT, "\nSTATE: userHandPose : (using the user variable '" + var_name + "'): " + EVA_DOLLAR)
+            tab_load_mem_vars() # entra com os dados da memoria de variaveis na tabela de vars
+            gui.terminal.see(tkinter.END)
 
-        if op == "=": # Perform the assignment
-            eva_memory.vars[var_name] = var_value
 
-        if op == "+": # Perform the addition
-            eva_memory.vars[var_name] += var_value
+    elif gui.chk_handpose_value.get() == 0:    
+        lock_thread_pop()
 
-        if op == "*": # Perform the product
-            eva_memory.vars[var_name] *= var_value
+        def fechar_pop(): # função de fechamento da janela pop up
+                print(var.get())
+                if node.get("var") == None: # mantém a compatibilidade com o uso da variável $
+                    eva_memory.var_dolar.append([var.get(), "<userHandPose>"])
+                    gui.terminal.insert(INSERT, "\nSTATE: userHandPose : var=$" + ", value=" + eva_memory.var_dolar[-1][0])
+                    tab_load_mem_dollar()
+                    gui.terminal.see(tkinter.END)
+                else:
+                    var_name = node.attrib["var"]
+                    eva_memory.vars[var_name] = var.get()
+                    print("Eva ram => ", eva_memory.vars)
+                    gui.terminal.insert(INSERT, "\nSTATE: userHandPose : (using the user variable '" + var_name + "'): " + EVA_DOLLAR)
+                    tab_load_mem_vars() # entra com os dados da memoria de variaveis na tabela de vars
+                    gui.terminal.see(tkinter.END)
+                    print("userHandPose command USING VAR...")
+                pop.destroy()
+                ledAnimation("STOP")
+                unlock_thread_pop() # reativa a thread de processamento do script
+
+        var = StringVar()
+        var.set("OPEN")
+        img_thumbsup = PhotoImage(file = "images/img_thumbsup.png")
+        img_thumbsdown = PhotoImage(file = "images/img_thumbsdown.png")
+        img_peace = PhotoImage(file = "images/img_peace.png")
+        img_open = PhotoImage(file = "images/img_open.png")
+        img_three = PhotoImage(file = "images/img_three.png")
+        pop = Toplevel(window)
+        pop.title("userHandPose Command")
+        # Disable the max and close buttons
+        pop.resizable(False, False)
+        pop.protocol("WM_DELETE_WINDOW", False)
+        w = 697
+        h = 250
+        ws = gui.winfo_screenwidth()
+        hs = gui.winfo_screenheight()
+        x = (ws/2) - (w/2)
+        y = (hs/2) - (h/2)  
+        pop.geometry('%dx%d+%d+%d' % (w, h, x, y))
+        pop.grab_set() # faz com que a janela receba todos os eventos
+        Label(pop, text="Eva is analysing your hands. Please, choose one gesture!", font = ('Arial', 10)).place(x = 146, y = 10)
+        # imagens são exibidas usando os lables
+        Label(pop, image=img_thumbsup).place(x = 10, y = 50)
+        Label(pop, image=img_thumbsdown).place(x = 147, y = 50)
+        Label(pop, image=img_peace).place(x = 284, y = 50)
+        Label(pop, image=img_open).place(x = 421, y = 50)
+        Label(pop, image=img_three).place(x = 558, y = 50)
+        Radiobutton(pop, text = "Thumbs_UP", variable = var, font = font1, command = None, value = "THUMBS_UP").place(x = 25, y = 185)
+        Radiobutton(pop, text = "Thumbs_DOWN", variable = var, font = font1, command = None, value = "THUMBS_DOWN").place(x = 152, y = 185)
+        Radiobutton(pop, text = "Peace", variable = var, font = font1, command = None, value = "PEACE").place(x = 302, y = 185)
+        Radiobutton(pop, text = "Open", variable = var, font = font1, command = None, value = "OPEN").place(x = 442, y = 185)
+        Radiobutton(pop, text = "Three", variable = var, font = font1, command = None, value = "THREE").place(x = 575, y = 185)
+        Button(pop, text = "     OK     ", font = font1, command = fechar_pop).place(x = 310, y = 215)
+        # espera pela liberacao, aguardando a resposta do usuario
+        while thread_pop_pause: 
+            time.sleep(0.5)
+        ledAnimation("STOP")
+
+
+@eva_vm.command("userEmotion")
+def exec_userEmotion(node, args):
+    global img_neutral, img_happy, img_angry, img_sad, img_surprise
+    # global img_neutral, img_happy, img_angry, img_sad, img_surprise, img_fear, img_desgust
+    
+    if RUNNING_MODE == "EVA_ROBOT": 
+        client.publish(topic_base + "/log", "EVA is capturing the user emotion...")
+        robot_busy()
+        ledAnimation("LISTEN")
+        client.publish(topic_base + "/userEmotion", " ")
 
-        if op == "/": # Performs the division (it was /=) but I changed it to //= (integer division)
-            eva_memory.vars[var_name] //= var_value
+        if not wait_robot_free("userEmotion"): # The script was stopped
+            return
 
-        if op == "%": # Calculate the module
-            eva_memory.vars[var_name] %= var_value
-        
-        print("Eva ram => ", eva_memory.vars)
-        gui.terminal.insert(INSERT, "\nSTATE: Counter: var = " + var_name + ", value = " + str(var_value) + ", op(" + op + "), result = " + str(eva_memory.vars[var_name]))
-        tab_load_mem_vars() # Enter data from variable memory into the variable table
-        gui.terminal.see(tkinter.END)
+        if node.get("var") == None: # Maintains compatibility with the use of the $ variable
+            eva_memory.var_dolar.append([EVA_DOLLAR, "<listen>"])
+            gui.terminal.insert(INSERT, "\nSTATE: userEmotion: var=$" + ", value = " + eva_memory.var_dolar[-1][0])
+            tab_load_mem_dollar()
+            gui.terminal.see(tkinter.END)
+            ledAnimation("STOP")
+        else:
+            var_name = node.attrib["var"]
+            eva_memory.vars[var_name] = EVA_DOLLAR
+            print("Eva ram => ", eva_memory.vars)
+            gui.terminal.insert(INSERT, "\nSTATE: userEmotion (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
+            tab_load_mem_vars() # Enter data from variable memory into the variable table
+            gui.terminal.see(tkinter.END)
+            print("userEmotion command USING VAR...")
+            ledAnimation("STOP")
+    else:
 
+        ###############
+        lock_thread_pop()
+        ledAnimation("LISTEN")
 
-    elif node.tag == "textEmotion":
-        # Falta implementar o modo Simulador ###############
-        if RUNNING_MODE == "EVA_ROBOT": 
-            client.publish(topic_base + "/log", "EVA is analysing the text emotion...")
-            EVA_ROBOT_STATE = "BUSY"
-            ledAnimation("RAINBOW")
-            if node.get("language") == None:
-                client.publish(topic_base + "/textEmotion", config.LANG_DEFAULT_GOOGLE_TRANSLATING + "|" + eva_memory.var_dolar[-1][0])
-            else:
-                client.publish(topic_base + "/textEmotion", node.attrib["language"] + "|" + eva_memory.var_dolar[-1][0])
-                
+        if gui.chk_emotion_value.get() == 1:
+            result_emotion = ue.run()
 
-            while (EVA_ROBOT_STATE != "FREE"):
-                pass
-            
-            if node.get("var") == None: # Maintains compatibility with the use of the $ variable
-                eva_memory.var_dolar.append([EVA_DOLLAR, "<textEmotion>"])
-                gui.terminal.insert(INSERT, "\nSTATE: textEmotion: var=$" + ", value = " + eva_memory.var_dolar[-1][0])
+            var = StringVar(value=result_emotion)
+            if node.get("var") == None: # mantém a compatibilidade com o uso da variável $
+                eva_memory.var_dolar.append([var.get(), "<userEmotion>"])
+                gui.terminal.insert(INSERT, "\nSTATE: userEmotion : var=$" + ", value=" + eva_memory.var_dolar[-1][0])
                 tab_load_mem_dollar()
                 gui.terminal.see(tkinter.END)
-                ledAnimation("STOP")
             else:
                 var_name = node.attrib["var"]
-                eva_memory.vars[var_name] = EVA_DOLLAR
+                eva_memory.vars[var_name] = var.get()
                 print("Eva ram => ", eva_memory.vars)
-                gui.terminal.insert(INSERT, "\nSTATE: textEmotion (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
-                tab_load_mem_vars() # Enter data from variable memory into the var table
+                gui.terminal.insert(INSERT, "\nSTATE: userEmotion : (using the user variable '" + var_name + "'): " + EVA_DOLLAR)
+                tab_load_mem_vars() # entra com os dados da memoria de variaveis na tabela de vars
                 gui.terminal.see(tkinter.END)
-                print("textEmotion command USING VAR...")
-            ledAnimation("STOP")
-        
-        else:
-
-            lock_thread_pop()
-            ledAnimation("LISTEN")
-            def fechar_pop(): # Pop up window closing function
+       
+        elif gui.chk_emotion_value.get() == 0:
+            def fechar_pop(): # função de fechamento da janela pop up
                 print(var.get())
-                if node.get("var") == None: # Maintains compatibility with the use of the $ variable
-                    eva_memory.var_dolar.append([var.get(), "<textEmotion>"])
-                    gui.terminal.insert(INSERT, "\nSTATE: textEmotion: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
+                if node.get("var") == None: # mantém a compatibilidade com o uso da variável $
+                    eva_memory.var_dolar.append([var.get(), "<userEmotion>"])
+                    gui.terminal.insert(INSERT, "\nSTATE: userEmotion : var=$" + ", value=" + eva_memory.var_dolar[-1][0])
                     tab_load_mem_dollar()
                     gui.terminal.see(tkinter.END)
                 else:
                     var_name = node.attrib["var"]
                     eva_memory.vars[var_name] = var.get()
                     print("Eva ram => ", eva_memory.vars)
-                    gui.terminal.insert(INSERT, "\nSTATE: textEmotion (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
-                    tab_load_mem_vars() # Enter data from variable memory into the var table
+                    gui.terminal.insert(INSERT, "\nSTATE: userEmotion : (using the user variable '" + var_name + "'): " + EVA_DOLLAR)
+                    tab_load_mem_vars() # entra com os dados da memoria de variaveis na tabela de vars
                     gui.terminal.see(tkinter.END)
-                    print("textEmotion command USING VAR...")
+                    print("userEmotion command USING VAR...")
                 pop.destroy()
                 ledAnimation("STOP")
-                unlock_thread_pop() # Reactivate the script processing thread
+                unlock_thread_pop() # reativa a thread de processamento do script
 
             var = StringVar()
             var.set("NEUTRAL")
@@ -1311,19 +1383,20 @@ def exec_comando(node):
             img_fear = PhotoImage(file = "images/img_fear.png")
             img_disgust = PhotoImage(file = "images/img_disgust.png")
             pop = Toplevel(gui)
-            pop.title("textEmotion Command")
-            # Disable the maximize and close buttons
+            pop.title("userEmotion Command")
+            # Disable the max and close buttons
             pop.resizable(False, False)
             pop.protocol("WM_DELETE_WINDOW", False)
-            w = 970
+            w = 973
             h = 250
             ws = gui.winfo_screenwidth()
             hs = gui.winfo_screenheight()
             x = (ws/2) - (w/2)
             y = (hs/2) - (h/2)  
             pop.geometry('%dx%d+%d+%d' % (w, h, x, y))
-            Label(pop, text="Eva is analysing the sentiment of your text. Please, choose one emotion!", font = ('Arial', 10)).place(x = 290, y = 10)
-            # Images are displayed using labels
+            # pop.grab_set() # faz com que a janela receba todos os eventos
+            Label(pop, text="Eva is analysing your face expression. Please, choose one emotion!", font = ('Arial', 10)).place(x = 246, y = 10)
+            # imagens são exibidas usando os lables
             Label(pop, image=img_neutral).place(x = 10, y = 50)
             Label(pop, image=img_happy).place(x = 147, y = 50)
             Label(pop, image=img_angry).place(x = 284, y = 50)
@@ -1335,479 +1408,292 @@ def exec_comando(node):
             Radiobutton(pop, text = "Happy", variable = var, font = font1, command = None, value = "HAPPY").place(x = 172, y = 185)
             Radiobutton(pop, text = "Angry", variable = var, font = font1, command = None, value = "ANGRY").place(x = 312, y = 185)
             Radiobutton(pop, text = "Sad", variable = var, font = font1, command = None, value = "SAD").place(x = 452, y = 185)
-            Radiobutton(pop, text = "Surprise", variable = var, font = font1, command = None, value = "SURPRISE").place(x = 580, y = 185)
-            Radiobutton(pop, text = "Fear", variable = var, font = font1, command = None, value = "FEAR").place(x = 725, y = 185)
-            Radiobutton(pop, text = "Disgust", variable = var, font = font1, command = None, value = "DISGUST").place(x = 855, y = 185)
-            Button(pop, text = "           OK          ", font = font1, command = fechar_pop).place(x = 430, y = 215)
-            # Wait for release, waiting for the user's response
+            Radiobutton(pop, text = "Surprise", variable = var, font = font1, command = None, value = "SURPRISE").place(x = 575, y = 185)
+            Radiobutton(pop, text = "Fear", variable = var, font = font1, command = None, value = "FEAR").place(x = 715, y = 185)
+            Radiobutton(pop, text = "Disgust", variable = var, font = font1, command = None, value = "DISGUST").place(x = 852, y = 185)
+            Button(pop, text = "     OK     ", font = font1, command = fechar_pop).place(x = 440, y = 215)
+            # espera pela liberacao, aguardando a resposta do usuario
             while thread_pop_pause: 
                 time.sleep(0.5)
 
-    elif node.tag == "userHandPose":
-        global img_thumbsup, img_thumbsdown, img_peace, img_open, img_three
 
-        if gui.chk_handpose_value.get() == 1:
-            
-            lock_thread_pop()
-            ledAnimation("LISTEN")
-            
-            result_pose = hp.run()
+@eva_vm.command("qrRead")
+def exec_qrRead(node, args):
+    if RUNNING_MODE == "EVA_ROBOT": 
+        client.publish(topic_base + "/log", "EVA is capturing QR Code information...")
+        robot_busy()
+        client.publish(topic_base + "/qrRead", " ")
+        ledAnimation("LISTEN")
+        
+
+        if not wait_robot_free("qrRead"): # The script was stopped
+            return
+
+    
+        if node.get("var") == None: # Maintains compatibility with the use of the $ variable
+            eva_memory.var_dolar.append([EVA_DOLLAR, "<qrRead>"])
+            gui.terminal.insert(INSERT, "\nSTATE: QR Code reading: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
+            tab_load_mem_dollar()
+            gui.terminal.see(tkinter.END)
+            ledAnimation("STOP")
+        else:
+            var_name = node.attrib["var"]
+            eva_memory.vars[var_name] = EVA_DOLLAR
+            print("Eva ram => ", eva_memory.vars)
+            gui.terminal.insert(INSERT, "\nSTATE: QR Code reading (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
+            tab_load_mem_vars() # Enter data from variable memory into the var table
+            gui.terminal.see(tkinter.END)
+            print("qrRead command USING VAR...")
+        ledAnimation("STOP")
+
+    else:
+
+        lock_thread_pop()
+        ledAnimation("LISTEN")
+        if gui.chk_qrRead_value.get() == 1:
 
+            result_qr = qr.main()
 
-            var = StringVar(value=result_pose)
+            var = StringVar(value=result_qr)
 
             if node.get("var") == None: # mantém a compatibilidade com o uso da variável $
-                eva_memory.var_dolar.append([var.get(), "<userHandPose>"])
-                gui.terminal.insert(INSERT, "\nSTATE: userHandPose : var=$" + ", value=" + eva_memory.var_dolar[-1][0])
+                eva_memory.var_dolar.append([var.get(), "<qrRead>"])
+                gui.terminal.insert(INSERT, "\nSTATE: qrRead : var=$" + ", value=" + eva_memory.var_dolar[-1][0])
                 tab_load_mem_dollar()
                 gui.terminal.see(tkinter.END)
             else:
                 var_name = node.attrib["var"]
                 eva_memory.vars[var_name] = var.get()
                 print("Eva ram => ", eva_memory.vars)
-                gui.terminal.insert(INSERT, "\nSTATE: userHandPose : (using the user variable '" + var_name + "'): " + EVA_DOLLAR)
+                gui.terminal.insert(INSERT, "\nSTATE: qrRead : (using the user variable '" + var_name + "'): " + EVA_DOLLAR)
                 tab_load_mem_vars() # entra com os dados da memoria de variaveis na tabela de vars
                 gui.terminal.see(tkinter.END)
 
+        elif gui.chk_qrRead_value.get() == 0:
 
-        elif gui.chk_handpose_value.get() == 0:    
-            lock_thread_pop()
-
-            def fechar_pop(): # função de fechamento da janela pop up
-                    print(var.get())
-                    if node.get("var") == None: # mantém a compatibilidade com o uso da variável $
-                        eva_memory.var_dolar.append([var.get(), "<userHandPose>"])
-                        gui.terminal.insert(INSERT, "\nSTATE: userHandPose : var=$" + ", value=" + eva_memory.var_dolar[-1][0])
-                        tab_load_mem_dollar()
-                        gui.terminal.see(tkinter.END)
-                    else:
-                        var_name = node.attrib["var"]
-                        eva_memory.vars[var_name] = var.get()
-                        print("Eva ram => ", eva_memory.vars)
-                        gui.terminal.insert(INSERT, "\nSTATE: userHandPose : (using the user variable '" + var_name + "'): " + EVA_DOLLAR)
-                        tab_load_mem_vars() # entra com os dados da memoria de variaveis na tabela de vars
-                        gui.terminal.see(tkinter.END)
-                        print("userHandPose command USING VAR...")
+            # Pop up window closing function for the <return> key
+            def fechar_pop_ret(self): 
+                print(var.get())
+                if node.get("var") == None: # Maintains compatibility with the use of the $ variable
+                    eva_memory.var_dolar.append([var.get(), "<qrRead>"])
+                    gui.terminal.insert(INSERT, "\nSTATE: QR Code reading: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
+                    tab_load_mem_dollar()
+                    gui.terminal.see(tkinter.END)
                     pop.destroy()
-                    ledAnimation("STOP")
-                    unlock_thread_pop() # reativa a thread de processamento do script
-
+                    unlock_thread_pop() # Reactivate the script processing thread
+                else:
+                    var_name = node.attrib["var"]
+                    eva_memory.vars[var_name] = var.get()
+                    print("Eva ram => ", eva_memory.vars)
+                    gui.terminal.insert(INSERT, "\nSTATE: QR Code reading (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
+                    tab_load_mem_vars() # Enter data from variable memory into the var table
+                    gui.terminal.see(tkinter.END)
+                    print("qrRead command USING VAR...")
+                    pop.destroy()
+                    unlock_thread_pop() # Reactivate the script processing thread
+            
+            # Pop up window closing function for OK button
+            def fechar_pop_bt(): 
+                print(var.get())
+                if node.get("var") == None: # Maintains compatibility with the use of the $ variable
+                    eva_memory.var_dolar.append([var.get(), "<qrRead>"])
+                    gui.terminal.insert(INSERT, "\nSTATE: QR Code reading: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
+                    tab_load_mem_dollar()
+                    gui.terminal.see(tkinter.END)
+                    pop.destroy()
+                    unlock_thread_pop() # Reactivate the script processing thread
+                else:
+                    var_name = node.attrib["var"]
+                    eva_memory.vars[var_name] = var.get()
+                    print("Eva ram => ", eva_memory.vars)
+                    gui.terminal.insert(INSERT, "\nSTATE: QR Code reading (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
+                    tab_load_mem_vars() # Enter data from variable memory into the var table
+                    gui.terminal.see(tkinter.END)
+                    print("qrRead command USING VAR...")
+                    pop.destroy()
+                    unlock_thread_pop() # Reactivate the script processing thread
+                
+            # Window (GUI) creation
+            img_qr = PhotoImage(file = "images/img_qr.png")
             var = StringVar()
-            var.set("OPEN")
-            img_thumbsup = PhotoImage(file = "images/img_thumbsup.png")
-            img_thumbsdown = PhotoImage(file = "images/img_thumbsdown.png")
-            img_peace = PhotoImage(file = "images/img_peace.png")
-            img_open = PhotoImage(file = "images/img_open.png")
-            img_three = PhotoImage(file = "images/img_three.png")
-            pop = Toplevel(window)
-            pop.title("userHandPose Command")
-            # Disable the max and close buttons
+            pop = Toplevel(gui)
+            pop.title("qrRead Command")
+            # Disable the maximize and close buttons
             pop.resizable(False, False)
             pop.protocol("WM_DELETE_WINDOW", False)
-            w = 697
-            h = 250
+            w = 350
+            h = 200
             ws = gui.winfo_screenwidth()
             hs = gui.winfo_screenheight()
             x = (ws/2) - (w/2)
             y = (hs/2) - (h/2)  
             pop.geometry('%dx%d+%d+%d' % (w, h, x, y))
-            pop.grab_set() # faz com que a janela receba todos os eventos
-            Label(pop, text="Eva is analysing your hands. Please, choose one gesture!", font = ('Arial', 10)).place(x = 146, y = 10)
-            # imagens são exibidas usando os lables
-            Label(pop, image=img_thumbsup).place(x = 10, y = 50)
-            Label(pop, image=img_thumbsdown).place(x = 147, y = 50)
-            Label(pop, image=img_peace).place(x = 284, y = 50)
-            Label(pop, image=img_open).place(x = 421, y = 50)
-            Label(pop, image=img_three).place(x = 558, y = 50)
-            Radiobutton(pop, text = "Thumbs_UP", variable = var, font = font1, command = None, value = "THUMBS_UP").place(x = 25, y = 185)
-            Radiobutton(pop, text = "Thumbs_DOWN", variable = var, font = font1, command = None, value = "THUMBS_DOWN").place(x = 152, y = 185)
-            Radiobutton(pop, text = "Peace", variable = var, font = font1, command = None, value = "PEACE").place(x = 302, y = 185)
-            Radiobutton(pop, text = "Open", variable = var, font = font1, command = None, value = "OPEN").place(x = 442, y = 185)
-            Radiobutton(pop, text = "Three", variable = var, font = font1, command = None, value = "THREE").place(x = 575, y = 185)
-            Button(pop, text = "     OK     ", font = font1, command = fechar_pop).place(x = 310, y = 215)
-            # espera pela liberacao, aguardando a resposta do usuario
+            label = Label(pop, text="Eva is reading a QR Code... \nPlease, enter the information contained in the QRCode!", font = ('Arial', 10))
+            label.pack(pady=20)
+            Label(pop, image=img_qr).place(x = 260, y = 110)
+            E1 = Entry(pop, textvariable = var, font = ('Arial', 10))
+            E1.bind("<Return>", fechar_pop_ret)
+            E1.pack()
+            Button(pop, text="    OK    ", font = font1, command=fechar_pop_bt).pack(pady=20)
+            # Wait for release, waiting for the user's response
             while thread_pop_pause: 
                 time.sleep(0.5)
             ledAnimation("STOP")
 
-    elif node.tag == "userEmotion":
-        # global img_neutral, img_happy, img_angry, img_sad, img_surprise, img_fear, img_desgust
-        
-        if RUNNING_MODE == "EVA_ROBOT": 
-            client.publish(topic_base + "/log", "EVA is capturing the user emotion...")
-            EVA_ROBOT_STATE = "BUSY"
-            ledAnimation("LISTEN")
-            client.publish(topic_base + "/userEmotion", " ")
 
-            while (EVA_ROBOT_STATE != "FREE"):
-                pass
+@eva_vm.command("userID")
+def exec_userID(node, args):
+    if RUNNING_MODE == "EVA_ROBOT": 
+        robot_busy()
+        client.publish(topic_base + "/userID", " ")
+        ledAnimation("LISTEN")
+        
 
-            if node.get("var") == None: # Maintains compatibility with the use of the $ variable
-                eva_memory.var_dolar.append([EVA_DOLLAR, "<listen>"])
-                gui.terminal.insert(INSERT, "\nSTATE: userEmotion: var=$" + ", value = " + eva_memory.var_dolar[-1][0])
-                tab_load_mem_dollar()
-                gui.terminal.see(tkinter.END)
-                ledAnimation("STOP")
-            else:
-                var_name = node.attrib["var"]
-                eva_memory.vars[var_name] = EVA_DOLLAR
-                print("Eva ram => ", eva_memory.vars)
-                gui.terminal.insert(INSERT, "\nSTATE: userEmotion (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
-                tab_load_mem_vars() # Enter data from variable memory into the variable table
-                gui.terminal.see(tkinter.END)
-                print("userEmotion command USING VAR...")
-                ledAnimation("STOP")
+        if not wait_robot_free("userID"): # The script was stopped
+            return
+    
+        if node.get("var") == None: # Maintains compatibility with the use of the $ variable
+            eva_memory.var_dolar.append([EVA_DOLLAR, "<userID>"])
+            gui.terminal.insert(INSERT, "\nSTATE: userID: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
+            tab_load_mem_dollar()
+            gui.terminal.see(tkinter.END)
+ 
         else:
+            var_name = node.attrib["var"]
+            eva_memory.vars[var_name] = EVA_DOLLAR
+            print("Eva ram => ", eva_memory.vars)
+            gui.terminal.insert(INSERT, "\nSTATE: userID (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
+            tab_load_mem_vars() # Enter data from variable memory into the var table
+            gui.terminal.see(tkinter.END)
+            print("userID command USING VAR...")
+        
+        ledAnimation("STOP")
 
-            ###############
-            lock_thread_pop()
-            ledAnimation("LISTEN")
+    else:
 
-            if gui.chk_emotion_value.get() == 1:
-                result_emotion = ue.run()
+        lock_thread_pop()
+        ledAnimation("LISTEN")
+        if gui.chk_userid_value.get() == 1:
 
-                var = StringVar(value=result_emotion)
-                if node.get("var") == None: # mantém a compatibilidade com o uso da variável $
-                    eva_memory.var_dolar.append([var.get(), "<userEmotion>"])
-                    gui.terminal.insert(INSERT, "\nSTATE: userEmotion : var=$" + ", value=" + eva_memory.var_dolar[-1][0])
-                    tab_load_mem_dollar()
-                    gui.terminal.see(tkinter.END)
-                else:
-                    var_name = node.attrib["var"]
-                    eva_memory.vars[var_name] = var.get()
-                    print("Eva ram => ", eva_memory.vars)
-                    gui.terminal.insert(INSERT, "\nSTATE: userEmotion : (using the user variable '" + var_name + "'): " + EVA_DOLLAR)
-                    tab_load_mem_vars() # entra com os dados da memoria de variaveis na tabela de vars
-                    gui.terminal.see(tkinter.END)
-           
-            elif gui.chk_emotion_value.get() == 0:
-                def fechar_pop(): # função de fechamento da janela pop up
-                    print(var.get())
-                    if node.get("var") == None: # mantém a compatibilidade com o uso da variável $
-                        eva_memory.var_dolar.append([var.get(), "<userEmotion>"])
-                        gui.terminal.insert(INSERT, "\nSTATE: userEmotion : var=$" + ", value=" + eva_memory.var_dolar[-1][0])
-                        tab_load_mem_dollar()
-                        gui.terminal.see(tkinter.END)
-                    else:
-                        var_name = node.attrib["var"]
-                        eva_memory.vars[var_name] = var.get()
-                        print("Eva ram => ", eva_memory.vars)
-                        gui.terminal.insert(INSERT, "\nSTATE: userEmotion : (using the user variable '" + var_name + "'): " + EVA_DOLLAR)
-                        tab_load_mem_vars() # entra com os dados da memoria de variaveis na tabela de vars
-                        gui.terminal.see(tkinter.END)
-                        print("userEmotion command USING VAR...")
-                    pop.destroy()
-                    ledAnimation("STOP")
-                    unlock_thread_pop() # reativa a thread de processamento do script
-
-                var = StringVar()
-                var.set("NEUTRAL")
-                img_neutral = PhotoImage(file = "images/img_neutral.png")
-                img_happy = PhotoImage(file = "images/img_happy.png")
-                img_angry = PhotoImage(file = "images/img_angry.png")
-                img_sad = PhotoImage(file = "images/img_sad.png")
-                img_surprise = PhotoImage(file = "images/img_surprise.png")
-                img_fear = PhotoImage(file = "images/img_fear.png")
-                img_disgust = PhotoImage(file = "images/img_disgust.png")
-                pop = Toplevel(gui)
-                pop.title("userEmotion Command")
-                # Disable the max and close buttons
-                pop.resizable(False, False)
-                pop.protocol("WM_DELETE_WINDOW", False)
-                w = 973
-                h = 250
-                ws = gui.winfo_screenwidth()
-                hs = gui.winfo_screenheight()
-                x = (ws/2) - (w/2)
-                y = (hs/2) - (h/2)  
-                pop.geometry('%dx%d+%d+%d' % (w, h, x, y))
-                # pop.grab_set() # faz com que a janela receba todos os eventos
-                Label(pop, text="Eva is analysing your face expression. Please, choose one emotion!", font = ('Arial', 10)).place(x = 246, y = 10)
-                # imagens são exibidas usando os lables
-                Label(pop, image=img_neutral).place(x = 10, y = 50)
-                Label(pop, image=img_happy).place(x = 147, y = 50)
-                Label(pop, image=img_angry).place(x = 284, y = 50)
-                Label(pop, image=img_sad).place(x = 421, y = 50)
-                Label(pop, image=img_surprise).place(x = 558, y = 50)
-                Label(pop, image=img_fear).place(x = 695, y = 50)
-                Label(pop, image=img_disgust).place(x = 832, y = 50)
-                Radiobutton(pop, text = "Neutral", variable = var, font = font1, command = None, value = "NEUTRAL").place(x = 35, y = 185)
-                Radiobutton(pop, text = "Happy", variable = var, font = font1, command = None, value = "HAPPY").place(x = 172, y = 185)
-                Radiobutton(pop, text = "Angry", variable = var, font = font1, command = None, value = "ANGRY").place(x = 312, y = 185)
-                Radiobutton(pop, text = "Sad", variable = var, font = font1, command = None, value = "SAD").place(x = 452, y = 185)
-                Radiobutton(pop, text = "Surprise", variable = var, font = font1, command = None, value = "SURPRISE").place(x = 575, y = 185)
-                Radiobutton(pop, text = "Fear", variable = var, font = font1, command = None, value = "FEAR").place(x = 715, y = 185)
-                Radiobutton(pop, text = "Disgust", variable = var, font = font1, command = None, value = "DISGUST").place(x = 852, y = 185)
-                Button(pop, text = "     OK     ", font = font1, command = fechar_pop).place(x = 440, y = 215)
-                # espera pela liberacao, aguardando a resposta do usuario
-                while thread_pop_pause: 
-                    time.sleep(0.5)
-
-    elif node.tag == "qrRead":
-        if RUNNING_MODE == "EVA_ROBOT": 
-            client.publish(topic_base + "/log", "EVA is capturing QR Code information...")
-            EVA_ROBOT_STATE = "BUSY"
-            client.publish(topic_base + "/qrRead", " ")
-            ledAnimation("LISTEN")
-            
+            result_recognition = fr.main()
 
-            while (EVA_ROBOT_STATE != "FREE"):
-                pass
+            var = StringVar(value=result_recognition)
 
-        
-            if node.get("var") == None: # Maintains compatibility with the use of the $ variable
-                eva_memory.var_dolar.append([EVA_DOLLAR, "<qrRead>"])
-                gui.terminal.insert(INSERT, "\nSTATE: QR Code reading: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
+            if node.get("var") == None: # mantém a compatibilidade com o uso da variável $
+                eva_memory.var_dolar.append([var.get(), "<userID>"])
+                gui.terminal.insert(INSERT, "\nSTATE: userID : var=$" + ", value=" + eva_memory.var_dolar[-1][0])
                 tab_load_mem_dollar()
                 gui.terminal.see(tkinter.END)
-                ledAnimation("STOP")
+            
             else:
                 var_name = node.attrib["var"]
-                eva_memory.vars[var_name] = EVA_DOLLAR
+                eva_memory.vars[var_name] = var.get()
                 print("Eva ram => ", eva_memory.vars)
-                gui.terminal.insert(INSERT, "\nSTATE: QR Code reading (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
-                tab_load_mem_vars() # Enter data from variable memory into the var table
+                gui.terminal.insert(INSERT, "\nSTATE: userID : (using the user variable '" + var_name + "'): " + EVA_DOLLAR)
+                tab_load_mem_vars() # entra com os dados da memoria de variaveis na tabela de vars
                 gui.terminal.see(tkinter.END)
-                print("qrRead command USING VAR...")
-            ledAnimation("STOP")
-
-        else:
-
-            lock_thread_pop()
-            ledAnimation("LISTEN")
-            if gui.chk_qrRead_value.get() == 1:
-
-                result_qr = qr.main()
-
-                var = StringVar(value=result_qr)
 
+        elif gui.chk_userid_value.get() == 0:
+        # Pop up window closing function for the <return> key
+            def fechar_pop_ret(self): 
+                print(var.get())
                 if node.get("var") == None: # mantém a compatibilidade com o uso da variável $
-                    eva_memory.var_dolar.append([var.get(), "<qrRead>"])
-                    gui.terminal.insert(INSERT, "\nSTATE: qrRead : var=$" + ", value=" + eva_memory.var_dolar[-1][0])
+                    eva_memory.var_dolar.append([var.get(), "<userID>"])
+                    gui.terminal.insert(INSERT, "\nSTATE: userID: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
                     tab_load_mem_dollar()
                     gui.terminal.see(tkinter.END)
+                    pop.destroy()
+                    unlock_thread_pop() # Reactivate the script processing thread
                 else:
                     var_name = node.attrib["var"]
                     eva_memory.vars[var_name] = var.get()
                     print("Eva ram => ", eva_memory.vars)
-                    gui.terminal.insert(INSERT, "\nSTATE: qrRead : (using the user variable '" + var_name + "'): " + EVA_DOLLAR)
-                    tab_load_mem_vars() # entra com os dados da memoria de variaveis na tabela de vars
+                    gui.terminal.insert(INSERT, "\nSTATE: userID reading (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
+                    tab_load_mem_vars() # Enter data from variable memory into the var table
                     gui.terminal.see(tkinter.END)
-
-            elif gui.chk_qrRead_value.get() == 0:
-
-                # Pop up window closing function for the <return> key
-                def fechar_pop_ret(self): 
-                    print(var.get())
-                    if node.get("var") == None: # Maintains compatibility with the use of the $ variable
-                        eva_memory.var_dolar.append([var.get(), "<qrRead>"])
-                        gui.terminal.insert(INSERT, "\nSTATE: QR Code reading: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
-                        tab_load_mem_dollar()
-                        gui.terminal.see(tkinter.END)
-                        pop.destroy()
-                        unlock_thread_pop() # Reactivate the script processing thread
-                    else:
-                        var_name = node.attrib["var"]
-                        eva_memory.vars[var_name] = var.get()
-                        print("Eva ram => ", eva_memory.vars)
-                        gui.terminal.insert(INSERT, "\nSTATE: QR Code reading (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
-                        tab_load_mem_vars() # Enter data from variable memory into the var table
-                        gui.terminal.see(tkinter.END)
-                        print("qrRead command USING VAR...")
-                        pop.destroy()
-                        unlock_thread_pop() # Reactivate the script processing thread
-                
-                # Pop up window closing function for OK button
-                def fechar_pop_bt(): 
-                    print(var.get())
-                    if node.get("var") == None: # Maintains compatibility with the use of the $ variable
-                        eva_memory.var_dolar.append([var.get(), "<qrRead>"])
-                        gui.terminal.insert(INSERT, "\nSTATE: QR Code reading: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
-                        tab_load_mem_dollar()
-                        gui.terminal.see(tkinter.END)
-                        pop.destroy()
-                        unlock_thread_pop() # Reactivate the script processing thread
-                    else:
-                        var_name = node.attrib["var"]
-                        eva_memory.vars[var_name] = var.get()
-                        print("Eva ram => ", eva_memory.vars)
-                        gui.terminal.insert(INSERT, "\nSTATE: QR Code reading (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
-                        tab_load_mem_vars() # Enter data from variable memory into the var table
-                        gui.terminal.see(tkinter.END)
-                        print("qrRead command USING VAR...")
-                        pop.destroy()
-                        unlock_thread_pop() # Reactivate the script processing thread
-                    
-                # Window (GUI) creation
-                img_qr = PhotoImage(file = "images/img_qr.png")
-                var = StringVar()
-                pop = Toplevel(gui)
-                pop.title("qrRead Command")
-                # Disable the maximize and close buttons
-                pop.resizable(False, False)
-                pop.protocol("WM_DELETE_WINDOW", False)
-                w = 350
-                h = 200
-                ws = gui.winfo_screenwidth()
-                hs = gui.winfo_screenheight()
-                x = (ws/2) - (w/2)
-                y = (hs/2) - (h/2)  
-                pop.geometry('%dx%d+%d+%d' % (w, h, x, y))
-                label = Label(pop, text="Eva is reading a QR Code... \nPlease, enter the information contained in the QRCode!", font = ('Arial', 10))
-                label.pack(pady=20)
-                Label(pop, image=img_qr).place(x = 260, y = 110)
-                E1 = Entry(pop, textvariable = var, font = ('Arial', 10))
-                E1.bind("<Return>", fechar_pop_ret)
-                E1.pack()
-                Button(pop, text="    OK    ", font = font1, command=fechar_pop_bt).pack(pady=20)
-                # Wait for release, waiting for the user's response
-                while thread_pop_pause: 
-                    time.sleep(0.5)
-                ledAnimation("STOP")
-
-    elif node.tag == "userID":
-        if RUNNING_MODE == "EVA_ROBOT": 
-            EVA_ROBOT_STATE = "BUSY"
-            client.publish(topic_base + "/userID", " ")
-            ledAnimation("LISTEN")
-            
-
-            while (EVA_ROBOT_STATE != "FREE"):
-                pass
-        
-            if node.get("var") == None: # Maintains compatibility with the use of the $ variable
-                eva_memory.var_dolar.append([EVA_DOLLAR, "<userID>"])
-                gui.terminal.insert(INSERT, "\nSTATE: userID: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
-                tab_load_mem_dollar()
-                gui.terminal.see(tkinter.END)
- 
-            else:
-                var_name = node.attrib["var"]
-                eva_memory.vars[var_name] = EVA_DOLLAR
-                print("Eva ram => ", eva_memory.vars)
-                gui.terminal.insert(INSERT, "\nSTATE: userID (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
-                tab_load_mem_vars() # Enter data from variable memory into the var table
-                gui.terminal.see(tkinter.END)
-                print("userID command USING VAR...")
+                    print("userID command USING VAR...")
+                    pop.destroy()
+                    unlock_thread_pop() # Reactivate the script processing thread
             
-            ledAnimation("STOP")
-
-        else:
-
-            lock_thread_pop()
-            ledAnimation("LISTEN")
-            if gui.chk_userid_value.get() == 1:
-
-                result_recognition = fr.main()
-
-                var = StringVar(value=result_recognition)
-
-                if node.get("var") == None: # mantém a compatibilidade com o uso da variável $
+            # Pop up window closing function for OK button
+            def fechar_pop_bt(): 
+                print(var.get())
+                if node.get("var") == None: # Maintains compatibility with the use of the $ variable
                     eva_memory.var_dolar.append([var.get(), "<userID>"])
-                    gui.terminal.insert(INSERT, "\nSTATE: userID : var=$" + ", value=" + eva_memory.var_dolar[-1][0])
+                    gui.terminal.insert(INSERT, "\nSTATE: userID: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
                     tab_load_mem_dollar()
                     gui.terminal.see(tkinter.END)
-                
+                    pop.destroy()
+                    unlock_thread_pop() # Reactivate the script processing thread
                 else:
                     var_name = node.attrib["var"]
                     eva_memory.vars[var_name] = var.get()
                     print("Eva ram => ", eva_memory.vars)
-                    gui.terminal.insert(INSERT, "\nSTATE: userID : (using the user variable '" + var_name + "'): " + EVA_DOLLAR)
-                    tab_load_mem_vars() # entra com os dados da memoria de variaveis na tabela de vars
+                    gui.terminal.insert(INSERT, "\nSTATE: userID (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
+                    tab_load_mem_vars() # Enter data from variable memory into the var table
                     gui.terminal.see(tkinter.END)
-
-            elif gui.chk_userid_value.get() == 0:
-            # Pop up window closing function for the <return> key
-                def fechar_pop_ret(self): 
-                    print(var.get())
-                    if node.get("var") == None: # mantém a compatibilidade com o uso da variável $
-                        eva_memory.var_dolar.append([var.get(), "<userID>"])
-                        gui.terminal.insert(INSERT, "\nSTATE: userID: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
-                        tab_load_mem_dollar()
-                        gui.terminal.see(tkinter.END)
-                        pop.destroy()
-                        unlock_thread_pop() # Reactivate the script processing thread
-                    else:
-                        var_name = node.attrib["var"]
-                        eva_memory.vars[var_name] = var.get()
-                        print("Eva ram => ", eva_memory.vars)
-                        gui.terminal.insert(INSERT, "\nSTATE: userID reading (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
-                        tab_load_mem_vars() # Enter data from variable memory into the var table
-                        gui.terminal.see(tkinter.END)
-                        print("userID command USING VAR...")
-                        pop.destroy()
-                        unlock_thread_pop() # Reactivate the script processing thread
+                    print("userID command USING VAR...")
+                    pop.destroy()
+                    unlock_thread_pop() # Reactivate the script processing thread
                 
-                # Pop up window closing function for OK button
-                def fechar_pop_bt(): 
-                    print(var.get())
-                    if node.get("var") == None: # Maintains compatibility with the use of the $ variable
-                        eva_memory.var_dolar.append([var.get(), "<userID>"])
-                        gui.terminal.insert(INSERT, "\nSTATE: userID: var = $" + ", value = " + eva_memory.var_dolar[-1][0])
-                        tab_load_mem_dollar()
-                        gui.terminal.see(tkinter.END)
-                        pop.destroy()
-                        unlock_thread_pop() # Reactivate the script processing thread
-                    else:
-                        var_name = node.attrib["var"]
-                        eva_memory.vars[var_name] = var.get()
-                        print("Eva ram => ", eva_memory.vars)
-                        gui.terminal.insert(INSERT, "\nSTATE: userID (using the user variable '" + var_name + "'): " + str(eva_memory.vars[var_name]))
-                        tab_load_mem_vars() # Enter data from variable memory into the var table
-                        gui.terminal.see(tkinter.END)
-                        print("userID command USING VAR...")
-                        pop.destroy()
-                        unlock_thread_pop() # Reactivate the script processing thread
-                    
-                # Window (GUI) creation
-                img_userID = PhotoImage(file = "images/img_userID.png")
-                var = StringVar()
-                pop = Toplevel(gui)
-                pop.title("userID Command")
-                # Disable the maximize and close buttons
-                pop.resizable(False, False)
-                pop.protocol("WM_DELETE_WINDOW", False)
-                w = 350
-                h = 200
-                ws = gui.winfo_screenwidth()
-                hs = gui.winfo_screenheight()
-                x = (ws/2) - (w/2)
-                y = (hs/2) - (h/2)  
-                pop.geometry('%dx%d+%d+%d' % (w, h, x, y))
-                label = Label(pop, text="Eva is recognizing a face... \nPlease, enter the user name!", font = ('Arial', 10))
-                label.pack(pady=20)
-                Label(pop, image=img_userID).place(x = 260, y = 110)
-                E1 = Entry(pop, textvariable = var, font = ('Arial', 10))
-                E1.bind("<Return>", fechar_pop_ret)
-                E1.pack()
-                Button(pop, text="    OK    ", font = font1, command=fechar_pop_bt).pack(pady=20)
-                # Wait for release, waiting for the user's response
-                while thread_pop_pause: 
-                    time.sleep(0.5)
-                ledAnimation("STOP")
+            # Window (GUI) creation
+            img_userID = PhotoImage(file = "images/img_userID.png")
+            var = StringVar()
+            pop = Toplevel(gui)
+            pop.title("userID Command")
+            # Disable the maximize and close buttons
+            pop.resizable(False, False)
+            pop.protocol("WM_DELETE_WINDOW", False)
+            w = 350
+            h = 200
+            ws = gui.winfo_screenwidth()
+            hs = gui.winfo_screenheight()
+            x = (ws/2) - (w/2)
+            y = (hs/2) - (h/2)  
+            pop.geometry('%dx%d+%d+%d' % (w, h, x, y))
+            label = Label(pop, text="Eva is recognizing a face... \nPlease, enter the user name!", font = ('Arial', 10))
+            label.pack(pady=20)
+            Label(pop, image=img_userID).place(x = 260, y = 110)
+            E1 = Entry(pop, textvariable = var, font = ('Arial', 10))
+            E1.bind("<Return>", fechar_pop_ret)
+            E1.pack()
+            Button(pop, text="    OK    ", font = font1, command=fechar_pop_bt).pack(pady=20)
+            # Wait for release, waiting for the user's response
+            while thread_pop_pause: 
+                time.sleep(0.5)
+            ledAnimation("STOP")
 
 
-def busca_commando(key : str): # The keys are strings
-	# Search in settings. This is because "voice" is in settings and voice is always the first element
-	for elem in root.find("settings").iter():
-		if elem.get("key") != None: # Check if node has key attribute
-			if elem.attrib["key"] == key:
-				return elem
-	# Search within the script
-	for elem in root.find("script").iter(): # Go through all nodes in the script
-		if elem.get("key") != None: # Check if node has key attribute
-			if elem.attrib["key"] == key:
-				return elem
+# Dispatches the instruction to the handler of its command
+def exec_comando(instr):
+    instr.handler(instr.node, instr.args)
 
 
-# Search and insert links in the list that have "att_from" equal to the "from" attribute of the link
-def busca_links(att_from):
-    achou_link = False
-    for i in range(len(links_node)):
-        if att_from == links_node[i].attrib["from"]:
-            fila_links.append(links_node[i])
-            achou_link = True
-    return achou_link
+# Lowers the loaded script into the instruction array, once, so that each step of the VM does not parse the script again
+# binary is the precompiled program (eva_program), or None for a XML script
+def load_program(binary = None):
+    global program, key_index
+    try:
+        if binary != None:
+            program, key_index, warnings = eva_vm.lower_program(binary)
+        else:
+            program, key_index, warnings = eva_vm.lower(root)
+    except eva_vm.LoadError as e:
+        gui.terminal.insert(INSERT, "\nError -> " + str(e) + " Please, check your code.", "error")
+        gui.terminal.see(tkinter.END)
+        exit(1)
+    for warning in warnings: # Ex.: a variable used in a <talk> that is never defined
+        gui.terminal.insert(INSERT, "\n" + warning, "error")
+    gui.terminal.see(tkinter.END)
+
+
+# Insert in the queue the links of the instruction (index) "from_index"
+def busca_links(from_index):
+    links = program[from_index].links
+    if len(links) == 0:
+        return False
+    fila_links.extend(links)
+    return True
 
 
 # Execute commands in the link stack
@@ -1823,36 +1709,46 @@ def link_process(anterior = -1):
 
     global fila_links
     while (len(fila_links) != 0) and (play == True):
-        from_key = fila_links[0].attrib["from"] # Key of the command to execute
-        to_key = fila_links[0].attrib["to"] # Key of next command
-        print("from:", from_key, ", to_key:", to_key)
-        comando_from = busca_commando(from_key).tag # Tag of the command to be executed
+        from_index, to_index = fila_links[0] # Command to execute and next command
+        instr = program[from_index]
+        print("from:", instr.key, ", to_key:", program[to_index].key)
 
         # Prevents the same node from running consecutively. This happens with the node that precedes the "cases"
-        if anterior != from_key:
-            exec_comando(busca_commando(from_key))
-            anterior = from_key
-            print("ant: ", anterior, ", from: ", from_key)
+        if anterior != from_index:
+            jump = instr.jump
+            if jump != None and len(fila_links) >= jump.size and fila_links[jump.size - 1][0] == jump.cases[-1]: # The cases of the switch are in the queue
+                case_index = exec_switch_jump(jump)
+                if case_index == None: # No case is true and there is no default. The links of the cases are removed
+                    del fila_links[:jump.size]
+                    anterior = jump.cases[-1]
+                    continue
+                # Proceeds with the case that is true, as if the cases before it had been tested and removed from the queue
+                instr = program[case_index]
+                from_index, to_index = instr.links[0]
+            else:
+                exec_comando(instr)
+            anterior = from_index
+            print("ant: ", instr.key, ", from: ", instr.key)
         
         
-        if (comando_from == "case") or (comando_from == "default"): # If the command executed was a case or a default
+        if instr.branch: # If the command executed was a case or a default
             if eva_memory.reg_case == 1: # Check the flag to see if the "case" was true
                 fila_links = [] # Empty the queue, as the flow will continue from this "case" onwards
-                print("Jumping the command = ", comando_from)
+                print("Jumping the command = ", instr.op)
                 # Follows the flow of the success "case" looking for the "prox. link"
-                if not(busca_links(to_key)): # If there is no longer a link, the command indicated by "to_key" is the last one in the flow
-                    exec_comando(busca_commando(to_key))
+                if not(busca_links(to_index)): # If there is no longer a link, the command indicated by "to_index" is the last one in the flow
+                    exec_comando(program[to_index])
                     print("End of block.")
                     
             else:
-                print("The element:", comando_from, " will be removed from queue.")
+                print("The element:", instr.op, " will be removed from queue.")
                 fila_links.pop(0) # If the "case" failed, it is removed from the queue and consequently its flow is discarded
                 print("false")
         else: # If the command was not a "case"
-            print("The element:", comando_from, " will be removed from queue.")
+            print("The element:", instr.op, " will be removed from queue.")
             fila_links.pop(0) # Remove the link from the queue
-            if not(busca_links(to_key)): # As previously mentioned
-                exec_comando(busca_commando(to_key))
+            if not(busca_links(to_index)): # As previously mentioned
+                exec_comando(program[to_index])
                 print("End of block.")
     gui.terminal.insert(INSERT, "\nSTATE: End of script.")
     gui.terminal.see(tkinter.END)
@@ -0,0 +1,462 @@
+# Instruction array of the EvaSIM virtual machine
+# When a script is loaded, its commands (settings and script, in document order) are lowered once into a list of
+# instructions. Each instruction has the opcode (the tag of the command), the operands already decoded (no attribute
+# string is parsed again during the execution), the handler that executes it and its links, as pairs of integer
+# indexes (from, to) into the instruction list.
+#
+# The handlers are registered in a dispatch table (opcode -> handler). A new command is added by registering its
+# handler with @command(tag) and, if its operands must be decoded at load time, a decoder with @decoder(tag).
+# A handler receives the node of the command and the operands returned by its decoder (None if there is no decoder).
+# A decoder receives the node and the <settings> element of the script.
+#
+# Use (eva_sim.py):
+#     @eva_vm.command("wait")
+#     def exec_wait(node, args):
+#         duration, seconds = args
+#         ...
+#     program, key_index, warnings = eva_vm.lower(root)
+#     program, key_index, warnings = eva_vm.lower_program(eva_program.load("script_EvaML.evab")) # precompiled program
+#
+# The cases are compiled into predicates (closures that read the robot memory). A <switch> whose cases are all "exact"
+# comparisons with the same variable is also compiled into a hash table (SwitchJump): the VM goes straight to the case
+# that matches (or to the default), without testing the cases one by one.
+# The text of each <talk> is compiled into a template (TalkTemplate), with the alternatives (/) already split.
+
+import operator
+import re
+
+import eva_memory
+
+HANDLERS = {} # opcode -> handler(node, args)
+DECODERS = {} # opcode -> decoder(node, settings). Returns the operands of the instruction
+
+BRANCH_OPCODES = ("case", "default") # after these commands, the VM checks the case register (eva_memory.reg_case)
+
+
+class LoadError(Exception):
+    pass
+
+# Error found while executing a command (ex.: a variable that has not been declared)
+# If fatal is False, the VM reports the error and continues (the case is false)
+class ScriptError(Exception):
+    def __init__(self, message, fatal = True):
+        super().__init__(message)
+        self.fatal = fatal
+
+
+class Instruction:
+    __slots__ = ("op", "key", "node", "args", "handler", "branch", "links", "jump")
+
+    def __init__(self, node, key, args):
+        self.op = node.tag # opcode
+        self.key = key
+        self.node = node
+        self.args = args # decoded operands
+        self.handler = HANDLERS.get(node.tag, nop) # resolved here, so the dispatch does not look up the table
+        self.branch = node.tag in BRANCH_OPCODES
+        self.links = [] # (from, to) indexes of the outgoing links, in the order of the <links> section
+        self.jump = None # SwitchJump, in the first case of a <switch> compiled into a hash table
+
+
+# Registers the handler of the command tag (decorator)
+def command(tag):
+    def register(handler):
+        HANDLERS[tag] = handler
+        return handler
+    return register
+
+# Registers the decoder of the operands of the command tag (decorator)
+def decoder(tag):
+    def register(decode_operands):
+        DECODERS[tag] = decode_operands
+        return decode_operands
+    return register
+
+# Handler of the commands without a registered handler. The VM ignores them (as the old if/elif chain did)
+def nop(node, args):
+    pass
+
+
+def decode(node, settings):
+    decode_operands = DECODERS.get(node.tag)
+    if decode_operands == None:
+        return None
+    try:
+        return decode_operands(node, settings)
+    except (KeyError, ValueError) as e:
+        raise LoadError("The element <" + node.tag + "> (key = " + str(node.get("key")) + ") has a missing or invalid attribute: " + str(e))
+
+# Lowers the script (EvaML root of the XML) into the instruction list. A precompiled program uses lower_program()
+# Returns the list, the key -> instruction index map and the warnings found in the script. Settings come first, because
+# the <voice> is the first command of the script, and the first node with a key wins
+def lower(root):
+    settings = root.find("settings")
+    program = []
+    key_index = {}
+    for section in (settings, root.find("script")):
+        for node in section.iter():
+            key = node.get("key")
+            if key != None and key not in key_index:
+                key_index[key] = len(program)
+                program.append(Instruction(node, key, decode(node, settings)))
+
+    for link in root.find("links"):
+        from_index = key_index.get(link.attrib["from"])
+        to_index = key_index.get(link.attrib["to"])
+        if from_index == None or to_index == None:
+            raise LoadError("The link from " + link.attrib["from"] + " to " + link.attrib["to"] + " references an element that does not exist.")
+        program[from_index].links.append((from_index, to_index))
+    compile_switches(program)
+    return program, key_index, check_talk_variables(program)
+
+# Lowers a precompiled binary program (eva_program.Program) straight from its tables, with the same result as lower()
+# on the XML. Only the commands with a key get a node (their attributes are read by the handlers), and the links come
+# from the successor table, already resolved (instruction indexes). No tree and no <links> section are built
+def lower_program(binary):
+    settings = binary.root.find("settings")
+    program = []
+    key_index = {}
+    instr_index = {} # index in the instruction table -> index in the program
+    for index, key, node in binary.commands(): # the elements without a key (script, switch, stop, goto, ...) are skipped
+        key = str(key)
+        if key not in key_index: # the first node with a key wins (as in lower())
+            key_index[key] = len(program)
+            program.append(Instruction(node, key, decode(node, settings)))
+        instr_index[index] = key_index[key]
+
+    succ = binary.succ
+    for index, instr in enumerate(binary.instrs):
+        succ_start, succ_count = instr[6], instr[7]
+        if succ_count == 0:
+            continue
+        from_index = instr_index.get(index)
+        links = program[from_index].links if from_index != None else None
+        for to in succ[succ_start:succ_start + succ_count]:
+            to_index = instr_index.get(to)
+            if from_index == None or to_index == None:
+                raise LoadError("The link from the instruction " + str(index) + " to " + str(to) + " references an element that does not exist.")
+            links.append((from_index, to_index))
+    compile_switches(program)
+    return program, key_index, check_talk_variables(program)
+
+
+###############################################################################
+# Operand decoders                                                            #
+###############################################################################
+@decoder("light")
+def decode_light(node, settings):
+    light_effects = settings.find("lightEffects")
+    effects_off = light_effects != None and light_effects.attrib["mode"] == "OFF"
+    state = node.attrib["state"]
+    # If the state is off, the light may not have a color attribute defined
+    if state == "OFF":
+        color = "BLACK"
+        if effects_off:
+            message_state = "\nSTATE: Light Effects DISABLED."
+        else:
+            message_state = "\nSTATE: Turnning off the light."
+    else:
+        color = node.attrib["color"]
+        if effects_off:
+            message_state = "\nSTATE: Light Effects DISABLED."
+            state = "OFF"
+        else:
+            message_state = "\nSTATE: Turnning on the light. Color = " + color + "."
+    return color, state, message_state
+
+@decoder("wait")
+def decode_wait(node, settings):
+    duration = node.attrib["duration"]
+    return duration, int(duration) / 1000 # the duration (ms) and the time to sleep (s)
+
+@decoder("random")
+def decode_random(node, settings):
+    min = node.attrib["min"]
+    max = node.attrib["max"]
+    return min, max, int(min), int(max)
+
+@decoder("audio")
+def decode_audio(node, settings):
+    sound_file = node.attrib["source"]
+    block = node.attrib["block"] == "TRUE" # Audio play does not block script execution, unless block = "TRUE"
+    message_audio = '\nSTATE: Playing a sound: "' + "audio_files/" + sound_file + ".wav" + '", block=' + str(block)
+    # Mode off of the Audio Effects implies the use of MUTED-SOUND file
+    audio_effects = settings.find("audioEffects")
+    if audio_effects != None and audio_effects.attrib["mode"] == "OFF":
+        sound_file = "my_sounds/MUTED-SOUND.wav"
+        message_audio = "\nSTATE: Audio Effects DISABLED."
+    return sound_file, block, message_audio
+
+# The var is read with get(): the compiler does not copy the var of the <switch> to the cases that are never reached
+@decoder("case")
+def decode_case(node, settings):
+    return compile_case(node.attrib["op"], node.get("var"), node.attrib["value"].lower()) # Comparisons are not case sensitive
+
+COUNTER_OPS = {"+": operator.add, "*": operator.mul, "/": operator.floordiv, "%": operator.mod} # / is the integer division
+
+@decoder("counter")
+def decode_counter(node, settings):
+    op = node.attrib["op"]
+    return node.attrib["var"], int(node.attrib["value"]), op, COUNTER_OPS.get(op)
+
+
+###############################################################################
+# Cases and switches                                                          #
+###############################################################################
+DOLLAR_EMPTY = "Error -> The variable $ has no value. Please, check your code."
+
+def dollar():
+    if len(eva_memory.var_dolar) == 0:
+        raise ScriptError(DOLLAR_EMPTY)
+    return eva_memory.var_dolar[-1][0]
+
+def user_var(var):
+    if var not in eva_memory.vars:
+        raise ScriptError("Error -> The variable " + str(var) + " has not been declared. Please, check your code.")
+    return eva_memory.vars[var]
+
+# Returns the predicate (function without arguments, returns True or False) of the case
+# value is already in lower case. The comparisons are not case sensitive
+def compile_case(op, var, value):
+    # Case 1 (op = "exact"). Exact is always a comparison of STRINGS
+    if op == "exact":
+        if var == "$": # Compare value with the top of the stack of the var_dollar variable
+            return lambda: value == dollar().lower()
+        # Case in which a user variable was defined for a command: QRcode, random, userEmotion or userId
+        if value[:1] == "#": # The # of the reference is removed (the name is compared)
+            value = value[1:]
+        return lambda: value == str(user_var(var)).lower()
+
+    # Case 2 (op = "contain")
+    if op == "contain":
+        if var[:1] == "$": # Checks if the string in value is contained in $
+            return lambda: value in dollar().lower()
+        missing = "Error -> The variable '" + str(var) + "' does no exist. Please, check your code."
+        if value[:1] == "#": # The string in the variable value is contained in the variable var
+            name = value[1:]
+            def contain_var():
+                if var not in eva_memory.vars:
+                    raise ScriptError(missing, fatal = False)
+                return str(user_var(name)).lower() in str(eva_memory.vars[var]).lower()
+            return contain_var
+        def contain():
+            if var not in eva_memory.vars:
+                raise ScriptError(missing, fatal = False)
+            return value in eva_memory.vars[var]
+        return contain
+
+    # Case 3 (MATHEMATICAL COMPARISON): ==, <, >, <=, >= and != to compare the operands var and value
+    # The message of the undeclared variable uses the value of the case (as in the previous versions of EvaSIM)
+    undeclared = "Error -> The variable #" + value[1:] + " has not been declared. Please, check your code."
+    op1 = compile_operand(var, undeclared)
+    op2 = compile_operand(value, undeclared)
+    compare = COMPARISON_OPS.get(op)
+    if compare == None: # Unknown operator. The operands are read, but the case is always false
+        def unknown():
+            op1()
+            op2()
+            return False
+        return unknown
+    return lambda: compare(op1(), op2())
+
+COMPARISON_OPS = {"eq": operator.eq, "lt": operator.lt, "gt": operator.gt, "lte": operator.le, "gte": operator.ge, "ne": operator.ne}
+
+# Returns the function that obtains an operand from $, n, #n, or var (a variable of this type var = "x" in <switch>)
+def compile_operand(st_var_value, undeclared):
+    if st_var_value == None: # A case that is never reached (without var)
+        st_var_value = ""
+    if st_var_value.isnumeric(): # Is a constant?
+        if st_var_value.isdecimal():
+            constant = int(st_var_value)
+            return lambda: constant
+        return lambda: int(st_var_value)
+    if st_var_value == "$": # Returns the value of $ converted to int
+        return lambda: int(dollar())
+    name = st_var_value[1:] if "#" in st_var_value else st_var_value # Is a variable of type #n?
+    def variable():
+        if name not in eva_memory.vars:
+            raise ScriptError(undeclared)
+        return int(eva_memory.vars[name])
+    return variable
+
+
+# <switch> compiled into a hash table. It is used when all the cases of the switch are "exact" comparisons with the same
+# variable. select() returns the index of the instruction of the first case that matches, of the default (if there is
+# one) or None. cases has the indexes of all the cases (and of the default) of the switch, in order, and size is the
+# number of links of the cases (the links that the cases have in the queue of the VM)
+class SwitchJump:
+    __slots__ = ("var", "table", "default", "cases", "size")
+
+    def __init__(self, var, table, default, cases):
+        self.var = var
+        self.table = table
+        self.default = default
+        self.cases = cases
+        self.size = 0
+
+    def select(self):
+        if self.var == "$":
+            key = dollar().lower()
+        else:
+            key = str(user_var(self.var)).lower()
+        return self.table.get(key, self.default)
+
+# The VM enqueues the cases of a switch when it executes the command that precedes the switch (one link for each case).
+# The cases are then tested in order, and the first case that is true empties the queue. The switch is compiled into a
+# SwitchJump when the cases are always enqueued together and in order: every instruction linked to the cases links to
+# all of them (and only to them) and is not a case. When a case is true, the VM follows its first link
+def compile_switches(program):
+    incoming = {} # index of a case/default -> targets of the instructions linked to it
+    for instr in program:
+        targets = tuple(to_index for from_index, to_index in instr.links)
+        for to_index in targets:
+            if program[to_index].branch:
+                incoming.setdefault(to_index, set()).add(targets if not instr.branch else None) # None: linked from a case
+
+    for case_index, targets_set in incoming.items():
+        if len(targets_set) != 1:
+            continue
+        targets = next(iter(targets_set))
+        if targets == None or targets[0] != case_index or len(set(targets)) != len(targets):
+            continue
+        jump = switch_jump(program, targets, incoming)
+        if jump != None:
+            program[case_index].jump = jump
+
+def switch_jump(program, targets, incoming):
+    var = None
+    table = {}
+    default = None
+    size = 0
+    for index in targets:
+        instr = program[index]
+        if not instr.branch or len(instr.links) == 0 or incoming.get(index) != {targets}:
+            return None
+        size += len(instr.links)
+        if default != None: # Cases after the default are never tested
+            continue
+        if instr.op == "default":
+            default = index
+            continue
+        node = instr.node
+        if node.get("op") != "exact" or node.get("var") == None or (var != None and node.get("var") != var):
+            return None
+        var = node.get("var")
+        value = node.get("value", "").lower()
+        if var != "$" and value[:1] == "#":
+            value = value[1:]
+        table.setdefault(value, index) # The first case wins
+    if var == None:
+        return None
+    jump = SwitchJump(var, table, default, targets)
+    jump.size = size
+    return jump
+
+
+###############################################################################
+# Talk templates                                                              #
+###############################################################################
+TALK_REFERENCE = re.compile(r'\#[a-zA-Z]+[0-9]*|\$[-0-9]*') # #var, $, $n and $-n
+
+# Text of a <talk> compiled into a template. Each alternative (the text is split by the character /) is a string (if it
+# has no references) or a list of strings (the literal parts) and functions (the references to the memory).
+# render() joins the parts of one alternative
+class TalkTemplate:
+    __slots__ = ("alternatives", "var_names", "dollar_refs", "has_hash", "has_dollar", "tone")
+
+    def __init__(self, text, tone):
+        self.var_names = [] # #var references, in the order of the text (each name once)
+        self.dollar_refs = [] # ($n or $-n, index in var_dolar or None, if the reference is not valid)
+        self.has_hash = "#" in text
+        self.has_dollar = "$" in text
+        self.tone = tone # voice of the talk (or the voice of the script)
+        self.alternatives = [self.compile(alternative) for alternative in text.split("/")]
+
+    def compile(self, text):
+        parts = []
+        start = 0
+        for match in TALK_REFERENCE.finditer(text):
+            if match.start() > start:
+                parts.append(text[start:match.start()])
+            parts.append(self.reference(match.group()))
+            start = match.end()
+        if start == 0:
+            return text
+        if start < len(text):
+            parts.append(text[start:])
+        return parts
+
+    def reference(self, token):
+        if token[0] == "#":
+            name = token[1:]
+            if name not in self.var_names:
+                self.var_names.append(name)
+            return lambda: str(eva_memory.vars[name])
+        if len(token) == 1: # Is the dollar ($)
+            return lambda: eva_memory.var_dolar[-1][0]
+        try:
+            if "-" in token: # $-n type
+                index = -(int(token[2:]) + 1)
+            else: # $n type
+                index = int(token[1:]) - 1
+        except ValueError:
+            index = None
+        self.dollar_refs.append((token, index))
+        return lambda: eva_memory.var_dolar[index][0]
+
+    # Checks the memory before the text is spoken (the same checks for all the alternatives)
+    def check(self):
+        if self.has_hash:
+            if eva_memory.vars == {}: # Checks if the robot's memory (vars) is empty
+                raise ScriptError("Error -> No variables have been defined. Please, check your code.")
+            for name in self.var_names:
+                if name not in eva_memory.vars:
+                    raise ScriptError("Error -> The variable #" + name + " has not been declared. Please, check your code.")
+        if self.has_dollar:
+            size = len(eva_memory.var_dolar)
+            if size == 0:
+                raise ScriptError("Error-> The variable $ has no value. Please, check your code.")
+            for token, index in self.dollar_refs:
+                if index == None:
+                    raise ScriptError("Error -> The reference " + token + " is not valid. Please, check your code.")
+                if index >= size or index < -size:
+                    raise ScriptError("Error -> The variable " + token + " has no value. Please, check your code.")
+
+    def render(self, index):
+        alternative = self.alternatives[index]
+        if alternative.__class__ is str:
+            return alternative
+        return "".join([part if part.__class__ is str else part() for part in alternative])
+
+# Returns None if the <talk> has no text
+@decoder("talk")
+def decode_talk(node, settings):
+    if node.text == None:
+        return None
+    tone = node.get("tone")
+    if tone == None: # The user did not select the voice in the talk. The voice of the script is used
+        tone = settings[0].get("tone")
+    return TalkTemplate(node.text, tone)
+
+# Commands that store a value in a variable (in $, if the command has no var attribute)
+VAR_COMMANDS = ("counter", "random", "listen", "textEmotion", "userHandPose", "userEmotion", "qrRead", "userID")
+
+# Variables used in the <talk> commands that are never defined in the script
+def check_talk_variables(program):
+    defined = set()
+    sets_dollar = False
+    for instr in program:
+        if instr.op in VAR_COMMANDS:
+            if instr.node.get("var") != None:
+                defined.add(instr.node.get("var"))
+            elif instr.op != "counter":
+                sets_dollar = True
+    warnings = []
+    for instr in program:
+        if instr.op == "talk" and instr.args != None:
+            for name in instr.args.var_names:
+                if name not in defined:
+                    warnings.append("WARNING -> The variable #" + name + " used in the <talk> (key = " + instr.key + ") is never defined in the script.")
+            if instr.args.has_dollar and not sets_dollar:
+                warnings.append("WARNING -> The <talk> (key = " + instr.key + ") uses $, but no command of the script stores a value in $.")
+    return warnings
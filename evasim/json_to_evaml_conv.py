@@ -1,5 +1,10 @@
 import json
-import xml.etree.ElementTree as ET
+import os
+import sys
+
+# XML layer of the compiler (eva_xml.py, in the parent directory): lxml when it is installed, otherwise ElementTree
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import eva_xml
 import re
 from pprint import pprint
 
@@ -20,9 +25,9 @@ def converte(json_file_name, tkinter):
 
   # Creates the root element <evaml> and its subelements.
   evaml_atributos = {"name":json_object["nombre"]}
-  evaml = ET.Element("evaml", evaml_atributos )
+  evaml = eva_xml.Element("evaml", evaml_atributos )
   #
-  settings = ET.SubElement(evaml, "settings")
+  settings = eva_xml.SubElement(evaml, "settings")
   # Add the settings sub-elements with their attributes.
   for comando in comandos_json:
     voice_found = False # 
@@ -30,7 +35,7 @@ def converte(json_file_name, tkinter):
       voice_atributos = {"tone":comando["voice"], "key":str(comando["key"])}
       comandos_json.remove(comando) # Exclude voice so that it is not processed in the next step.
       voice_found = True
-      voice = ET.SubElement(settings, "voice", voice_atributos)
+      voice = eva_xml.SubElement(settings, "voice", voice_atributos)
       break
   
     if not voice_found: # Voice must exist in JSON and must be the first element of the VPL.
@@ -41,14 +46,14 @@ def converte(json_file_name, tkinter):
 
   # These elements have their default values ​​as they have not yet been implemented in the robot.
   lightEffects_atributos = {"mode":"on"}
-  lightEffects = ET.SubElement(settings, "lightEffects", lightEffects_atributos)
+  lightEffects = eva_xml.SubElement(settings, "lightEffects", lightEffects_atributos)
 
   audioEffects_atributos = {"mode":"on",  "vol":"100%"}
-  audioEffects = ET.SubElement(settings, "audioEffects", audioEffects_atributos)
+  audioEffects = eva_xml.SubElement(settings, "audioEffects", audioEffects_atributos)
 
   # Create the other sections of the EvaML document.
-  script = ET.SubElement(evaml, "script")
-  links = ET.SubElement(evaml, "links")
+  script = eva_xml.SubElement(evaml, "script")
+  links = eva_xml.SubElement(evaml, "links")
 
   # Call processing functions
   processa_nodes(script, comandos_json, tkinter) # Convert json nodes to XML nodes.
@@ -62,7 +67,7 @@ def processa_nodes(script, comandos_json, tkinter):
     # <light>
     if comando["type"] == "light":
       light_atributos = {"key" : str(comando["key"]), "state" : comando["state"].upper(), "color" : comando["lcolor"].upper()}
-      ET.SubElement(script, "light", light_atributos)
+      eva_xml.SubElement(script, "light", light_atributos)
   
 
     # <motion>
@@ -83,13 +88,13 @@ def processa_nodes(script, comandos_json, tkinter):
 
 
       motion_atributo = {"key" : str(comando["key"]), "type" : motion_type}
-      ET.SubElement(script, "motion", motion_atributo)
+      eva_xml.SubElement(script, "motion", motion_atributo)
 
 
     # <audio>
     elif comando["type"] == "sound":
       audio_atributos = {"key" : str(comando["key"]), "source" : comando["src"], "block" : str(comando["wait"]).upper()}
-      ET.SubElement(script, "audio", audio_atributos)
+      eva_xml.SubElement(script, "audio", audio_atributos)
 
 
     # <evaEmotion>
@@ -101,7 +106,7 @@ def processa_nodes(script, comandos_json, tkinter):
       else: eva_emotion = "SAD"
 
       eva_emotion_atributos = {"key" : str(comando["key"]), "emotion" :eva_emotion}
-      ET.SubElement(script, "evaEmotion", eva_emotion_atributos)
+      eva_xml.SubElement(script, "evaEmotion", eva_emotion_atributos)
 
     # <leds>
     elif comando["type"] == "led":
@@ -115,38 +120,38 @@ def processa_nodes(script, comandos_json, tkinter):
       elif (comando["anim"] == "surprise"): animatiom = "SURPRISE"
 
       led_atributos = {"key" : str(comando["key"]), "animation" :animatiom}
-      ET.SubElement(script, "led", led_atributos)
+      eva_xml.SubElement(script, "led", led_atributos)
 
 
     # <wait>
     elif comando["type"] == "wait":
       wait_atributos = {"key" : str(comando["key"]), "duration" : str(comando["time"])}
-      ET.SubElement(script, "wait", wait_atributos)
+      eva_xml.SubElement(script, "wait", wait_atributos)
 
     
     # <listen>
     elif comando["type"] == "listen":
       listen_atributos = {"key" : str(comando["key"])}
-      ET.SubElement(script, "listen", listen_atributos)
+      eva_xml.SubElement(script, "listen", listen_atributos)
 
     
     # <random>
     elif comando["type"] == "random":
       random_atributos = {"key" : str(comando["key"]), "min" : str(comando["min"]), "max" : str(comando["max"])}
-      ET.SubElement(script, "random", random_atributos)
+      eva_xml.SubElement(script, "random", random_atributos)
 
 
     # <talk>
     elif comando["type"] == "speak":
       speak_atributos = {"key" : str(comando["key"])}
-      talk = ET.SubElement(script, "talk", speak_atributos)
+      talk = eva_xml.SubElement(script, "talk", speak_atributos)
       talk.text = comando["text"]
 
 
     # <userEmotion>
     elif comando["type"] == "user_emotion":
       user_emotion_atributos = {"key" : str(comando["key"])}
-      ET.SubElement(script, "userEmotion", user_emotion_atributos)
+      eva_xml.SubElement(script, "userEmotion", user_emotion_atributos)
 
 
     # <counter>
@@ -159,7 +164,7 @@ def processa_nodes(script, comandos_json, tkinter):
       elif (comando["ops"] == "div"): op = "/"
 
       counter_atributos = {"key" : str(comando["key"]), "var" : comando["count"], "op" : op , "value" : str(comando["value"])}
-      ET.SubElement(script, "counter", counter_atributos)
+      eva_xml.SubElement(script, "counter", counter_atributos)
 
 
 
@@ -223,7 +228,7 @@ def processa_nodes(script, comandos_json, tkinter):
             var = var[0][1:] # We get the variable without the #.
             value = var[1] # A var in value must go with the character #.
       if_atributos = {"key" : str(comando["key"]), "op" : op, "value" : value, "var" : var}
-      ET.SubElement(script, tag , if_atributos)
+      eva_xml.SubElement(script, tag , if_atributos)
 
     # All supported commands have been tested.
     else:
@@ -257,10 +262,10 @@ The EvaSIM will be closed..."""
 def processa_links(links, links_json):
   for link in links_json:
     link_atributos = {"from" : str(link["from"]), "to" : str(link["to"])}
-    ET.SubElement(links, "link", link_atributos)
+    eva_xml.SubElement(links, "link", link_atributos)
 
   # Generate the XML file on disk.
-  xml_processed = ET.tostring(evaml, encoding="unicode")
+  xml_processed = eva_xml.tostring(evaml, encoding="unicode")
   print("Processando XML..............")
   with open("_json_to_evaml_converted.xml", "w") as text_file: # Writes the processed xml (temporary) to a file to be imported by the parser.
       text_file.write(xml_processed)
@@ -0,0 +1,161 @@
+"""
+O validador gerado (eva_schema_validator, usado pelo eva_validator) deve aceitar e rejeitar os mesmos documentos que o
+xmlschema (a referencia). Os documentos sao os scripts do repositorio, scripts sinteticos (eva_bench) e mutacoes
+invalidas (ou nao) de cada um deles.
+
+Uso (na raiz do repositorio):
+    python3 -m unittest discover tests
+"""
+
+import contextlib
+import copy
+import glob
+import importlib.util
+import io
+import os
+import random
+import sys
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import eva_bench
+import eva_validator
+import eva_xml
+
+# script valido com os comandos que nao aparecem nos scripts do repositorio nem nos scripts do eva_bench
+COMMANDS_SCRIPT = b"""<?xml version="1.0" encoding="UTF-8"?>
+<evaml name="Commands">
+  <settings>
+    <voice tone="pt-BR_IsabelaV3Voice" />
+    <lightEffects mode="ON" />
+    <audioEffects mode="OFF" />
+  </settings>
+  <script>
+    <light id="start" state="ON" color="BLUE" />
+    <talk>Hello $</talk>
+    <mqtt topic="eva/state" message="ready" />
+    <qrRead var="qr" />
+    <textEmotion language="EN" var="emotion" />
+    <userEmotion />
+    <userHandPose var="pose" />
+    <userID var="user" />
+    <evaEmotion emotion="HAPPY" />
+    <random min="1" max="10" var="x" />
+    <counter var="x" op="+" value="2" />
+    <led animation="HAPPY" />
+    <motion head="YES" left-arm="UP" />
+    <listen language="en-US" />
+    <audio source="song" block="TRUE" />
+    <wait duration="500" />
+    <switch var="x">
+      <case op="lt" value="5"><goto target="start" /></case>
+      <default><stop /></default>
+    </switch>
+  </script>
+</evaml>
+"""
+
+# valores usados nas mutacoes dos atributos. "start" e' um id que ja existe em COMMANDS_SCRIPT (ids repetidos)
+BAD_VALUES = ["", " ", "BOGUS", "-1", "1.5", "99999999999999999999", "start", "a b"]
+TAGS = ["talk", "wait", "case", "default", "switch", "settings", "voice", "macro", "script", "stop", "bogus"]
+
+MUTATIONS = 60 # mutacoes de cada script pequeno
+LARGE_MUTATIONS = 8 # mutacoes de cada script grande (o xmlschema leva ~0,1s em um script do codes-xml)
+
+
+# scripts validos: (nome, conteudo)
+def base_scripts():
+    scripts = [("COMMANDS_SCRIPT", COMMANDS_SCRIPT)]
+    for file_name in sorted(glob.glob("codes-xml/*.xml")) + sorted(glob.glob("template-code-xml/*.xml")):
+        with open(file_name, "rb") as script:
+            scripts.append((file_name, script.read()))
+    for seed in range(5):
+        scripts.append(("eva_bench seed " + str(seed), eva_xml.tostring(eva_bench.generate_script(60, seed = seed).getroot())))
+    return scripts
+
+# aplica uma mutacao em um elemento qualquer do documento
+def mutate(root, rnd):
+    elements = list(root.iter())
+    parents = {child: parent for parent in elements for child in parent}
+    elem = rnd.choice(elements)
+    names = sorted(elem.attrib)
+    kind = rnd.randrange(9)
+    if kind == 0 and names: # atributo removido
+        del elem.attrib[rnd.choice(names)]
+    elif kind == 1 and names: # valor invalido (ou nao) para o atributo
+        elem.attrib[rnd.choice(names)] = rnd.choice(BAD_VALUES)
+    elif kind == 2: # atributo desconhecido
+        elem.attrib["bogus"] = rnd.choice(BAD_VALUES)
+    elif kind == 3: # elemento desconhecido ou fora do lugar
+        elem.tag = rnd.choice(TAGS)
+    elif kind == 4: # filho sem atributos
+        elem.append(eva_xml.Element(rnd.choice(TAGS)))
+    elif kind == 5: # copia de outro elemento (ids repetidos, filhos fora do lugar)
+        elem.append(copy.deepcopy(rnd.choice(elements)))
+    elif kind == 6 and elem in parents: # elemento removido
+        parents[elem].remove(elem)
+    elif kind == 7: # texto em um elemento
+        elem.text = rnd.choice(["text", " ", ""])
+    elif len(elem) > 1: # troca a ordem de dois filhos
+        first, second = rnd.sample(range(len(elem)), 2)
+        elem[first], elem[second] = copy.deepcopy(elem[second]), copy.deepcopy(elem[first])
+
+# documentos com mutacoes: (descricao, conteudo). Alguns sao xml mal-formados (o conteudo e' cortado)
+def mutated_scripts(name, data, count, rnd):
+    for index in range(count):
+        if index % 10 == 9:
+            yield name + " cut #" + str(index), data[:rnd.randrange(len(data))]
+            continue
+        root = eva_xml.fromstring(data)
+        for _ in range(rnd.randint(1, 3)):
+            mutate(root, rnd)
+        yield name + " mutation #" + str(index), eva_xml.tostring(root)
+
+
+def setUpModule():
+    global _cwd
+    _cwd = os.getcwd()
+    os.chdir(REPO_DIR) # o caminho do schema e' relativo a raiz do repositorio
+
+def tearDownModule():
+    os.chdir(_cwd)
+
+
+@unittest.skipUnless(importlib.util.find_spec("xmlschema"), "xmlschema is not installed")
+class GeneratedValidatorTest(unittest.TestCase):
+    # o documento e' valido? (validador gerado, validador gerado com iterparse, xmlschema, eva_validator.evaml_validator)
+    def decisions(self, data):
+        fast = eva_validator.fast_validation_errors(io.BytesIO(data)) == []
+        fast_stream = eva_validator.fast_validation_errors(io.BytesIO(data), stream = True) == []
+        reference = eva_validator.reference_validation_errors(io.BytesIO(data)) == []
+        with contextlib.redirect_stdout(io.StringIO()): # as mensagens de erro sao impressas
+            compiler = eva_validator.evaml_validator(io.BytesIO(data)) != None
+        return {"generated": fast, "generated (iterparse)": fast_stream, "xmlschema": reference, "evaml_validator": compiler}
+
+    def assertSameDecision(self, name, data):
+        decisions = self.decisions(data)
+        self.assertEqual(len(set(decisions.values())), 1, name + ": " + str(decisions))
+        return decisions["xmlschema"]
+
+    def test_base_scripts_are_valid(self):
+        for name, data in base_scripts():
+            with self.subTest(script = name):
+                self.assertTrue(self.assertSameDecision(name, data), name)
+
+    def test_mutations(self):
+        rnd = random.Random(2024)
+        results = []
+        for name, data in base_scripts():
+            count = MUTATIONS if len(data) < 10000 else LARGE_MUTATIONS
+            for mutation_name, mutated in mutated_scripts(name, data, count, rnd):
+                with self.subTest(script = mutation_name):
+                    results.append(self.assertSameDecision(mutation_name, mutated))
+        # as mutacoes devem gerar documentos validos e invalidos (senao o teste nao compara nada)
+        self.assertGreater(results.count(False), len(results) // 4)
+        self.assertGreater(results.count(True), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()